@@ -1,17 +1,28 @@
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
-import time
+import asyncio
 import requests
 import re
 import os
 import subprocess
 from collections import defaultdict
-from selenium.common.exceptions import InvalidSessionIdException
 import sys
 import os # For checking OS type
 import zipfile
 import shutil
+from driver_pool import DriverPool
+from pipeline import Pipeline, Stage
+from http_fetch import fetch_static_fields, cache_rendered_page, unchanged_record
+from page_cache import page_cache
+from seen_index import seen_index, listing_hash, content_hash
+from job_store import job_store
+from llm_cache import llm_cache
+from ollama_client import OllamaClient, TruncatedGenerationError, circuit_breakers
+from async_ollama import AsyncOllamaClient
+from page_wait import wait_for_selector, wait_for_network_idle, wait_stats
+from resource_blocking import apply_resource_blocking, resource_report
+from js_extract import extract_listing_cards
 
 # Ensure UTF-8 encoding for standard output
 sys.stdout.reconfigure(encoding='utf-8')
@@ -158,22 +169,29 @@ def download_chromedriver():
         print(f"Error downloading ChromeDriver: {e}")
         return False
 
-default_server_url = "http://rf-calcul:11434"  # Default to rf-calcul
+# 所有LLM调用共用的客户端（每个服务器一个长连接Session，按负载在 $OLLAMA_HOSTS 的服务器间分配请求）
+ollama = OllamaClient()
+# 异步版本共用同一个客户端（同样的服务器状态和熔断器），每个服务器有并发上限
+async_ollama = AsyncOllamaClient(ollama)
 
-def list_available_models(host="http://rf-calcul:11434"):
+# 提示词版本号，修改提示词时递增，使LLM输出缓存失效
+SUMMARY_PROMPT_VERSION = "aj-summary-1"
+HIGHLIGHT_PROMPT_VERSION = "aj-highlight-1"
+
+# 各任务的生成上限（num_predict、停止符、关闭思考）见 ollama_client.GENERATION_PROFILES
+
+# check_model_availability / check_ai_server 输出的模型状态
+MODEL_STATUS_LABELS = {
+    "loaded": "已加载到内存",
+    "unloaded": "已安装，未加载（首次调用需加载）",
+    "missing": "不存在",
+    "unreachable": "服务器无法连接",
+}
+
+def list_available_models(host=None):
     """List all available models on the server"""
     try:
-        resp = requests.get(f"{host}/api/tags", timeout=30)
-        resp.raise_for_status()
-        models_data = resp.json()
-        available_models = []
-        
-        for model_info in models_data.get('models', []):
-            model_name = model_info.get('name', '')
-            if model_name:
-                available_models.append(model_name)
-                
-        return available_models
+        return ollama.list_models(ollama.server_order(host)[0])
     except Exception as e:
         print(f"获取模型列表失败: {e}")
         return []
@@ -221,35 +239,45 @@ def set_windows_proxy_from_pac(pac_url):
     else:
         print("代理设置仅适用于Windows系统。")
 
-def fetch_job_detail(driver, url):
+# 详情页字段选择器（静态HTML与浏览器两种方式共用）
+DETAIL_SELECTORS = {
+    'title': 'h1, h2, .job-title',
+    'content': '.job-description, .description, main, article',
+    'institution': "a.job-link,span[class*='employer']",
+    'location': ".job-locations,span[class*='location']",
+    'posted': ".job-posting-date,.date",
+}
+
+def fetch_job_detail_browser(driver, url):
+    """用浏览器渲染详情页并提取字段"""
     driver.get(url)
-    time.sleep(2)
-    # 标题
-    try:
-        title = driver.find_element(By.CSS_SELECTOR, 'h1, h2, .job-title').text.strip()
-    except:
-        title = ''
-    # 内容
-    try:
-        content_elem = driver.find_element(By.CSS_SELECTOR, '.job-description, .description, main, article')
-        content = content_elem.text.strip()
-    except:
-        content = driver.find_element(By.TAG_NAME, 'body').text.strip()
-    # 单位
-    try:
-        institution = driver.find_element(By.CSS_SELECTOR, "a.job-link,span[class*='employer']").text.strip()
-    except:
-        institution = ''
-    # 地点
-    try:
-        location = driver.find_element(By.CSS_SELECTOR, ".job-locations,span[class*='location']").text.strip()
-    except:
-        location = ''
-    # 发布时间
-    try:
-        posted = driver.find_element(By.CSS_SELECTOR, ".job-posting-date,.date").text.strip()
-    except:
-        posted = ''
+    wait_for_selector(driver, DETAIL_SELECTORS['content'], timeout=5)
+    resource_report.record_page(driver)
+    fields = {}
+    for name, selector in DETAIL_SELECTORS.items():
+        try:
+            fields[name] = driver.find_element(By.CSS_SELECTOR, selector).text.strip()
+        except:
+            fields[name] = ''
+    if not fields['content']:
+        try:
+            fields['content'] = driver.find_element(By.TAG_NAME, 'body').text.strip()
+        except:
+            pass
+    return fields
+
+def fetch_job_detail(driver, url):
+    # 优先用 requests + BeautifulSoup 解析静态HTML，缺少关键节点时再用浏览器
+    fields = fetch_static_fields(url, DETAIL_SELECTORS, required=('title', 'content'), source='academicpositions')
+    if fields is None:
+        fields = fetch_job_detail_browser(driver, url)
+        if fields['title'] and fields['content']:
+            cache_rendered_page(driver, url, source='academicpositions')
+    title = fields['title']
+    content = fields['content']
+    institution = fields['institution']
+    location = fields['location']
+    posted = fields['posted']
     # 合同周期
     contract = ''
     contract_keywords = ['contract', 'duration', '周期', '期限', 'term', '合同时间']
@@ -269,179 +297,92 @@ def fetch_job_detail(driver, url):
     return title, content, institution, location, posted, contract, start_date
 
 def check_model_availability(model, host=None):
-    """Check if a specific model is available and loaded. Returns True if available, False if not."""
-    global default_server_url
-    servers = [host] if host else ["http://rf-calcul:11434"]
-    if default_server_url:
-        # Put the last successful server first
-        if default_server_url in servers:
-            servers.remove(default_server_url)
-        servers.insert(0, default_server_url)
-
-    for server in servers:
-        try:
-            # First check if the model exists in the available tags
-            try:
-                tags_resp = requests.get(f"{server}/api/tags", timeout=30)
-                tags_resp.raise_for_status()
-                tags_data = tags_resp.json()
-
-                model_exists = False
-                for model_info in tags_data.get('models', []):
-                    if model_info.get('name') == model:
-                        model_exists = True
-                        print(f"模型 {model} 在服务器 {server} 上存在")
-                        # Update default server URL on success
-                        default_server_url = server
-                        return True
-
-                if not model_exists:
-                    print(f"模型 {model} 在服务器 {server} 上不存在")
-                    continue
-            except Exception as e:
-                print(f"服务器 {server} 检查模型列表失败: {e}")
-                continue
-
-            # Test the model with a simple prompt
-            print(f"正在测试服务器 {server} 的模型 {model} 响应...")
-            resp = requests.post(
-                f"{server}/api/generate",
-                json={"model": model, "prompt": "test", "stream": False},
-                timeout=60
-            )
-            resp.raise_for_status()
-            print(f"模型 {model} 在服务器 {server} 上测试成功")
-            # Update default server URL on success
-            default_server_url = server
-            return True
-
-        except requests.exceptions.Timeout:
-            print(f"服务器 {server} 的模型 {model} 检查超时")
-            continue
-        except Exception as e:
-            print(f"服务器 {server} 的模型 {model} 检查失败: {e}")
-            continue
+    """Check if a specific model is installed, reporting whether it is loaded. Returns True if available, False if not.
 
+    Only reads /api/tags (cached) and /api/ps, so it never triggers a model load.
+    """
+    statuses = ollama.availability(model, [host] if host else None)
+    for server, status in statuses.items():
+        print(f"服务器 {server} 上的模型 {model}: {MODEL_STATUS_LABELS[status]}")
+    if any(status in ("loaded", "unloaded") for status in statuses.values()):
+        return True
     print(f"所有服务器上都未找到可用的模型 {model}")
     return False
 
-def check_ai_server(host="http://rf-calcul:11434"):
-    """Check if the AI server is available and models are loaded"""
-    # List of servers to try
-    servers = ["http://rf-calcul:11434"]
-    
-    for server in servers:
-        try:
-            # First check if the server is running by checking the version endpoint
-            print(f"正在检查服务器 {server} 连接...")
-            resp = requests.get(f"{server}/api/version", timeout=5)  # Short timeout for quick check
-            resp.raise_for_status()
-            version = resp.json().get('version', 'unknown')
-            print(f"服务器连接成功，Ollama 版本: {version}")
-            
-            # Set the successful server as the default host
-            global default_server_url
-            default_server_url = server
-            
-            # Check required models
-            models = ["deepseek-r1:70b", "qwen3:30b-a3b"]
-            available_models = []
+def check_ai_server(host=None):
+    """Check if the AI server is available and models are loaded.
 
-            # First try to get the list of all models
-            try:
-                print("正在获取可用模型列表...")
-                tags_resp = requests.get(f"{server}/api/tags", timeout=30)
-                tags_resp.raise_for_status()
-                tags_data = tags_resp.json()
-
-                all_models = [model_info.get('name') for model_info in tags_data.get('models', [])]
-                print(f"服务器上的所有模型: {', '.join(all_models)}")
-
-                # Check if our required models are in the list
-                for model in models:
-                    if model in all_models:
-                        available_models.append(model)
-                        print(f"模型 {model} 在服务器上存在")
-                    else:
-                        print(f"模型 {model} 在服务器上不存在")
-            except Exception as e:
-                print(f"获取模型列表失败: {e}")
-                print("将尝试直接检查每个模型...")
-
-            # If we couldn't get the list or not all required models were found,
-            # check each model individually
-            if len(available_models) < len(models):
-                for model in models:
-                    if model not in available_models and check_model_availability(model, server):
-                        available_models.append(model)
-                        print(f"模型 {model} 可用")
-
-            if not available_models:
-                print(f"在服务器 {server} 上没有可用的模型")
-                continue
-
-            print(f"找到 {len(available_models)}/{len(models)} 个可用模型")
-            return True
-            
-        except Exception as e:
-            print(f"服务器 {server} 连接失败: {e}")
-            continue
-    
-    print("所有服务器都连接失败")
-    return False
+    Only ``host`` is checked when given; otherwise every configured server
+    ($OLLAMA_HOSTS) is probed.
+    """
+    # Check required models
+    models = ["deepseek-r1:70b", "qwen3:30b-a3b"]
+    servers = [host.rstrip("/")] if host else list(ollama.servers)
+
+    # Probe the servers at once with a short timeout; the first healthy one with a model wins
+    print(f"正在并行检查服务器连接: {', '.join(servers)}")
+    health = ollama.find_server(models, servers=servers)
+    if health is None:
+        table = ollama.health_table()
+        for failed in (table[server] for server in servers if server in table):
+            if failed.healthy:
+                print(f"在服务器 {failed.server} 上没有可用的模型")
+            else:
+                print(f"服务器 {failed.server} 连接失败: {failed.error}")
+        print("所有服务器都连接失败")
+        return False
+
+    print(f"服务器 {health.server} 连接成功（{health.elapsed:.1f}秒），Ollama 版本: {health.version}")
+    for model in models:
+        print(f"模型 {model}: {MODEL_STATUS_LABELS[health.models[model]]}")
+
+    available_models = [model for model in models if health.has(model)]
+    print(f"找到 {len(available_models)}/{len(models)} 个可用模型")
+    return True
+
+def build_summary_prompts(text):
+    """主模型提示词和备用模型的简化提示词"""
+    # 限制文本长度，避免超出模型上下文窗口
+    text_truncated = text[:8000] if len(text) > 8000 else text  # Increased context window
+    prompt = f"请对以下学术招聘信息进行汇总和总结，重点提炼岗位要求、研究方向、单位、地点等关键信息：\n{text_truncated}"
+    # Use a simpler prompt for the backup model
+    simple_prompt = f"请简要总结以下学术招聘信息的主要内容：\n\n{text_truncated[:2000]}"  # Increased context for backup
+    return prompt, simple_prompt
+
+def simple_summary(text):
+    """所有模型都失败时的简单文本摘录"""
+    return f"职位概要：{text[:500]}..."
 
 def ollama_summarize(text, model="deepseek-r1:70b", host=None):
     """生成职位摘要，使用大语言模型总结内容"""
-    global default_server_url
-    servers = [host] if host else ["http://rf-calcul:11434"]
-    if default_server_url:
-        # Put the last successful server first
-        if default_server_url in servers:
-            servers.remove(default_server_url)
-        servers.insert(0, default_server_url)
-    
+    cached = llm_cache.get('summary', model, SUMMARY_PROMPT_VERSION, text)
+    if cached is not None:
+        return cached
+
+    prompt, simple_prompt = build_summary_prompts(text)
+    backup_model = "qwen3:30b-a3b"  # Updated backup model name
+
     # Try each server in sequence
+    servers = ollama.server_order(host)
     last_error = None
     for server in servers:
         try:
-            # 限制文本长度，避免超出模型上下文窗口
-            text_truncated = text[:8000] if len(text) > 8000 else text  # Increased context window
-
-            prompt = f"请对以下学术招聘信息进行汇总和总结，重点提炼岗位要求、研究方向、单位、地点等关键信息：\n{text_truncated}"
-
-            # 标准化请求体格式
-            payload = {
-                "model": model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.5,  # 降低温度以获得更确定性的输出
-                    "top_p": 0.9
-                }
-            }
-
-            # 添加请求头
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "application/json"
-            }
-
-            url = f"{server}/api/generate"
             print(f"正在使用服务器 {server} 的 {model} 模型生成职位摘要...")
-            resp = requests.post(url, json=payload, headers=headers, timeout=600)  # Increased timeout to 10 minutes for slow server
-            resp.raise_for_status()
-
-            result = resp.json()
-            if not isinstance(result, dict) or "response" not in result:
-                print(f"API响应格式错误: {result}")
-                raise Exception("API响应格式错误")
-
-            summary = result.get("response", "").strip()
+            # 开启对冲（$OLLAMA_HEDGE）时，慢于p90的请求会同时发给其他服务器或备用模型
+            summary, used_model = ollama.generate_task_hedged(server, model, 'summary', prompt,
+                                                              hedge_model=backup_model, hedge_prompt=simple_prompt)
             print("摘要生成成功")
-            # Update the default server URL
-            default_server_url = server
+            ollama.mark_success(server)
+            if used_model == model:
+                llm_cache.put('summary', model, SUMMARY_PROMPT_VERSION, text, summary)
             return summary
 
+        except TruncatedGenerationError as e:
+            # 服务器正常，换服务器也会同样截断，直接改用备用模型
+            print(f"模型 {model} 输出被截断: {e}")
+            ollama.mark_success(server)
+            last_error = str(e)
+            break
         except requests.exceptions.Timeout:
             print(f"服务器 {server} 请求超时")
             last_error = "timeout"
@@ -454,34 +395,35 @@ def ollama_summarize(text, model="deepseek-r1:70b", host=None):
     # If all servers failed, try backup model
     print(f"所有服务器都失败 ({last_error})，尝试备用模型...")
     try:
-        backup_model = "qwen3:30b-a3b"  # Updated backup model name
         print(f"尝试使用备用模型 {backup_model}...")
-
-        # Use a simpler prompt with the last tried server
-        simple_prompt = f"请简要总结以下学术招聘信息的主要内容：\n\n{text_truncated[:2000]}"  # Increased context for backup
-        payload["model"] = backup_model
-        payload["prompt"] = simple_prompt
-
-        resp = requests.post(f"{server}/api/generate", json=payload, headers=headers, timeout=600)
-        resp.raise_for_status()
-        result = resp.json()
-        return result.get("response", "")
+        # Use the last tried server
+        return ollama.generate_task(servers[-1], backup_model, 'summary', simple_prompt)
     except Exception as backup_error:
         print(f"备用模型也失败: {backup_error}")
         # Fall back to simple text extraction
-        simple_txt = text_truncated[:500]
-        return f"职位概要：{simple_txt}..."
+        return simple_summary(text)
 
-def ollama_highlight(text, model="deepseek-r1:70b", host=None):
-    """生成职位亮点，如果主模型失败则使用备用模型"""
-    global default_server_url
-    servers = [host] if host else ["http://rf-calcul:11434"]
-    if default_server_url:
-        # Put the last successful server first
-        if default_server_url in servers:
-            servers.remove(default_server_url)
-        servers.insert(0, default_server_url)
+async def ollama_summarize_async(text, model="deepseek-r1:70b", host=None):
+    """ollama_summarize 的异步版本：同样的提示词、缓存和降级顺序，供并发富化使用"""
+    cached = await asyncio.to_thread(llm_cache.get, 'summary', model, SUMMARY_PROMPT_VERSION, text)
+    if cached is not None:
+        return cached
+
+    prompt, simple_prompt = build_summary_prompts(text)
+    try:
+        summary = await async_ollama.generate_task(model, 'summary', prompt, host=host)
+        await asyncio.to_thread(llm_cache.put, 'summary', model, SUMMARY_PROMPT_VERSION, text, summary)
+        return summary
+    except Exception as e:
+        print(f"{model} 生成职位摘要失败 ({e})，尝试备用模型...")
+    try:
+        return await async_ollama.generate_task("qwen3:30b-a3b", 'summary', simple_prompt, host=host)
+    except Exception as backup_error:
+        print(f"备用模型也失败: {backup_error}")
+        return simple_summary(text)
 
+def build_highlight_prompts(text):
+    """主模型提示词和备用模型的简化提示词"""
     example = """
     蒙特利尔大学（Université de Montréal）提供一个卓越的学术环境，结合世界级的研究资源、多元文化的国际社区，以及蒙特利尔这座充满活力的城市所提供的无限机会，是追求学术卓越和个人成长的理想选择。
     """
@@ -497,65 +439,82 @@ def ollama_highlight(text, model="deepseek-r1:70b", host=None):
         f"参考示例：\n{example}\n\n"
         f"招聘信息：\n{text[:8000]}"  # Increased context window
     )
+    # Use a simpler prompt for the backup model
+    simple_prompt = f"请用一段话总结以下学术招聘信息的主要亮点和特色：\n\n{text[:2000]}" # Increased context for backup
+    return prompt.strip(), simple_prompt
+
+def clean_highlight(highlight):
+    """去掉模型常见的开场白和思考内容"""
+    # Clean up common AI prefixes
+    common_prefixes = [
+        "这个职位的亮点是", "该岗位的优势在于", "职位亮点：",
+        "AI分析：", "让我分析：", "分析得出：", "总结：",
+        "亮点包括：", "特色在于：", "优势是：", "经分析，",
+        "根据描述，", "通过分析，", "主要亮点：",
+        "分析如下：", "职位分析：", "优势分析：", "特点如下：",
+        "思考过程：", "我的分析：", "我认为", "我觉得",
+    ]
 
-    # 标准化请求体格式
-    payload = {
-        "model": model,
-        "prompt": prompt.strip(),
-        "stream": False,
-        "options": {
-            "temperature": 0.7,
-            "top_p": 0.9
-        }
-    }
+    for prefix in common_prefixes:
+        if highlight.lower().startswith(prefix.lower()):
+            highlight = highlight[len(prefix):].strip()
 
-    # 添加请求头
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
+    # Remove <think> tags and content
+    highlight = re.sub(r'<think>.*?</think>', '', highlight, flags=re.DOTALL)
+    return re.sub(r'\n\s*\n', '\n', highlight).strip()
+
+def simple_highlight(text):
+    """所有模型都失败时，用正则从文本中提取亮点"""
+    # Extract key information from text
+    institution = re.search(r'(?:university|大学|学院|研究所|institute)[\s:]*([\w\s]+)', text, re.IGNORECASE)
+    location = re.search(r'(?:location|地点|位于)[\s:]*([\w\s,]+)', text, re.IGNORECASE)
+    field = re.search(r'(?:research|field|研究|领域)[\s:]*([\w\s,]+)', text, re.IGNORECASE)
+
+    highlight_parts = []
+    if institution:
+        highlight_parts.append(f"{institution.group(1)}是一所知名学术机构")
+    if location:
+        highlight_parts.append(f"位于{location.group(1)}")
+    if field:
+        highlight_parts.append(f"在{field.group(1)}领域有突出研究")
+
+    if highlight_parts:
+        return "，".join(highlight_parts) + "，提供良好的学术环境和发展机会。"
+    else:
+        return "提供良好的学术环境和职业发展机会，适合有志于学术研究的人才。"
+
+def generate_highlight(text, model="deepseek-r1:70b", host=None):
+    """生成职位亮点并返回 (亮点, 实际使用的模型)；备用模型生成时为备用模型名，简单提取时为 None"""
+    cached = llm_cache.get('highlight', model, HIGHLIGHT_PROMPT_VERSION, text)
+    if cached is not None:
+        return cached, model
+
+    prompt, simple_prompt = build_highlight_prompts(text)
+    backup_model = "qwen3:30b-a3b"  # Updated backup model name
 
     # Try each server in sequence
+    servers = ollama.server_order(host)
     last_error = None
     for server in servers:
         try:
-            url = f"{server}/api/generate"
             print(f"正在使用服务器 {server} 的 {model} 模型生成职位亮点...")
-            
-            resp = requests.post(url, json=payload, headers=headers, timeout=600)
-            resp.raise_for_status()
-
-            result = resp.json()
-            if not isinstance(result, dict) or "response" not in result:
-                print(f"API响应格式错误: {result}")
-                raise Exception("API响应格式错误")
-
-            highlight = result["response"].strip()
+            # 开启对冲（$OLLAMA_HEDGE）时，慢于p90的请求会同时发给其他服务器或备用模型
+            highlight, used_model = ollama.generate_task_hedged(server, model, 'highlight', prompt,
+                                                                hedge_model=backup_model, hedge_prompt=simple_prompt)
             print("亮点生成成功")
-            
-            # Update the default server URL
-            default_server_url = server
-
-            # Clean up common AI prefixes
-            common_prefixes = [
-                "这个职位的亮点是", "该岗位的优势在于", "职位亮点：",
-                "AI分析：", "让我分析：", "分析得出：", "总结：",
-                "亮点包括：", "特色在于：", "优势是：", "经分析，",
-                "根据描述，", "通过分析，", "主要亮点：",
-                "分析如下：", "职位分析：", "优势分析：", "特点如下：",
-                "思考过程：", "我的分析：", "我认为", "我觉得",
-            ]
-
-            for prefix in common_prefixes:
-                if highlight.lower().startswith(prefix.lower()):
-                    highlight = highlight[len(prefix):].strip()
+            ollama.mark_success(server)
+            highlight = clean_highlight(highlight)
 
-            # Remove <think> tags and content
-            highlight = re.sub(r'<think>.*?</think>', '', highlight, flags=re.DOTALL)
-            highlight = re.sub(r'\n\s*\n', '\n', highlight).strip()
-
-            return highlight
+            if used_model == model:
+                llm_cache.put('highlight', model, HIGHLIGHT_PROMPT_VERSION, text, highlight)
+            return highlight, used_model
 
+        except TruncatedGenerationError as e:
+            # 服务器正常，换服务器也会同样截断，直接改用备用模型
+            print(f"模型 {model} 输出被截断: {e}")
+            ollama.mark_success(server)
+            last_error = str(e)
+            break
         except requests.exceptions.Timeout:
             print(f"服务器 {server} 请求超时")
             last_error = "timeout"
@@ -566,55 +525,59 @@ def ollama_highlight(text, model="deepseek-r1:70b", host=None):
             continue
 
     # If all servers failed, try backup model
-    backup_model = "qwen3:30b-a3b"  # Updated backup model name
     print(f"所有服务器都失败 ({last_error})，尝试备用模型 {backup_model}...")
 
-    try:
-        # Use a simpler prompt
-        simple_prompt = f"请用一段话总结以下学术招聘信息的主要亮点和特色：\n\n{text[:2000]}" # Increased context for backup
-        payload["model"] = backup_model
-        payload["prompt"] = simple_prompt
-
-        # Try all servers again with backup model
-        for server in servers:
-            try:
-                resp = requests.post(
-                    f"{server}/api/generate",
-                    json=payload,
-                    headers=headers,
-                    timeout=600
-                )
-                resp.raise_for_status()
-                result = resp.json()
-                highlight = result.get("response", "").strip()
-                if highlight:
-                    # Update the default server URL
-                    default_server_url = server
-                    return highlight
-            except Exception:
-                continue
-    except Exception as e:
-        print(f"备用模型失败: {e}")
+    # Try all servers again with backup model
+    for server in servers:
+        try:
+            highlight = clean_highlight(ollama.generate_task(server, backup_model, 'highlight', simple_prompt))
+            if highlight:
+                ollama.mark_success(server)
+                return highlight, backup_model
+        except Exception as e:
+            print(f"备用模型失败: {e}")
+            continue
 
     # If all attempts fail, use simple extraction
     print("所有模型都失败，使用简单提取方法...")
-    # Extract key information from text
-    institution = re.search(r'(?:university|大学|学院|研究所|institute)[\s:]*([\w\s]+)', text, re.IGNORECASE)
-    location = re.search(r'(?:location|地点|位于)[\s:]*([\w\s,]+)', text, re.IGNORECASE)
-    field = re.search(r'(?:research|field|研究|领域)[\s:]*([\w\s,]+)', text, re.IGNORECASE)
+    return simple_highlight(text), None
 
-    highlight_parts = []
-    if institution:
-        highlight_parts.append(f"{institution.group(1)}是一所知名学术机构")
-    if location:
-        highlight_parts.append(f"位于{location.group(1)}")
-    if field:
-        highlight_parts.append(f"在{field.group(1)}领域有突出研究")
+def ollama_highlight(text, model="deepseek-r1:70b", host=None):
+    """生成职位亮点，如果主模型失败则使用备用模型"""
+    return generate_highlight(text, model, host)[0]
 
-    if highlight_parts:
-        return "，".join(highlight_parts) + "，提供良好的学术环境和发展机会。"
-    else:
-        return "提供良好的学术环境和职业发展机会，适合有志于学术研究的人才。"
+async def ollama_highlight_async(text, model="deepseek-r1:70b", host=None):
+    """ollama_highlight 的异步版本：同样的提示词、缓存和降级顺序，供并发富化使用"""
+    cached = await asyncio.to_thread(llm_cache.get, 'highlight', model, HIGHLIGHT_PROMPT_VERSION, text)
+    if cached is not None:
+        return cached
+
+    prompt, simple_prompt = build_highlight_prompts(text)
+    try:
+        highlight = clean_highlight(await async_ollama.generate_task(model, 'highlight', prompt, host=host))
+        await asyncio.to_thread(llm_cache.put, 'highlight', model, HIGHLIGHT_PROMPT_VERSION, text, highlight)
+        return highlight
+    except Exception as e:
+        print(f"{model} 生成职位亮点失败 ({e})，尝试备用模型...")
+    try:
+        return clean_highlight(await async_ollama.generate_task("qwen3:30b-a3b", 'highlight', simple_prompt, host=host))
+    except Exception as backup_error:
+        print(f"备用模型失败: {backup_error}，使用简单提取方法...")
+        return simple_highlight(text)
+
+async def enrich_queued_job(job, model="deepseek-r1:70b"):
+    """enrich_worker.py 的富化函数：为仅爬取模式保存的职位生成亮点。
+
+    与 ollama_highlight_async 不同，AI失败时直接抛出异常而不降级为简单提取，
+    由队列稍后重试。
+    """
+    text = job['title'] + '\n' + job['content']
+    highlight = await asyncio.to_thread(llm_cache.get, 'highlight', model, HIGHLIGHT_PROMPT_VERSION, text)
+    if highlight is None:
+        prompt, _ = build_highlight_prompts(text)
+        highlight = clean_highlight(await async_ollama.generate_task(model, 'highlight', prompt))
+        await asyncio.to_thread(llm_cache.put, 'highlight', model, HIGHLIGHT_PROMPT_VERSION, text, highlight)
+    return dict(job, highlight=highlight)
 
 def classify_position(title, content):
     title_content = (title + ' ' + content).lower()
@@ -662,15 +625,28 @@ def extract_direction(text):
                 return direction
     return '其他'
 
-def fetch_academic_positions_jobs(use_headless=True, selected_model=None, num_jobs_to_fetch=10):
-    """
-    Fetch academic job postings and generate highlights using the specified model
-    """
-    set_windows_proxy_from_pac("http://127.0.0.1:55624/proxy.pac")
-    base_url = "https://academicpositions.com/find-jobs"
-    current_page = 1
-
-    # 设置Chrome选项
+# 列表页职位卡片选择器（按顺序尝试，按文本去重）
+LISTING_CARD_SELECTORS = [
+    "div[class*='job']",
+    "div[class*='listing']",
+    ".job-posting-card",
+    "article",
+    "div.card",
+    "div.position",
+    "a[href*='job']"
+]
+
+# 卡片内字段选择器：列表按顺序取第一个非空文本
+LISTING_CARD_FIELDS = {
+    'title': ["h2[class*='title']", "h3[class*='title']", "a[class*='title']", "span[class*='title']"],
+    'institution': "a.job-link,span[class*='employer']",
+    'location': ".job-locations,span[class*='location']",
+    'link': {'selectors': "a.job-link", 'attr': 'href'},
+    'posted': ".job-posting-date,.date",
+}
+
+def build_chrome_options(use_headless=True):
+    """Build the ChromeOptions used for both listing and detail pages"""
     options = webdriver.ChromeOptions()
 
     # 添加更多选项使headless模式更难被检测
@@ -688,224 +664,268 @@ def fetch_academic_positions_jobs(use_headless=True, selected_model=None, num_jo
     # 根据参数决定是否使用headless模式
     if use_headless:
         options.add_argument('--headless=new')  # 使用新版headless模式
-        print("正在启动浏览器（后台模式）...")
-    else:
-        print("正在启动浏览器（可见模式）...")
+    return options
 
-    # 尝试多种方式初始化ChromeDriver
-    driver = None
+def create_chrome_driver(options):
+    """尝试多种方式初始化ChromeDriver"""
+    # 方法1：使用当前目录下的chromedriver.exe
     try:
-        # 方法1：使用当前目录下的chromedriver.exe
-        try:
-            print("尝试使用当前目录下的ChromeDriver...")
-            service = Service("./chromedriver.exe")
-            driver = webdriver.Chrome(service=service, options=options)
-            print("成功使用当前目录下的ChromeDriver")
-        except Exception as e:
-            print(f"使用当前目录ChromeDriver失败: {e}")
+        print("尝试使用当前目录下的ChromeDriver...")
+        service = Service("./chromedriver.exe")
+        driver = webdriver.Chrome(service=service, options=options)
+        print("成功使用当前目录下的ChromeDriver")
+        return driver
+    except Exception as e:
+        print(f"使用当前目录ChromeDriver失败: {e}")
 
-            # 方法2：尝试使用系统PATH中的chromedriver
-            try:
-                print("尝试使用系统PATH中的ChromeDriver...")
-                driver = webdriver.Chrome(options=options)
-                print("成功使用系统PATH中的ChromeDriver")
-            except Exception as e:
-                print(f"使用系统PATH中的ChromeDriver失败: {e}")
-
-                # 方法3：尝试使用绝对路径
-                try:
-                    import os
-                    current_dir = os.path.dirname(os.path.abspath(__file__))
-                    chromedriver_path = os.path.join(current_dir, "chromedriver.exe")
-                    print(f"尝试使用绝对路径: {chromedriver_path}")
-                    service = Service(chromedriver_path)
-                    driver = webdriver.Chrome(service=service, options=options)
-                    print(f"成功使用绝对路径: {chromedriver_path}")
-                except Exception as e:
-                    print(f"使用绝对路径失败: {e}")
-                    raise Exception("无法初始化ChromeDriver，请确保chromedriver.exe在当前目录或系统PATH中")
+    # 方法2：尝试使用系统PATH中的chromedriver
+    try:
+        print("尝试使用系统PATH中的ChromeDriver...")
+        driver = webdriver.Chrome(options=options)
+        print("成功使用系统PATH中的ChromeDriver")
+        return driver
     except Exception as e:
-        print(f"初始化ChromeDriver失败: {e}")
-        raise
+        print(f"使用系统PATH中的ChromeDriver失败: {e}")
 
-    # 设置页面加载超时
-    driver.set_page_load_timeout(30)
-
-    print("正在访问招聘网站...")
-    jobs = []
-    valid_jobs = 0  # Track number of valid jobs
-
-    # 尝试多种选择器来查找职位卡片
-    selectors = [
-        "div[class*='job']",
-        "div[class*='listing']",
-        ".job-posting-card",
-        "article",
-        "div.card",
-        "div.position",
-        "a[href*='job']"
-    ]
-    
-    while valid_jobs < num_jobs_to_fetch:
-        url = f"{base_url}?page={current_page}"
-        print(f"\n正在访问第 {current_page} 页...")
-        driver.get(url)
+    # 方法3：尝试使用绝对路径
+    try:
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        chromedriver_path = os.path.join(current_dir, "chromedriver.exe")
+        print(f"尝试使用绝对路径: {chromedriver_path}")
+        service = Service(chromedriver_path)
+        driver = webdriver.Chrome(service=service, options=options)
+        print(f"成功使用绝对路径: {chromedriver_path}")
+        return driver
+    except Exception as e:
+        print(f"使用绝对路径失败: {e}")
+        raise Exception("无法初始化ChromeDriver，请确保chromedriver.exe在当前目录或系统PATH中")
 
-        # 等待页面加载
-        print("等待页面加载...")
-        time.sleep(5)  # 给页面足够的加载时间
+def fetch_academic_positions_jobs(use_headless=True, selected_model=None, num_jobs_to_fetch=10, num_drivers=3,
+                                  block_resources=True, llm_workers=2, queue_size=4, enrich=True):
+    """
+    Fetch academic job postings and generate highlights using the specified model
 
-        # 尝试所有选择器
-        job_cards = []
-        for selector in selectors:
-            try:
-                print(f"尝试使用选择器: {selector}")
-                cards = driver.find_elements(By.CSS_SELECTOR, selector)
-                if cards and len(cards) > 0:
-                    print(f"  - 找到 {len(cards)} 个元素")
-                    job_cards.extend(cards)
-            except Exception as e:
-                print(f"  - 选择器错误: {e}")
+    Runs as a pipeline: listing discovery -> detail fetch -> field
+    extraction -> LLM enrichment -> persistence, connected by bounded
+    queues of ``queue_size``. Listing and detail pages share a pool of
+    ``num_drivers`` Chrome instances and ``llm_workers`` highlights are
+    generated at once, so the browsers keep fetching while the LLM works.
+    Results keep the order of the listing. With ``block_resources`` the
+    browsers skip images, fonts, media, analytics and ad requests.
 
-        # 去重
-        unique_cards = []
-        card_texts = set()
-        for card in job_cards:
-            try:
-                card_text = card.text.strip()
-                if card_text and card_text not in card_texts:
-                    card_texts.add(card_text)
-                    unique_cards.append(card)
-            except:
-                pass
-        
-        job_cards = unique_cards
-        print(f"第 {current_page} 页检测到职位卡片数量: {len(job_cards)}")
+    With ``enrich=False`` no LLM is called: new or changed jobs are saved
+    without a highlight and queued in the job store for ``enrich_worker.py``.
+    """
+    set_windows_proxy_from_pac("http://127.0.0.1:55624/proxy.pac")
+    base_url = "https://academicpositions.com/find-jobs"
 
-        # 如果这一页没有找到任何卡片，可能已经到达最后一页
-        if len(job_cards) == 0:
-            print("没有找到更多职位，可能已到达最后一页")
-            break
+    # 设置Chrome选项
+    options = build_chrome_options(use_headless)
+    if use_headless:
+        print("正在启动浏览器（后台模式）...")
+    else:
+        print("正在启动浏览器（可见模式）...")
 
-        # 处理本页的职位卡片
-        for card in job_cards:
-            # 提取职位标题
-            title = ""
-            title_elem = None
-            for tag in ["h2", "h3", "a", "span"]:
-                try:
-                    title_elem = card.find_element(By.CSS_SELECTOR, f"{tag}[class*='title']")
-                    if title_elem.text.strip():
-                        title = title_elem.text.strip()
-                        break
-                except:
-                    continue
-            
-            # 提取单位
-            institution = ""
-            try:
-                institution = card.find_element(By.CSS_SELECTOR, "a.job-link,span[class*='employer']").text.strip()
-            except:
-                pass
-            
-            # 提取地点
-            location = ""
-            try:
-                location = card.find_element(By.CSS_SELECTOR, ".job-locations,span[class*='location']").text.strip()
-            except:
-                pass
-            
-            # 提取链接
-            link = ""
-            try:
-                link_elem = card.find_element(By.CSS_SELECTOR, "a.job-link")
-                link = link_elem.get_attribute("href")
-            except:
-                pass
-                
-            # Only process if we have both title and institution
-            if title and institution and valid_jobs < num_jobs_to_fetch:
-                jobs.append({
-                    "title": title,
-                    "institution": institution,
-                    "location": location,
-                    "link": link
-                })
-                valid_jobs += 1
-                print(f"已解析职位卡片: {valid_jobs}/{num_jobs_to_fetch} ({int(valid_jobs/num_jobs_to_fetch*100)}%)")
-                
-                if valid_jobs >= num_jobs_to_fetch:
-                    break
+    def new_driver():
+        driver = create_chrome_driver(options)
+        if block_resources:
+            apply_resource_blocking(driver)
+        return driver
 
-        # 如果已经获取足够的职位，退出循环
-        if valid_jobs >= num_jobs_to_fetch:
-            break
+    try:
+        driver = new_driver()
+    except Exception as e:
+        print(f"初始化ChromeDriver失败: {e}")
+        raise
 
-        # 尝试下一页
-        current_page += 1
-        
-    # 继续处理职位详情
-    job_details = []
-    print("\n开始获取职位详情...")
-    for i, job in enumerate(jobs):
-        print(f"正在处理职位 {i+1}/{len(jobs)} ({int((i+1)/len(jobs)*100)}%): {job['title'][:30]}...")
-        try:
-            detail_title, detail_content, inst2, loc2, posted, contract, start_date = fetch_job_detail(driver, job['link'])
-        except InvalidSessionIdException:
-            # 重新启动driver并重试
-            print("浏览器会话失效，正在重新启动...")
-            try:
-                driver.quit()
-            except:
-                pass
+    # 列表页和详情页共用同一个浏览器池（设置页面加载超时）
+    pool = DriverPool(new_driver, size=num_drivers)
+    driver.set_page_load_timeout(pool.page_load_timeout)
+    pool.add(driver)
 
-            # 重新初始化driver
-            try:
-                # 尝试多种方式初始化ChromeDriver
-                if os.path.exists("./chromedriver.exe"):
-                    print("尝试使用当前目录下的ChromeDriver...")
-                    service = Service("./chromedriver.exe")
-                    driver = webdriver.Chrome(service=service, options=options)
-                else:
-                    current_dir = os.path.dirname(os.path.abspath(__file__))
-                    chromedriver_path = os.path.join(current_dir, "chromedriver.exe")
-                    print(f"尝试使用绝对路径: {chromedriver_path}")
-                    service = Service(chromedriver_path)
-                    driver = webdriver.Chrome(service=service, options=options)
-            except Exception as e:
-                print(f"重新初始化ChromeDriver失败: {e}")
-                try:
-                    # 最后尝试不指定service
-                    driver = webdriver.Chrome(options=options)
-                except Exception as e:
-                    print(f"所有初始化方法都失败: {e}")
-                    raise
-
-            # 设置页面加载超时
-            driver.set_page_load_timeout(30)
-            detail_title, detail_content, inst2, loc2, posted, contract, start_date = fetch_job_detail(driver, job['link'])
-        # 优先用详情页数据补全
-        institution = inst2 or job.get('institution', '')
-        location = loc2 or job.get('location', '')
-        # AI亮点
-        print(f"正在生成职位亮点...")
-        if selected_model:
-            highlight = ollama_highlight(detail_title + '\n' + detail_content, model=selected_model)
+    def load_listing_page(driver, page):
+        url = f"{base_url}?page={page}"
+        print(f"\n正在访问第 {page} 页...")
+        driver.get(url)
+
+        # 等待职位卡片出现且网络请求结束（均有上限），不再固定等待
+        print("等待页面加载...")
+        wait_for_selector(driver, ", ".join(LISTING_CARD_SELECTORS), timeout=15)
+        wait_for_network_idle(driver, timeout=5)
+        resource_report.record_page(driver)
+
+        # 一次 execute_script 提取本页所有职位卡片
+        return extract_listing_cards(driver, LISTING_CARD_SELECTORS, LISTING_CARD_FIELDS)
+
+    def discover_jobs():
+        """阶段1：逐页发现职位，每解析出一个职位就交给后续阶段"""
+        print("正在访问招聘网站...")
+        current_page = 1
+        valid_jobs = 0  # Track number of valid jobs
+        while valid_jobs < num_jobs_to_fetch:
+            job_cards = pool.run(load_listing_page, current_page)
+            print(f"第 {current_page} 页检测到职位卡片数量: {len(job_cards)}")
+
+            # 如果这一页没有找到任何卡片，可能已经到达最后一页
+            if len(job_cards) == 0:
+                print("没有找到更多职位，可能已到达最后一页")
+                return
+
+            # 处理本页的职位卡片
+            for card in job_cards:
+                # Only process if we have both title and institution
+                if card['title'] and card['institution'] and valid_jobs < num_jobs_to_fetch:
+                    valid_jobs += 1
+                    print(f"已解析职位卡片: {valid_jobs}/{num_jobs_to_fetch} ({int(valid_jobs/num_jobs_to_fetch*100)}%)")
+                    yield {
+                        "index": valid_jobs - 1,
+                        "job": {
+                            "title": card['title'],
+                            "institution": card['institution'],
+                            "location": card['location'],
+                            "link": card['link'],
+                            "posted": card['posted']
+                        },
+                    }
+
+            # 尝试下一页
+            current_page += 1
+
+    def fetch_detail(driver, work):
+        i, job = work['index'], work['job']
+        # 已处理过且列表信息未变化的职位，不再访问详情页
+        record = seen_index.lookup_listing(job['link'], listing_hash(job), source='academicpositions')
+        if record is not None:
+            print(f"职位已处理过且未变化，跳过 {i+1}/{num_jobs_to_fetch}: {job['title'][:30]}")
+            return record
+        # 页面未变化（缓存有效或服务器返回304）时直接复用上次的结果，跳过解析和AI
+        record = unchanged_record(job['link'], source='academicpositions')
+        if record is not None:
+            print(f"职位详情未变化，复用上次结果 {i+1}/{num_jobs_to_fetch}: {job['title'][:30]}")
+            return record
+        print(f"正在获取职位详情 {i+1}/{num_jobs_to_fetch}: {job['title'][:30]}...")
+        return fetch_job_detail(driver, job['link'])
+
+    # 单个职位出错只跳过该职位：各阶段捕获异常并打上 failed 标记，后续阶段直接放行
+    def detail_stage(work):
+        """阶段2：用浏览器池获取详情页"""
+        try:
+            detail = pool.run(fetch_detail, work)
+        except Exception as e:
+            print(f"获取职位详情失败，跳过 {work['index']+1}/{num_jobs_to_fetch}: {work['job']['title'][:30]} - {e}")
+            work['failed'] = True
+            return work
+        if isinstance(detail, dict):
+            work['record'] = detail
         else:
-            highlight = ollama_highlight(detail_title + '\n' + detail_content)
-        job_details.append({
+            work['detail'] = detail
+        return work
+
+    def extract_stage(work):
+        """阶段3：整理字段；详情内容与上次相同则复用上次的AI结果"""
+        if 'record' in work or work.get('failed'):
+            return work
+        job = work['job']
+        try:
+            detail_title, detail_content, inst2, loc2, posted, contract, start_date = work.pop('detail')
+            work['content_digest'] = content_hash(detail_title, detail_content)
+            record = seen_index.lookup_content(job['link'], work['content_digest'])
+        except Exception as e:
+            print(f"整理职位字段失败，跳过: {job['title'][:30]} - {e}")
+            work['failed'] = True
+            return work
+        if record is not None:
+            print("职位内容未变化，复用上次的AI亮点")
+            work['record'] = record
+            return work
+        # 优先用详情页数据补全
+        work['fields'] = {
             "title": detail_title or job['title'],
             "content": detail_content,
             "link": job['link'],
-            "institution": institution,
-            "location": location,
-            "posted": posted,
+            "institution": inst2 or job.get('institution', ''),
+            "location": loc2 or job.get('location', ''),
+            "posted": posted or job.get('posted', ''),
             "contract": contract,
             "start_date": start_date,
-            "highlight": highlight
-        })
-        print(f"职位 {i+1}/{len(jobs)} 处理完成")
-    driver.quit()
+        }
+        return work
+
+    def enrich_stage(work):
+        """阶段4：AI亮点"""
+        if 'record' in work or work.get('failed'):
+            return work
+        fields = work['fields']
+        if not enrich:
+            # 仅爬取模式：不调用AI，交给 enrich_worker.py 稍后处理
+            work['record'] = dict(fields, highlight='')
+            work['queued'] = True
+            return work
+        print(f"正在生成职位亮点: {fields['title'][:30]}...")
+        model = selected_model or "deepseek-r1:70b"
+        try:
+            highlight, used_model = generate_highlight(fields['title'] + '\n' + fields['content'], model=model)
+        except Exception as e:
+            # 原始职位仍加入待富化队列，由 enrich_worker.py 重新生成亮点
+            print(f"生成职位亮点失败，已加入待富化队列: {fields['title'][:30]} - {e}")
+            work['record'] = dict(fields, highlight='')
+            work['queued'] = True
+            return work
+        work['record'] = dict(fields, highlight=highlight)
+        if used_model == model:
+            work['enriched'] = True
+        else:
+            # 备用模型或简单提取的亮点只用于本次报告，不写入缓存，交给 enrich_worker.py 重新生成
+            print("亮点来自备用模型或简单提取，已加入待富化队列")
+            work['queued'] = True
+        return work
+
+    # 每完成一个职位就写入数据库
+    run_id = job_store.start_run('academicpositions', model=selected_model)
+
+    def persist_stage(work):
+        """阶段5：保存结果"""
+        if work.get('failed'):
+            return None
+        i, job, record = work['index'], work['job'], work['record']
+        if work.get('queued'):
+            # 主模型富化完成后才写入 seen_index/page_cache，避免下次运行跳过未富化的职位
+            job_store.enqueue('academicpositions', record, run_id=run_id,
+                              listing_digest=listing_hash(job), content_digest=work.get('content_digest'))
+            print(f"职位 {i+1}/{num_jobs_to_fetch} 已加入待富化队列: {job['title'][:30]}")
+            return record
+        job_store.save_job('academicpositions', record, run_id=run_id, model=selected_model)
+        if work.get('enriched'):
+            page_cache.put_record(job['link'], record)
+        seen_index.add(job['link'], source='academicpositions',
+                       listing_digest=listing_hash(job), content_digest=work.get('content_digest'))
+        print(f"职位 {i+1}/{num_jobs_to_fetch} 处理完成: {job['title'][:30]}")
+        return record
+
+    pipeline = Pipeline([
+        Stage("detail", detail_stage, workers=pool.size),
+        Stage("extract", extract_stage),
+        Stage("enrich", enrich_stage, workers=llm_workers),
+        Stage("persist", persist_stage),
+    ], queue_size=queue_size)
+    if enrich:
+        print(f"\n开始流水线处理（{pool.size} 个浏览器，{llm_workers} 个AI并发）...")
+    else:
+        print(f"\n开始流水线处理（{pool.size} 个浏览器，仅爬取，AI富化稍后由 enrich_worker.py 完成）...")
+    try:
+        job_details = [record for record in pipeline.run(discover_jobs()) if record is not None]
+    finally:
+        pool.quit()
+
+    job_store.finish_run(run_id)
+    pipeline.report()
+    wait_stats.report()
+    resource_report.report()
+    page_cache.report()
+    seen_index.report()
+    llm_cache.report()
+    circuit_breakers.report()
+    ollama.hedge_report()
     return job_details
 
 def generate_summary_article(job_details, today=None):
@@ -991,16 +1011,26 @@ def generate_report2(job_details, today=None):
 if __name__ == "__main__":
     print("=== 科研职位信息爬取工具 ===")
 
-    # Check AI server status first
-    print("正在检查AI服务器连接...")
-    if not check_ai_server("http://rf-calcul:11434"):
-        print("AI服务器连接失败，程序退出")
-        sys.exit(1)
-    print("AI服务器连接成功")
-    
-    # Let user select the model to use
-    selected_model = select_model()
-    print(f"\n已选择模型: {selected_model}")
+    # --scrape-only：只爬取并把职位加入待富化队列，AI亮点稍后由 enrich_worker.py 生成
+    scrape_only = '--scrape-only' in sys.argv
+    selected_model = None
+    if not scrape_only:
+        # Check AI server status first
+        print("正在检查AI服务器连接...")
+        if check_ai_server():
+            print("AI服务器连接成功")
+        else:
+            print("AI服务器连接失败，改为仅爬取模式（稍后运行 python enrich_worker.py 生成亮点）")
+            scrape_only = True
+
+    if not scrape_only:
+        # Let user select the model to use
+        selected_model = select_model()
+        print(f"\n已选择模型: {selected_model}")
+
+        # 后台预加载模型（带 keep_alive），与浏览器启动和列表抓取并行，避免第一个职位承担加载时间
+        print(f"正在后台预加载模型 {selected_model}（keep_alive {ollama.keep_alive}）...")
+        ollama.warm_up([selected_model], wait=False)
 
     # Prompt user for the number of jobs to scrape
     while True:
@@ -1023,14 +1053,16 @@ if __name__ == "__main__":
     print("尝试使用无头模式爬取...")
     job_details = []
     try:
-        job_details = fetch_academic_positions_jobs(use_headless=True, selected_model=selected_model, num_jobs_to_fetch=num_to_scrape)
+        job_details = fetch_academic_positions_jobs(use_headless=True, selected_model=selected_model,
+                                                    num_jobs_to_fetch=num_to_scrape, enrich=not scrape_only)
     except Exception as e:
         print(f"无头模式爬取失败: {e}")
 
     # 如果无头模式没有获取到职位，尝试使用有头模式
     if len(job_details) == 0:
         print("\n无头模式未能获取职位信息，尝试使用有头模式...")
-        job_details = fetch_academic_positions_jobs(use_headless=False, selected_model=selected_model, num_jobs_to_scrape=num_to_scrape)
+        job_details = fetch_academic_positions_jobs(use_headless=False, selected_model=selected_model,
+                                                    num_jobs_to_fetch=num_to_scrape, enrich=not scrape_only)
 
     print(f"成功获取 {len(job_details)} 个职位信息")
 
@@ -1058,5 +1090,9 @@ if __name__ == "__main__":
         f.write(report2_content)
     print("已生成 academic_job_summary_report2.md")
 
+    if scrape_only:
+        pending = job_store.queue_counts('academicpositions').get('pending', 0)
+        print(f"\n{pending} 个职位等待AI富化，请运行: python enrich_worker.py --source academicpositions")
+
     print("\n=== 完成 ===")
     print('已生成 academic_job_summary_report1.md 和 academic_job_summary_report2.md')
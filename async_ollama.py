@@ -0,0 +1,101 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ollama_client import OllamaClient, TruncatedGenerationError
+
+
+class ThreadedTransport:
+    """Default transport: runs the blocking OllamaClient calls on a dedicated thread pool.
+
+    Keeps everything the sync client does per call (pooled sessions, task
+    profiles, streaming with think filtering, circuit breakers). A cancelled
+    coroutine sets the call's cancel event, so the stream is closed at the
+    next chunk instead of running to the end.
+
+    Any object with an ``async generate_task(server, model, task, prompt,
+    **kwargs)`` method and a ``close()`` method can be used instead.
+    """
+
+    def __init__(self, client, max_workers):
+        self.client = client
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ollama")
+
+    async def generate_task(self, server, model, task, prompt, **kwargs):
+        cancel = threading.Event()
+        call = functools.partial(self.client.generate_task, server, model, task, prompt, cancel=cancel, **kwargs)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        except asyncio.CancelledError:
+            cancel.set()
+            raise
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class AsyncOllamaClient:
+    """asyncio front end for OllamaClient.
+
+    Any number of coroutines can await ``generate_task``; at most
+    ``per_server`` requests (default: the client's ``max_in_flight``) are
+    reserved on each server, so the rest wait without holding a thread. The
+    server is picked when a slot is reserved: the one with the fewest
+    reservations among those with a free slot, ties broken by the client's
+    load order. The sync client only sees a request once its thread starts,
+    so its own load figures cannot spread a burst of coroutines. A call that
+    fails moves on to a server it has not tried yet.
+    """
+
+    def __init__(self, client=None, transport=None, per_server=None):
+        self.client = client or OllamaClient()
+        self.per_server = per_server or self.client.max_in_flight
+        self.transport = transport or ThreadedTransport(
+            self.client, max_workers=max(1, len(self.client.servers)) * self.per_server)
+        self._reserved = {}
+        self._slot_freed = None
+        self._loop = None
+
+    async def _reserve(self, servers):
+        """Wait until one of ``servers`` has a free slot and reserve it on the least loaded one"""
+        # Reservations belong to one event loop; start afresh under a new one
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._reserved = {}
+            self._slot_freed = asyncio.Event()
+            self._loop = loop
+        while True:
+            free = [server for server in servers if self._reserved.get(server, 0) < self.per_server]
+            if free:
+                server = min(free, key=lambda server: self._reserved.get(server, 0))
+                self._reserved[server] = self._reserved.get(server, 0) + 1
+                return server
+            await self._slot_freed.wait()
+
+    def _release(self, server):
+        self._reserved[server] -= 1
+        # Wake every waiter to look again; later waiters wait on a fresh event
+        self._slot_freed.set()
+        self._slot_freed = asyncio.Event()
+
+    async def generate_task(self, model, task, prompt, host=None, **kwargs):
+        """Run ``task`` on the first server that answers and return the validated text"""
+        last_error = None
+        untried = self.client.server_order(host)
+        while untried:
+            server = await self._reserve(untried)
+            untried = [other for other in untried if other != server]
+            try:
+                return await self.transport.generate_task(server, model, task, prompt, **kwargs)
+            except TruncatedGenerationError:
+                # Another server would truncate the same way
+                raise
+            except Exception as e:
+                last_error = e
+            finally:
+                self._release(server)
+        raise last_error or RuntimeError("No Ollama server configured")
+
+    def close(self):
+        self.transport.close()
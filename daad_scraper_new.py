@@ -5,25 +5,56 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, InvalidSelectorException, StaleElementReferenceException
+import asyncio
 import time
 import re
 import os
 import sys
-from collections import defaultdict
-import winreg
-from bs4 import BeautifulSoup
-import json
+try:
+    import winreg
+except ImportError:  # Not on Windows (e.g. the enrichment worker on a Linux box)
+    winreg = None
 from datetime import datetime
 import requests
+from http_fetch import fetch_static_soup, select_text, cache_rendered_page, unchanged_record
+from page_cache import page_cache
+from seen_index import seen_index, listing_hash, content_hash
+from job_store import job_store, DEFAULT_DB_PATH
+from llm_cache import llm_cache
+from ollama_client import OllamaClient, OllamaResponseError, TruncatedGenerationError, circuit_breakers
+from async_ollama import AsyncOllamaClient
+from pipeline import Pipeline, Stage
+from page_wait import wait_for_document_ready, wait_for_network_idle, wait_for_selector, wait_stats
+from resource_blocking import apply_resource_blocking, resource_report
+from js_extract import probe_selectors, filter_elements_by_text
 
 # Ensure UTF-8 encoding for standard output
 sys.stdout.reconfigure(encoding='utf-8')
 
-# Initialize global variables
-default_server_url = "http://rf-calcul:11434"  # Default to rf-calcul
+# Shared client for all LLM calls (keep-alive session per server, balanced over $OLLAMA_HOSTS)
+ollama = OllamaClient()
+# Async front end on the same client (shared server state and breakers), capped per server
+async_ollama = AsyncOllamaClient(ollama)
+
+# Prompt versions for the LLM output cache; bump when a prompt changes
+HIGHLIGHT_PROMPT_VERSION = "daad-highlight-1"
+TRANSLATION_PROMPT_VERSION = "daad-translate-1"
+
+# Per-task generation limits (num_predict, stop strings, no thinking) live in ollama_client.GENERATION_PROFILES
+
+# check_model_availability / check_ai_server 输出的模型状态
+MODEL_STATUS_LABELS = {
+    "loaded": "已加载到内存",
+    "unloaded": "已安装，未加载（首次调用需加载）",
+    "missing": "不存在",
+    "unreachable": "服务器无法连接",
+}
 
 def set_windows_proxy_from_pac(pac_url):
     """Set Windows system proxy from PAC URL"""
+    if winreg is None:
+        print("Not on Windows, system proxy left unchanged")
+        return
     try:
         reg_path = r"Software\\Microsoft\\Windows\\CurrentVersion\\Internet Settings"
         with winreg.OpenKey(winreg.HKEY_CURRENT_USER, reg_path, 0, winreg.KEY_SET_VALUE) as key:
@@ -32,8 +63,18 @@ def set_windows_proxy_from_pac(pac_url):
     except Exception as e:
         print(f"Failed to set system proxy: {e}")
 
-def setup_driver(use_headless=True):
-    """Set up and return a configured Chrome WebDriver with enhanced error handling"""
+def prepare_driver(driver, block_resources=True):
+    """Apply per-driver CDP settings after the browser has started"""
+    if block_resources:
+        apply_resource_blocking(driver)
+    return driver
+
+def setup_driver(use_headless=True, block_resources=True):
+    """Set up and return a configured Chrome WebDriver with enhanced error handling
+
+    With ``block_resources`` images, fonts, media, analytics and ad requests
+    are blocked through CDP.
+    """
     options = webdriver.ChromeOptions()
     
     # System-specific settings for stability
@@ -80,12 +121,12 @@ def setup_driver(use_headless=True):
                 service = Service("./chromedriver.exe")
                 driver = webdriver.Chrome(service=service, options=options)
                 print("Successfully initialized Chrome driver with local chromedriver.exe")
-                return driver
+                return prepare_driver(driver, block_resources)
             except Exception as e:
                 print(f"Local chromedriver.exe failed, trying system ChromeDriver: {str(e)}")
                 driver = webdriver.Chrome(options=options)
                 print("Successfully initialized Chrome driver with system ChromeDriver")
-                return driver
+                return prepare_driver(driver, block_resources)
         except Exception as e:
             last_exception = e
             print(f"Attempt {attempt + 1} failed: {str(e)}")
@@ -98,7 +139,7 @@ def setup_driver(use_headless=True):
         service = Service(chromedriver_path)
         driver = webdriver.Chrome(service=service, options=options)
         print(f"Successfully initialized Chrome driver with chromedriver at: {chromedriver_path}")
-        return driver
+        return prepare_driver(driver, block_resources)
     except Exception as final_e:
         error_msg = f"Failed to initialize Chrome driver after {max_retries} attempts.\n"
         error_msg += f"Last error: {str(last_exception)}\n"
@@ -122,7 +163,8 @@ def get_page_content(driver, url):
     for attempt in range(max_retries):
         try:
             driver.get(url)
-            time.sleep(3)  # Initial wait
+            wait_for_document_ready(driver, timeout=10)
+            resource_report.record_page(driver)
             return True
         except Exception as e:
             if attempt < max_retries - 1:
@@ -156,146 +198,215 @@ def extract_text_safely(element, selector):
         print(f"Failed to extract text with selector {selector}: {str(e)}")
         return ""
 
-def fetch_job_detail(driver, url, model="deepseek-r1:70b"):
-    """Fetch detailed job information from DAAD posting"""
+# Detail page selectors, shared by the static HTML and the browser code paths
+DETAIL_CONTENT_SELECTORS = [
+    'main',
+    'article',
+    '.content-detail',
+    '.deg-content',
+    '.c-content-area'
+]
+
+DETAIL_TITLE_SELECTORS = [
+    'h1', 
+    '.deg-title',
+    '.content-title',
+    'article h2'
+]
+
+def fetch_detail_fields_static(url):
+    """Extract title and content from the server-rendered HTML, or None if the browser is needed"""
+    soup = fetch_static_soup(url, source='daad')
+    if soup is None:
+        return None
+    content = select_text(soup, DETAIL_CONTENT_SELECTORS)
+    if not content:
+        print("Static HTML has no content node, falling back to browser")
+        return None
+    return select_text(soup, DETAIL_TITLE_SELECTORS), content
+
+def fetch_detail_fields_browser(driver, url):
+    """Extract title and content from the rendered page, or None if it failed to load"""
     if not get_page_content(driver, url):
         return None
 
-    try:
-        # Main content selectors for DAAD
-        content_selectors = [
-            'main',
-            'article',
-            '.content-detail',
-            '.deg-content',
-            '.c-content-area'
-        ]
+    content = ""
+    selector, element = find_first_element(driver, DETAIL_CONTENT_SELECTORS)
+    if element:
+        try:
+            content = element.text
+        except Exception as e:
+            print(f"Failed to get content with selector '{selector}': {e}")
 
-        content = ""
-        for selector in content_selectors:
-            try:
-                if validate_selector(selector):
-                    element = find_element_with_retry(driver, By.CSS_SELECTOR, selector)
-                    if element:
-                        content = element.text
-                        if content:
-                            break
-            except Exception as e:
-                print(f"Failed to get content with selector '{selector}': {e}")
-                continue        
-
-        # Extract structured data
-        info = {
-            'title': '',
-            'content': content,
-            'institution': '',
-            'location': '',
-            'requirements': '',
-            'contract': '',
-            'link': url,
-            'highlight': ''  # Will be filled with AI-generated highlights
-        }
-
-        # Extract title
-        title_selectors = [
-            'h1', 
-            '.deg-title',
-            '.content-title',
-            'article h2'
-        ]
-        for selector in title_selectors:
+    title = ''
+    selector, element = find_first_element(driver, DETAIL_TITLE_SELECTORS, timeout=2)
+    if element:
+        title = extract_text_with_fallback(element, selector)
+
+    return title, content
+
+def fetch_job_fields(driver, url):
+    """Fetch a DAAD posting: the previous record if the page is unchanged, else (title, content), or None
+
+    The page is parsed from a plain HTTP response when possible and only
+    rendered in the browser if the static HTML lacks the content node. An
+    unchanged page (fresh in the page cache or answered with 304 Not
+    Modified) returns the previous translated/enriched result.
+    """
+    record = unchanged_record(url, source='daad')
+    if record is not None:
+        print(f"Page unchanged, reusing previous result for {url}")
+        return record
+
+    fields = fetch_detail_fields_static(url)
+    if fields is None:
+        fields = fetch_detail_fields_browser(driver, url)
+        if fields is not None and fields[1]:
+            cache_rendered_page(driver, url, source='daad')
+    return fields
+
+def extract_job_info(url, title, content):
+    """Structured fields found in a posting's text, untranslated and without highlight"""
+    info = {
+        'title': title,
+        'content': content,
+        'institution': '',
+        'location': '',
+        'requirements': '',
+        'contract': '',
+        'link': url,
+        'highlight': ''  # Will be filled with AI-generated highlights
+    }
+
+    # Extract other information from content
+    content_lower = content.lower()
+    
+    # Institution
+    inst_patterns = [
+        r'university of [\w\s]+',
+        r'[\w\s]+ university',
+        r'institut(?:e)? (?:of|für) [\w\s]+',
+        r'max planck [\w\s]+',
+        r'helmholtz [\w\s]+'
+    ]
+    for pattern in inst_patterns:
+        match = re.search(pattern, content_lower, re.IGNORECASE)
+        if match:
+            info['institution'] = match.group(0).title()
+            break
+
+    # Location
+    loc_patterns = [
+        r'located in (?:[\w\s,]+)',
+        r'based in (?:[\w\s,]+)',
+        r'(?:position in|at) (?:[\w\s,]+), germany',
+    ]
+    for pattern in loc_patterns:
+        match = re.search(pattern, content_lower, re.IGNORECASE)
+        if match:
+            info['location'] = match.group(0).replace('located in ', '').replace('based in ', '').title()
+            break
+
+    # Requirements
+    req_section = re.search(r'requirements?:[\s\n]*(.*?)(?=\n\n|\Z)', content, re.IGNORECASE | re.DOTALL)
+    if req_section:
+        info['requirements'] = req_section.group(1).strip()
+
+    # Contract/Duration
+    duration_patterns = [
+        r'(?:duration|period):?\s*((?:\d+|one|two|three|four)\s+(?:year|month)s?)',
+        r'contract (?:period|length):?\s*((?:\d+|one|two|three|four)\s+(?:year|month)s?)',
+        r'(?:fixed[- ]term|temporary) contract for (\d+\s+(?:year|month)s?)',
+    ]
+    for pattern in duration_patterns:
+        match = re.search(pattern, content, re.IGNORECASE)
+        if match:
+            info['contract'] = match.group(1)
+            break
+
+    return info
+
+def enrich_job_info(info, model, content_digest=None):
+    """Translate the fields of ``info`` to Chinese and add the AI highlight (the LLM part of a posting).
+
+    Returns ``(info, enriched)``. ``enriched`` is False when a translation
+    failed (the German text is kept) or the highlight came from the backup
+    model or a fallback; such results are not recorded in the page cache or
+    seen index, so they are not reused on later runs.
+    """
+    url = info['link']
+    # Translate relevant fields to Chinese
+    fields_to_translate = ['title', 'institution', 'location', 'requirements', 'contract']
+    print(f"Translating fields for URL: {url} using model: {model}")
+    translated = True
+    for field_key in fields_to_translate:
+        if info[field_key]: # Check if the field has content
+            original_text = info[field_key]
+            # 'model' is the run's selected model
             try:
-                if validate_selector(selector):
-                    element = find_element_with_retry(driver, By.CSS_SELECTOR, selector)
-                    if element:
-                        info['title'] = extract_text_with_fallback(element, selector)
-                        if info['title']:
-                            break
+                translated_text = translate_german_to_chinese(original_text, model, strict=True)
             except Exception as e:
-                print(f"Failed to get title with selector '{selector}': {e}")
-                continue
+                print(f"Failed to translate {field_key}, keeping the original: {e}")
+                translated_text = original_text
+                translated = False
+            info[field_key] = translated_text
+            # Limit print length to avoid overly long log lines
+            original_snippet = original_text.strip().replace('\n', ' ')[:50]
+            translated_snippet = translated_text.strip().replace('\n', ' ')[:50]
+            print(f"Translated {field_key}: '{original_snippet}...' to '{translated_snippet}...'")
+        else:
+            print(f"Skipping translation for empty field: {field_key}")
+
+    # Generate AI highlights for the position using the selected model
+    print("Generating AI highlights...")
+    # info['title'] is now translated. info['content'] remains original.
+    # ollama_highlight's prompt has its own instruction to translate German parts if found.
+    text_for_highlight = info['title'] + '\n' + info['content']
+    model = model or "deepseek-r1:70b"
+    enriched = False
+    try:
+        highlight, used_model = generate_highlight(text_for_highlight, model=model)
+        info['highlight'] = highlight
+        print("Successfully added AI highlights")
+        enriched = used_model == model and translated
+        if enriched:
+            page_cache.put_record(url, info)
+            seen_index.add(url, source='daad', content_digest=content_digest)
+    except Exception as e:
+        print(f"Failed to generate AI highlights: {e}")
+        info['highlight'] = "Opportunity for research and academic development in a supportive environment."
 
-        # Extract other information from content
-        content_lower = content.lower()
-        
-        # Institution
-        inst_patterns = [
-            r'university of [\w\s]+',
-            r'[\w\s]+ university',
-            r'institut(?:e)? (?:of|für) [\w\s]+',
-            r'max planck [\w\s]+',
-            r'helmholtz [\w\s]+'
-        ]
-        for pattern in inst_patterns:
-            match = re.search(pattern, content_lower, re.IGNORECASE)
-            if match:
-                info['institution'] = match.group(0).title()
-                break
-
-        # Location
-        loc_patterns = [
-            r'located in (?:[\w\s,]+)',
-            r'based in (?:[\w\s,]+)',
-            r'(?:position in|at) (?:[\w\s,]+), germany',
-        ]
-        for pattern in loc_patterns:
-            match = re.search(pattern, content_lower, re.IGNORECASE)
-            if match:
-                info['location'] = match.group(0).replace('located in ', '').replace('based in ', '').title()
-                break
-
-        # Requirements
-        req_section = re.search(r'requirements?:[\s\n]*(.*?)(?=\n\n|\Z)', content, re.IGNORECASE | re.DOTALL)
-        if req_section:
-            info['requirements'] = req_section.group(1).strip()
-
-        # Contract/Duration
-        duration_patterns = [
-            r'(?:duration|period):?\s*((?:\d+|one|two|three|four)\s+(?:year|month)s?)',
-            r'contract (?:period|length):?\s*((?:\d+|one|two|three|four)\s+(?:year|month)s?)',
-            r'(?:fixed[- ]term|temporary) contract for (\d+\s+(?:year|month)s?)',
-        ]
-        for pattern in duration_patterns:
-            match = re.search(pattern, content, re.IGNORECASE)
-            if match:
-                info['contract'] = match.group(1)
-                break
-
-        # Translate relevant fields to Chinese
-        fields_to_translate = ['title', 'institution', 'location', 'requirements', 'contract']
-        print(f"Translating fields for URL: {url} using model: {model}")
-        for field_key in fields_to_translate:
-            if info[field_key]: # Check if the field has content
-                original_text = info[field_key]
-                # 'model' is the selected_model passed to fetch_job_detail
-                translated_text = translate_german_to_chinese(original_text, model) 
-                info[field_key] = translated_text
-                # Limit print length to avoid overly long log lines
-                original_snippet = original_text.strip().replace('\n', ' ')[:50]
-                translated_snippet = translated_text.strip().replace('\n', ' ')[:50]
-                print(f"Translated {field_key}: '{original_snippet}...' to '{translated_snippet}...'")
-            else:
-                print(f"Skipping translation for empty field: {field_key}")
+    return info, enriched
 
-        # Generate AI highlights for the position using the selected model
-        print("Generating AI highlights...")
-        # info['title'] is now translated. info['content'] remains original.
-        # ollama_highlight's prompt has its own instruction to translate German parts if found.
-        text_for_highlight = info['title'] + '\n' + info['content']
-        try:
-            highlight = ollama_highlight(text_for_highlight, model=model or "deepseek-r1:70b")
-            info['highlight'] = highlight
-            print("Successfully added AI highlights")
-        except Exception as e:
-            print(f"Failed to generate AI highlights: {e}")
-            info['highlight'] = "Opportunity for research and academic development in a supportive environment."
+def fetch_job_detail(driver, url, model="deepseek-r1:70b"):
+    """Fetch detailed job information from DAAD posting
 
-        return info
+    The page is parsed from a plain HTTP response when possible and only
+    rendered in the browser if the static HTML lacks the content node. If the
+    page is unchanged since the last run (fresh in the page cache or answered
+    with 304 Not Modified), the previous translated/enriched result is reused.
+    """
+    fields = fetch_job_fields(driver, url)
+    if fields is None or isinstance(fields, dict):
+        return fields
+    title, content = fields
+
+    # Same text as last time: reuse the translations and highlight instead of calling the LLM
+    content_digest = content_hash(title, content)
+    record = seen_index.lookup_content(url, content_digest)
+    if record is not None:
+        print(f"Content unchanged, reusing previous result for {url}")
+        return record
 
+    try:
+        return enrich_job_info(extract_job_info(url, title, content), model, content_digest)[0]
     except Exception as e:
         print(f"Error fetching job details: {e}")
         return None
 
+# Keywords that mark a listing element as a relevant position
+LISTING_KEYWORDS = ['phd', 'doctoral', 'research', 'position', 'scholarship']
+
 def find_job_listings(driver, num_to_fetch=10):
     """Find job listing elements on the page"""
     print("Looking for job search functionality...")
@@ -306,7 +417,7 @@ def find_job_listings(driver, num_to_fetch=10):
         WebDriverWait(driver, 20).until(
             EC.presence_of_element_located((By.TAG_NAME, "body"))
         )
-        time.sleep(2)  # Give extra time for dynamic content to load
+        wait_for_network_idle(driver, timeout=5)  # Give dynamic content time to load
         
         # Wait for any loading indicators to disappear
         try:
@@ -337,37 +448,24 @@ def find_job_listings(driver, num_to_fetch=10):
             
             try:
                 print(f"Trying selector: {selector}")
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
+                # Text of every match is evaluated and filtered in one script call
+                total, matches = filter_elements_by_text(
+                    driver, selector, LISTING_KEYWORDS, limit=num_to_fetch - len(job_elements)
+                )
                 
-                if not elements:
+                if not total:
                     continue
                     
-                print(f"Found {len(elements)} potential elements with {selector}")
+                print(f"Found {total} potential elements with {selector}")
                 
-                # Process each element found with this selector
-                for element in elements:
-                    try:
-                        # Try to get element text
-                        text = driver.execute_script("""
-                            try {
-                                return (arguments[0].innerText || arguments[0].textContent || '').replace(/\\s+/g, ' ').trim().toLowerCase();
-                            } catch(e) {
-                                return '';
-                            }
-                        """, element)
-                        
-                        if text and any(kw in text for kw in ['phd', 'doctoral', 'research', 'position', 'scholarship']):
-                            job_elements.append(element)
-                            preview = ' '.join(word.capitalize() for word in text.split()[:6])
-                            print(f"Found relevant position: {preview}...")
-                            
-                            if len(job_elements) >= num_to_fetch:
-                                print("Found enough positions, stopping search...")
-                                return job_elements
-                                
-                    except Exception as e:
-                        print(f"Error processing element: {e}")
-                        continue
+                for index, element, preview in matches:
+                    job_elements.append(element)
+                    preview = ' '.join(word.capitalize() for word in preview.split())
+                    print(f"Found relevant position: {preview}...")
+                    
+                    if len(job_elements) >= num_to_fetch:
+                        print("Found enough positions, stopping search...")
+                        return job_elements
             
             except Exception as e:
                 print(f"Error with selector {selector}: {e}")
@@ -377,18 +475,12 @@ def find_job_listings(driver, num_to_fetch=10):
         if not job_elements:
             print("Trying direct link search...")
             try:
-                for link in driver.find_elements(By.TAG_NAME, 'a'):
-                    try:
-                        href = link.get_attribute('href') or ''
-                        text = link.text.lower()
-                        if href and any(kw in (text + ' ' + href.lower()) 
-                                      for kw in ['phd', 'doctoral', 'position']):
-                            job_elements.append(link)
-                            print(f"Found relevant link: {text[:50]}...")
-                            if len(job_elements) >= num_to_fetch:
-                                break
-                    except Exception as e:
-                        continue
+                _, matches = filter_elements_by_text(
+                    driver, 'a', ['phd', 'doctoral', 'position'], limit=num_to_fetch, match_href=True
+                )
+                for index, link, preview in matches:
+                    job_elements.append(link)
+                    print(f"Found relevant link: {preview[:50]}...")
             except Exception as e:
                 print(f"Error in link search: {e}")
         
@@ -407,19 +499,27 @@ def find_job_listings(driver, num_to_fetch=10):
             print(f"Failed to save debug information: {debug_e}")
         return []
 
-def fetch_daad_jobs(use_headless=True, selected_model=None, num_jobs=10):
+def fetch_daad_jobs(use_headless=True, selected_model=None, num_jobs=10, llm_workers=2, queue_size=4, enrich=True):
     """Main function to fetch PhD positions from DAAD
     
     Args:
         use_headless (bool): Whether to use headless browser mode
         selected_model (str): The AI model to use for generating highlights
         num_jobs (int): The number of jobs to fetch
+        llm_workers (int): Positions translated and highlighted at the same time
+        queue_size (int): Capacity of the queues between pipeline stages
+        enrich (bool): Translate and highlight now; if False, new or changed
+            positions are saved untranslated and queued for enrich_worker.py
+
+    Each processed position is saved to the job store as soon as it is done.
     """
     set_windows_proxy_from_pac("http://127.0.0.1:55624/proxy.pac")
     base_url = "https://www2.daad.de/deutschland/promotion/phd/en/13306-phd-germany-database/"
 
     driver = None
     jobs = []
+    run_id = job_store.start_run('daad', model=selected_model)
+    run_status = 'completed'
     
     try:
         driver = setup_driver(use_headless)
@@ -442,12 +542,12 @@ def fetch_daad_jobs(use_headless=True, selected_model=None, num_jobs=10):
                 else:
                     print("No job elements found, retrying...")
                     driver.refresh()
-                    time.sleep(3)
+                    wait_for_document_ready(driver, timeout=10)
             except Exception as e:
                 print(f"Error in attempt {attempt + 1}: {e}")
                 if attempt < max_retries - 1:
                     driver.refresh()
-                    time.sleep(3)
+                    wait_for_document_ready(driver, timeout=10)
 
         if not job_elements:
             print("Failed to find any job elements after all retries")
@@ -502,54 +602,137 @@ def fetch_daad_jobs(use_headless=True, selected_model=None, num_jobs=10):
             print("No valid job information found")
             return []
 
-        # Process each job with progress tracking
+        # Process the positions as a pipeline: page fetch -> field extraction -> translation
+        # and highlight -> persistence, so the browser keeps fetching while the LLM works
         total_jobs = len(job_info_list)
         print(f"\nFound {total_jobs} positions to process")
-        
-        for idx, job_info in enumerate(job_info_list, 1):
-            try:
-                print(f"\nProcessing position {idx}/{total_jobs}")
-                print(f"Title: {job_info['title'][:100]}...")
-                print(f"URL: {job_info['link']}")
-                
-                # Get detailed job information with retry logic
-                details = None
-                retries = 3
-                for attempt in range(retries):
-                    try:
-                        details = fetch_job_detail(driver, job_info['link'], model=selected_model)
-                        if details:
-                            break
-                        print(f"Attempt {attempt + 1} failed, retrying...")
-                        time.sleep(2)
-                    except Exception as e:
-                        print(f"Error in attempt {attempt + 1}: {e}")
-                        if attempt < retries - 1:
-                            time.sleep(2)
-            
-                if details:
-                    # Ensure we have at least a title
-                    if not details.get('title'):
-                        details['title'] = job_info['title']
-                    jobs.append(details)
-                    print(f"Successfully processed position {idx}/{total_jobs}")
-                else:
-                    print(f"Failed to get details for position {idx}")
 
+        def detail_stage(work):
+            idx, job_info = work['index'], work['job']
+            print(f"\nProcessing position {idx}/{total_jobs}")
+            print(f"Title: {job_info['title'][:100]}...")
+            print(f"URL: {job_info['link']}")
+
+            # Skip postings already processed whose listing entry has not changed
+            record = seen_index.lookup_listing(job_info['link'], listing_hash(job_info), source='daad')
+            if record:
+                work['record'] = record
+                work['listing_hit'] = True
+                print(f"Position {idx}/{total_jobs} already processed and unchanged, skipped")
+                return work
+
+            # Get the page with retry logic (the only stage that uses the browser)
+            fields = None
+            retries = 3
+            for attempt in range(retries):
+                try:
+                    fields = fetch_job_fields(driver, job_info['link'])
+                    if fields:
+                        break
+                    print(f"Attempt {attempt + 1} failed, retrying...")
+                    time.sleep(2)
+                except Exception as e:
+                    print(f"Error in attempt {attempt + 1}: {e}")
+                    if attempt < retries - 1:
+                        time.sleep(2)
+            if isinstance(fields, dict):
+                work['record'] = fields
+            elif fields:
+                work['fields'] = fields
+            return work
+
+        def extract_stage(work):
+            if 'fields' not in work:
+                return work
+            url = work['job']['link']
+            title, content = work.pop('fields')
+            # Same text as last time: reuse the translations and highlight instead of calling the LLM
+            content_digest = content_hash(title, content)
+            record = seen_index.lookup_content(url, content_digest)
+            if record is not None:
+                print(f"Content unchanged, reusing previous result for {url}")
+                work['record'] = record
+                return work
+            try:
+                work['info'] = extract_job_info(url, title, content)
+                work['content_digest'] = content_digest
             except Exception as e:
-                print(f"Error processing job {idx}: {e}")
-                continue
+                print(f"Error processing job {work['index']}: {e}")
+            return work
+
+        def enrich_stage(work):
+            if 'info' not in work:
+                return work
+            if not enrich:
+                # Scrape-only run: the LLM part is left to enrich_worker.py
+                work['record'] = work.pop('info')
+                work['queued'] = True
+                return work
+            info = work.pop('info')
+            raw_info = dict(info)
+            try:
+                work['record'], enriched = enrich_job_info(info, selected_model, work['content_digest'])
+                if not enriched:
+                    # Keep the fallback result for this run's report, re-enrich the raw posting later
+                    print("Translation or highlight fell back, queued for enrich_worker.py")
+                    work['queued'] = True
+                    work['raw'] = raw_info
+            except Exception as e:
+                print(f"Error processing job {work['index']}: {e}")
+            return work
+
+        def persist_stage(work):
+            idx, job_info, details = work['index'], work['job'], work.get('record')
+            if not details:
+                print(f"Failed to get details for position {idx}")
+                return None
+            # Ensure we have at least a title
+            if not details.get('title'):
+                details['title'] = job_info['title']
+            if work.get('queued'):
+                # seen_index/page_cache are only updated once the posting was enriched with the selected model
+                queued = work.get('raw') or details
+                if not queued.get('title'):
+                    queued['title'] = job_info['title']
+                job_store.enqueue('daad', queued, run_id=run_id, listing_digest=listing_hash(job_info),
+                                  content_digest=work['content_digest'])
+                print(f"Position {idx}/{total_jobs} queued for enrichment")
+                return details
+            job_store.save_job('daad', details, run_id=run_id, model=selected_model)
+            if not work.get('listing_hit'):
+                seen_index.add(job_info['link'], source='daad', listing_digest=listing_hash(job_info))
+            print(f"Successfully processed position {idx}/{total_jobs}")
+            return details
+
+        pipeline = Pipeline([
+            Stage("detail", detail_stage),
+            Stage("extract", extract_stage),
+            Stage("enrich", enrich_stage, workers=llm_workers),
+            Stage("persist", persist_stage),
+        ], queue_size=queue_size)
+        results = pipeline.run({'index': idx, 'job': job_info} for idx, job_info in enumerate(job_info_list, 1))
+        jobs.extend(details for details in results if details)
+        pipeline.report()
 
         print(f"\nSuccessfully processed {len(jobs)}/{total_jobs} positions")
 
     except Exception as e:
         print(f"Error in main job fetching process: {e}")
+        run_status = 'failed'
     finally:
         if driver:
             try:
                 driver.quit()
             except:
                 pass
+        job_store.finish_run(run_id, status=run_status)
+        wait_stats.report()
+        resource_report.report()
+        page_cache.report()
+        seen_index.report()
+        llm_cache.report()
+        circuit_breakers.report()
+        ollama.hedge_report()
 
     return jobs
 
@@ -660,145 +843,57 @@ def scrape_daad_phd_positions(driver, url):
         print(f"Error during scraping: {str(e)}")
         raise
 
-def list_available_models(host="http://rf-calcul:11434"):
+def list_available_models(host=None):
     """List all available models on the server"""
     try:
-        resp = requests.get(f"{host}/api/tags", timeout=30)
-        resp.raise_for_status()
-        models_data = resp.json()
-        available_models = []
-        
-        for model_info in models_data.get('models', []):
-            model_name = model_info.get('name', '')
-            if model_name:
-                available_models.append(model_name)
-                
-        return available_models
+        return ollama.list_models(ollama.server_order(host)[0])
     except Exception as e:
         print(f"获取模型列表失败: {e}")
         return []
 
 def check_model_availability(model, host=None):
-    """Check if a specific model is available and loaded. Returns True if available, False if not."""
-    global default_server_url
-    servers = [host] if host else ["http://rf-calcul:11434"]
-    if default_server_url:
-        # Put the last successful server first
-        if default_server_url in servers:
-            servers.remove(default_server_url)
-        servers.insert(0, default_server_url)
-
-    for server in servers:
-        try:
-            # First check if the model exists in the available tags
-            try:
-                tags_resp = requests.get(f"{server}/api/tags", timeout=30)
-                tags_resp.raise_for_status()
-                tags_data = tags_resp.json()
-
-                model_exists = False
-                for model_info in tags_data.get('models', []):
-                    if model_info.get('name') == model:
-                        model_exists = True
-                        print(f"模型 {model} 在服务器 {server} 上存在")
-                        # Update default server URL on success
-                        default_server_url = server
-                        return True
-
-                if not model_exists:
-                    print(f"模型 {model} 在服务器 {server} 上不存在")
-                    continue
-            except Exception as e:
-                print(f"服务器 {server} 检查模型列表失败: {e}")
-                continue
-
-            # Test the model with a simple prompt
-            print(f"正在测试服务器 {server} 的模型 {model} 响应...")
-            resp = requests.post(
-                f"{server}/api/generate",
-                json={"model": model, "prompt": "test", "stream": False},
-                timeout=60
-            )
-            resp.raise_for_status()
-            print(f"模型 {model} 在服务器 {server} 上测试成功")
-            # Update default server URL on success
-            default_server_url = server
-            return True
-
-        except requests.exceptions.Timeout:
-            print(f"服务器 {server} 的模型 {model} 检查超时")
-            continue
-        except Exception as e:
-            print(f"服务器 {server} 的模型 {model} 检查失败: {e}")
-            continue
+    """Check if a specific model is installed, reporting whether it is loaded. Returns True if available, False if not.
 
+    Only reads /api/tags (cached) and /api/ps, so it never triggers a model load.
+    """
+    statuses = ollama.availability(model, [host] if host else None)
+    for server, status in statuses.items():
+        print(f"服务器 {server} 上的模型 {model}: {MODEL_STATUS_LABELS[status]}")
+    if any(status in ("loaded", "unloaded") for status in statuses.values()):
+        return True
     print(f"所有服务器上都未找到可用的模型 {model}")
     return False
 
-def check_ai_server(host="http://rf-calcul:11434"):
-    """Check if the AI server is available and models are loaded"""
-    # List of servers to try
-    servers = ["http://rf-calcul:11434"]
-    
-    for server in servers:
-        try:
-            # First check if the server is running by checking the version endpoint
-            print(f"正在检查服务器 {server} 连接...")
-            resp = requests.get(f"{server}/api/version", timeout=5)  # Short timeout for quick check
-            resp.raise_for_status()
-            version = resp.json().get('version', 'unknown')
-            print(f"服务器连接成功，Ollama 版本: {version}")
-            
-            # Set the successful server as the default host
-            global default_server_url
-            default_server_url = server
-            
-            # Check required models
-            models = ["deepseek-r1:70b", "qwen3:30b-a3b"]
-            available_models = []
+def check_ai_server(host=None):
+    """Check if the AI server is available and models are loaded.
 
-            # First try to get the list of all models
-            try:
-                print("正在获取可用模型列表...")
-                tags_resp = requests.get(f"{server}/api/tags", timeout=30)
-                tags_resp.raise_for_status()
-                tags_data = tags_resp.json()
-
-                all_models = [model_info.get('name') for model_info in tags_data.get('models', [])]
-                print(f"服务器上的所有模型: {', '.join(all_models)}")
-
-                # Check if our required models are in the list
-                for model in models:
-                    if model in all_models:
-                        available_models.append(model)
-                        print(f"模型 {model} 在服务器上存在")
-                    else:
-                        print(f"模型 {model} 在服务器上不存在")
-            except Exception as e:
-                print(f"获取模型列表失败: {e}")
-                print("将尝试直接检查每个模型...")
-
-            # If we couldn't get the list or not all required models were found,
-            # check each model individually
-            if len(available_models) < len(models):
-                for model in models:
-                    if model not in available_models and check_model_availability(model, server):
-                        available_models.append(model)
-                        print(f"模型 {model} 可用")
-
-            if not available_models:
-                print(f"在服务器 {server} 上没有可用的模型")
-                continue
+    Only ``host`` is checked when given; otherwise every configured server
+    ($OLLAMA_HOSTS) is probed.
+    """
+    # Check required models
+    models = ["deepseek-r1:70b", "qwen3:30b-a3b"]
+    servers = [host.rstrip("/")] if host else list(ollama.servers)
+
+    # Probe the servers at once with a short timeout; the first healthy one with a model wins
+    print(f"正在并行检查服务器连接: {', '.join(servers)}")
+    health = ollama.find_server(models, servers=servers)
+    if health is None:
+        table = ollama.health_table()
+        for failed in (table[server] for server in servers if server in table):
+            if failed.healthy:
+                print(f"在服务器 {failed.server} 上没有可用的模型")
+            else:
+                print(f"服务器 {failed.server} 连接失败: {failed.error}")
+        print("所有服务器都连接失败")
+        return False
 
-            print(f"找到 {len(available_models)}/{len(models)} 个可用模型")
-            return True
-            
-        except Exception as e:
-            print(f"服务器 {server} 连接失败: {e}")
-            continue
-    
-    print("所有服务器都连接失败")
-    return False
+    print(f"服务器 {health.server} 连接成功（{health.elapsed:.1f}秒），Ollama 版本: {health.version}")
+    for model in models:
+        print(f"模型 {model}: {MODEL_STATUS_LABELS[health.models[model]]}")
+
+    available_models = [model for model in models if health.has(model)]
+    print(f"找到 {len(available_models)}/{len(models)} 个可用模型")
+    return True
 
 def select_model():
     """Let user select which model to use"""
@@ -825,18 +920,12 @@ def select_model():
             print("\n已取消选择，使用默认模型 deepseek-r1:70b")
             return "deepseek-r1:70b"
 
-def ollama_highlight(text, model="deepseek-r1:70b", host=None):
-    """生成职位亮点，如果主模型失败则使用备用模型"""
-    global default_server_url
-    servers = [host] if host else ["http://rf-calcul:11434"]
-    if default_server_url:
-        if default_server_url in servers:
-            servers.remove(default_server_url)
-        servers.insert(0, default_server_url)    
-        example = """
-        蒙特利尔大学（Université de Montréal）位于北美著名文化名城蒙特利尔，城市环境宜居，交通便利，四季分明。校园提供卓越的学术环境，拥有世界级的研究资源和多元文化的国际社区。蒙特利尔作为加拿大第二大城市，文化氛围浓厚，生活成本适中，是国际学生的理想选择。
-        """    
-        prompt = (
+def build_highlight_prompts(text):
+    """Prompt for the primary model and the simpler prompt for the backup model"""
+    example = """
+    蒙特利尔大学（Université de Montréal）位于北美著名文化名城蒙特利尔，城市环境宜居，交通便利，四季分明。校园提供卓越的学术环境，拥有世界级的研究资源和多元文化的国际社区。蒙特利尔作为加拿大第二大城市，文化氛围浓厚，生活成本适中，是国际学生的理想选择。
+    """
+    prompt = (
         f"请分析以下学术招聘信息，提取并总结该职位的主要亮点、特色和地理位置优势。\n\n"
         f"If the job title or key details in the '招聘信息' (recruitment information) are in German, please first translate them into Chinese. Then, proceed with the analysis and summary in Chinese as requested.\n\n"
         f"要求：\n"
@@ -848,62 +937,61 @@ def ollama_highlight(text, model="deepseek-r1:70b", host=None):
         f"参考示例：\n{example}\n\n"
         f"招聘信息：\n{text[:2000]}"
     )
+    # Use a simpler prompt with backup model
+    simple_prompt = f"请用一段话总结以下学术招聘信息的主要亮点和特色：\n\n{text[:1000]}"
+    return prompt, simple_prompt
+
+def clean_highlight(highlight):
+    """Strip common AI preambles and thinking from a highlight"""
+    # Clean up common AI prefixes
+    common_prefixes = [
+        "这个职位的亮点是", "该岗位的优势在于", "职位亮点：",
+        "AI分析：", "让我分析：", "分析得出：", "总结：",
+        "亮点包括：", "特色在于：", "优势是：", "经分析，",
+        "根据描述，", "通过分析，", "主要亮点：",
+        "分析如下：", "职位分析：", "优势分析：", "特点如下：",
+        "思考过程：", "我的分析：", "我认为", "我觉得",
+    ]
+    
+    for prefix in common_prefixes:
+        if highlight.lower().startswith(prefix.lower()):
+            highlight = highlight[len(prefix):].strip()
+    
+    # Remove thinking patterns and normalize whitespace
+    highlight = re.sub(r'<think>.*?</think>', '', highlight, flags=re.DOTALL)
+    return re.sub(r'\n\s*\n', '\n', highlight).strip()
 
-    payload = {
-        "model": model,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.7,
-            "top_p": 0.9
-        }
-    }
+def generate_highlight(text, model="deepseek-r1:70b", host=None):
+    """Generate the highlight and return (highlight, model that produced it); the model is None for the rule-based fallback"""
+    cached = llm_cache.get('highlight', model, HIGHLIGHT_PROMPT_VERSION, text)
+    if cached is not None:
+        return cached, model
 
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
+    prompt, simple_prompt = build_highlight_prompts(text)
+    backup_model = "qwen3:30b-a3b"  # Updated backup model name
 
+    servers = ollama.server_order(host)
     last_error = None
     for server in servers:
         try:
-            url = f"{server}/api/generate"
             print(f"正在使用服务器 {server} 的 {model} 模型生成职位亮点...")
-            
-            resp = requests.post(url, json=payload, headers=headers, timeout=600)
-            resp.raise_for_status()
-
-            result = resp.json()
-            if not isinstance(result, dict) or "response" not in result:
-                print(f"API响应格式错误: {result}")
-                raise Exception("API响应格式错误")
-
-            highlight = result["response"].strip()
+            # With hedging on ($OLLAMA_HEDGE), a request slower than p90 is also sent to another server or the backup model
+            highlight, used_model = ollama.generate_task_hedged(server, model, 'highlight', prompt,
+                                                                hedge_model=backup_model, hedge_prompt=simple_prompt)
             print("亮点生成成功")
+            ollama.mark_success(server)
+            highlight = clean_highlight(highlight)
             
-            # Update the default server URL
-            default_server_url = server
-
-            # Clean up common AI prefixes
-            common_prefixes = [
-                "这个职位的亮点是", "该岗位的优势在于", "职位亮点：",
-                "AI分析：", "让我分析：", "分析得出：", "总结：",
-                "亮点包括：", "特色在于：", "优势是：", "经分析，",
-                "根据描述，", "通过分析，", "主要亮点：",
-                "分析如下：", "职位分析：", "优势分析：", "特点如下：",
-                "思考过程：", "我的分析：", "我认为", "我觉得",
-            ]
-            
-            for prefix in common_prefixes:
-                if highlight.lower().startswith(prefix.lower()):
-                    highlight = highlight[len(prefix):].strip()
-            
-            # Remove thinking patterns and normalize whitespace
-            highlight = re.sub(r'<think>.*?</think>', '', highlight, flags=re.DOTALL)
-            highlight = re.sub(r'\n\s*\n', '\n', highlight).strip()
-            
-            return highlight
-
+            if used_model == model:
+                llm_cache.put('highlight', model, HIGHLIGHT_PROMPT_VERSION, text, highlight)
+            return highlight, used_model
+
+        except TruncatedGenerationError as e:
+            # The server is fine; another one would truncate the same way, so go to the backup model
+            print(f"模型 {model} 输出被截断: {e}")
+            ollama.mark_success(server)
+            last_error = str(e)
+            break
         except requests.exceptions.Timeout:
             print(f"服务器 {server} 请求超时")
             last_error = "timeout"
@@ -914,36 +1002,48 @@ def ollama_highlight(text, model="deepseek-r1:70b", host=None):
             continue
 
     # If all servers failed, try backup model
-    backup_model = "qwen3:30b-a3b"  # Updated backup model name
     print(f"所有服务器都失败 ({last_error})，尝试备用模型 {backup_model}...")
 
-    try:
-        # Use a simpler prompt with backup model
-        simple_prompt = f"请用一段话总结以下学术招聘信息的主要亮点和特色：\n\n{text[:1000]}"
-        payload["model"] = backup_model
-        payload["prompt"] = simple_prompt
+    # Try all servers again with backup model
+    for server in servers:
+        try:
+            highlight = clean_highlight(ollama.generate_task(server, backup_model, 'highlight', simple_prompt))
+            if highlight:
+                ollama.mark_success(server)
+                return highlight, backup_model
+        except Exception as e:
+            print(f"备用模型失败: {e}")
+            continue
 
-        # Try all servers again with backup model
-        for server in servers:
-            try:
-                resp = requests.post(
-                    f"{server}/api/generate",
-                    json=payload,
-                    headers=headers,
-                    timeout=600
-                )
-                resp.raise_for_status()
-                result = resp.json()
-                highlight = result.get("response", "").strip()
-                if highlight:
-                    # Update the default server URL
-                    default_server_url = server
-                    return highlight
-            except Exception:
-                continue
-    except Exception as e:
-        print(f"备用模型失败: {e}")    # If all AI attempts fail, use enhanced simple extraction
+    # If all AI attempts fail, use enhanced simple extraction
     print("所有模型都失败，使用增强的简单提取方法...")
+    return simple_highlight(text), None
+
+def ollama_highlight(text, model="deepseek-r1:70b", host=None):
+    """生成职位亮点，如果主模型失败则使用备用模型"""
+    return generate_highlight(text, model, host)[0]
+
+async def ollama_highlight_async(text, model="deepseek-r1:70b", host=None):
+    """Async ollama_highlight: same prompts, cache and fallbacks, for concurrent enrichment"""
+    cached = await asyncio.to_thread(llm_cache.get, 'highlight', model, HIGHLIGHT_PROMPT_VERSION, text)
+    if cached is not None:
+        return cached
+
+    prompt, simple_prompt = build_highlight_prompts(text)
+    try:
+        highlight = clean_highlight(await async_ollama.generate_task(model, 'highlight', prompt, host=host))
+        await asyncio.to_thread(llm_cache.put, 'highlight', model, HIGHLIGHT_PROMPT_VERSION, text, highlight)
+        return highlight
+    except Exception as e:
+        print(f"{model} 生成职位亮点失败 ({e})，尝试备用模型...")
+    try:
+        return clean_highlight(await async_ollama.generate_task("qwen3:30b-a3b", 'highlight', simple_prompt, host=host))
+    except Exception as backup_error:
+        print(f"备用模型失败: {backup_error}，使用增强的简单提取方法...")
+        return simple_highlight(text)
+
+def simple_highlight(text):
+    """Rule-based highlight used when every model failed"""
     # Extract key information from text
     institution = re.search(r'(?:university|大学|学院|研究所|institute)[\s:]*([\w\s]+)', text, re.IGNORECASE)
     location = re.search(r'(?:location|地点|位于)[\s:]*([\w\s,]+)', text, re.IGNORECASE)
@@ -1039,6 +1139,35 @@ def find_element_with_retry(driver, by, selector, max_retries=3, timeout=10):
             print(f"Timeout, retrying... ({attempt + 1}/{max_retries})")
             time.sleep(1)
 
+def find_first_element(driver, selectors, timeout=10):
+    """Find the first present element among candidate selectors without waiting on absent ones
+
+    After one readiness wait, all selectors are probed in a single DOM query
+    and only the selector that exists is looked up (preferring one with
+    text). If none exists yet, one bounded wait covers all of them at once.
+    Returns ``(selector, element)`` or ``(None, None)``.
+    """
+    selectors = [s for s in selectors if validate_selector(s)]
+    if not selectors:
+        return None, None
+
+    wait_for_document_ready(driver, timeout=timeout)
+    selector = probe_selectors(driver, selectors)
+    if selector is None:
+        # Dynamic content may still be arriving: wait once for any candidate
+        if not wait_for_selector(driver, ", ".join(selectors), timeout=timeout):
+            print(f"None of the selectors found: {', '.join(selectors)}")
+            return None, None
+        selector = probe_selectors(driver, selectors)
+        if selector is None:
+            return None, None
+
+    try:
+        return selector, find_element_with_retry(driver, By.CSS_SELECTOR, selector, timeout=2)
+    except (TimeoutException, StaleElementReferenceException) as e:
+        print(f"Failed to get element with selector '{selector}': {e}")
+        return None, None
+
 def generate_summary_article(jobs, selected_model_name):
     """Generate a markdown summary article from job data with Chinese labels and translated snippets."""
     if not jobs:
@@ -1112,64 +1241,119 @@ def generate_summary_article(jobs, selected_model_name):
     
     return article
 
-# Initialize default server URL for AI processing
-default_server_url = None
-
-
-def translate_german_to_chinese(text_to_translate, model_name, ollama_host="http://rf-calcul:11434"):
+def needs_translation(text_to_translate):
     if not text_to_translate or not isinstance(text_to_translate, str):
-        return text_to_translate # Return if empty or not a string
+        return False # Nothing to do if empty or not a string
 
     # Basic check for non-Chinese characters, assuming German text will have them.
     # This is a heuristic; more robust language detection is complex.
     if not re.search(r'[a-zA-ZäöüÄÖÜß]', text_to_translate):
         print(f"Skipping translation for: {text_to_translate[:50]}... (already Chinese or non-translatable)")
-        return text_to_translate # Assume already Chinese or non-translatable
+        return False # Assume already Chinese or non-translatable
+    return True
 
-    prompt = f"Translate the following German text to Chinese. Output only the translated Chinese text and nothing else:\n\n{text_to_translate}"
-    
-    payload = {
-        "model": model_name,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.2 # Lower temperature for more deterministic translation
-        }
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
+def build_translation_prompt(text_to_translate):
+    return f"Translate the following German text to Chinese. Output only the translated Chinese text and nothing else:\n\n{text_to_translate}"
+
+def clean_translation(translated_text):
+    # Further clean-up if AI adds prefixes like "Chinese translation:" or "翻译："
+    translated_text = re.sub(r"^(Chinese translation:|翻译：|以下是中文翻译：)\s*", "", translated_text, flags=re.IGNORECASE)
+    # Remove any potential "German text:" or similar introductions if the AI includes the original
+    translated_text = re.sub(r"^(German text:|Original text:|Original:|Ursprünglicher Text:)\s*.*?\n+", "", translated_text, flags=re.IGNORECASE | re.DOTALL)
+    return translated_text.strip()
+
+def translate_german_to_chinese(text_to_translate, model_name, ollama_host=None, strict=False):
+    """Translate German text to Chinese; falls back to the original text on any failure.
+
+    With ``strict`` a failed or empty translation raises instead, so the
+    caller can tell a real translation from the German fallback.
+    """
+    # No model in scrape-only runs: keep the original text
+    if not model_name or not needs_translation(text_to_translate):
+        return text_to_translate
+
+    cached = llm_cache.get('translation', model_name, TRANSLATION_PROMPT_VERSION, text_to_translate)
+    if cached is not None:
+        return cached
+
+    prompt = build_translation_prompt(text_to_translate)
+    # Default to the server that last answered
+    ollama_host = ollama_host or ollama.server_order()[0]
 
     try:
         print(f"Translating text to Chinese using model {model_name} on {ollama_host}...")
-        api_url = f"{ollama_host}/api/generate"
-        resp = requests.post(api_url, json=payload, headers=headers, timeout=300)
-        resp.raise_for_status()
-        result = resp.json()
-        translated_text = result.get("response", "").strip()
-        
-        # Further clean-up if AI adds prefixes like "Chinese translation:" or "翻译："
-        translated_text = re.sub(r"^(Chinese translation:|翻译：|以下是中文翻译：)\s*", "", translated_text, flags=re.IGNORECASE)
-        # Remove any potential "German text:" or similar introductions if the AI includes the original
-        translated_text = re.sub(r"^(German text:|Original text:|Original:|Ursprünglicher Text:)\s*.*?\n+", "", translated_text, flags=re.IGNORECASE | re.DOTALL)
-        translated_text = translated_text.strip()
-
-        if translated_text:
-            print(f"Original: {text_to_translate[:50]}... Translated: {translated_text[:50]}...")
-            return translated_text
+        # The token budget grows with the source text; a translation is never much longer
+        translated_text = clean_translation(ollama.generate_task(ollama_host, model_name, 'translation', prompt,
+                                                                 input_text=text_to_translate, timeout=300))
+    except Exception as e:
+        if strict:
+            raise
+        if isinstance(e, requests.exceptions.Timeout):
+            print(f"Error during translation: Timeout after 300 seconds for {ollama_host}")
         else:
-            print(f"Translation resulted in empty string for: {text_to_translate[:50]}... Returning original.")
-            return text_to_translate
-    except requests.exceptions.Timeout:
-        print(f"Error during translation: Timeout after 300 seconds for {ollama_host}")
+            print(f"Error during translation: {e}. Returning original.")
         return text_to_translate
-    except requests.exceptions.RequestException as e:
-        print(f"Error during translation: RequestException {e} for {ollama_host}")
+    if not translated_text:
+        if strict:
+            raise OllamaResponseError("Empty translation")
+        print(f"Translation resulted in empty string for: {text_to_translate[:50]}... Returning original.")
         return text_to_translate
+    print(f"Original: {text_to_translate[:50]}... Translated: {translated_text[:50]}...")
+    llm_cache.put('translation', model_name, TRANSLATION_PROMPT_VERSION, text_to_translate, translated_text)
+    return translated_text
+
+async def translate_german_to_chinese_async(text_to_translate, model_name, ollama_host=None, strict=False):
+    """Async translate_german_to_chinese; falls back to the original text on any failure.
+
+    With ``strict`` a failed or empty translation raises instead, for callers
+    that retry later rather than keep the German text.
+    """
+    if not needs_translation(text_to_translate):
+        return text_to_translate
+
+    cached = await asyncio.to_thread(llm_cache.get, 'translation', model_name, TRANSLATION_PROMPT_VERSION,
+                                     text_to_translate)
+    if cached is not None:
+        return cached
+
+    try:
+        translated_text = clean_translation(await async_ollama.generate_task(
+            model_name, 'translation', build_translation_prompt(text_to_translate), host=ollama_host,
+            input_text=text_to_translate, timeout=300))
     except Exception as e:
-        print(f"An unexpected error occurred during translation: {e}")
-        return text_to_translate # Fallback to original text
+        if strict:
+            raise
+        print(f"Error during translation: {e}. Returning original.")
+        return text_to_translate
+    if not translated_text:
+        if strict:
+            raise OllamaResponseError("Empty translation")
+        return text_to_translate
+    await asyncio.to_thread(llm_cache.put, 'translation', model_name, TRANSLATION_PROMPT_VERSION,
+                            text_to_translate, translated_text)
+    return translated_text
+
+async def enrich_queued_job(info, model="deepseek-r1:70b"):
+    """Enrichment function for enrich_worker.py: translate and highlight a position saved by a scrape-only run.
+
+    Fields are translated concurrently. Unlike the interactive path a failed
+    translation or highlight raises instead of falling back, so the queue
+    retries it later.
+    """
+    info = dict(info)
+    fields_to_translate = [key for key in ['title', 'institution', 'location', 'requirements', 'contract'] if info.get(key)]
+    translations = await asyncio.gather(*(translate_german_to_chinese_async(info[key], model, strict=True)
+                                          for key in fields_to_translate))
+    info.update(zip(fields_to_translate, translations))
+
+    text = info['title'] + '\n' + info['content']
+    highlight = await asyncio.to_thread(llm_cache.get, 'highlight', model, HIGHLIGHT_PROMPT_VERSION, text)
+    if highlight is None:
+        prompt, _ = build_highlight_prompts(text)
+        highlight = clean_highlight(await async_ollama.generate_task(model, 'highlight', prompt))
+        await asyncio.to_thread(llm_cache.put, 'highlight', model, HIGHLIGHT_PROMPT_VERSION, text, highlight)
+    info['highlight'] = highlight
+    return info
 
 
 # Main execution block
@@ -1178,15 +1362,22 @@ if __name__ == "__main__":
     
     # Phase 1: Check AI server and select model
     print("\n=== Phase 1: AI Server Setup ===")
-    print("正在检查AI服务器连接...")
-    if not check_ai_server("http://rf-calcul:11434"):
-        print("AI服务器连接失败，将使用简单摘要")
+    # --scrape-only: fetch and queue the positions; enrich_worker.py translates and highlights them later
+    scrape_only = '--scrape-only' in sys.argv
+    selected_model = None
+    if scrape_only:
+        print("仅爬取模式，跳过AI服务器检查")
+    elif not check_ai_server():
+        print("AI服务器连接失败，改为仅爬取模式（稍后运行 python enrich_worker.py 生成翻译和亮点）")
         time.sleep(2)
-        selected_model = "deepseek-r1:70b"
+        scrape_only = True
     else:
         print("\nAI服务器连接成功")
         # Let user select the model to use
         selected_model = select_model()
+        # Load the model in the background while the browser starts and the listing is scraped
+        print(f"正在后台预加载模型 {selected_model}（keep_alive {ollama.keep_alive}）...")
+        ollama.warm_up([selected_model], wait=False)
     
     print(f"\n使用模型: {selected_model}")
 
@@ -1205,7 +1396,8 @@ if __name__ == "__main__":
       # Phase 2: Fetch jobs
     print("\n=== Phase 2: Fetching Positions ===")
     try:
-        jobs = fetch_daad_jobs(use_headless=True, selected_model=selected_model, num_jobs=num_jobs_to_scrape)
+        jobs = fetch_daad_jobs(use_headless=True, selected_model=selected_model, num_jobs=num_jobs_to_scrape,
+                               enrich=not scrape_only)
         if not jobs:
             print("\nNo positions found. Check the logs for errors.")
             sys.exit(1)
@@ -1215,13 +1407,8 @@ if __name__ == "__main__":
         # Phase 3: Generate report
         print("\n=== Phase 3: Generating Report ===")
         
-        # Save raw data as JSON with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        json_file = f"backup/daad_phd_positions_{timestamp}.json"
-        os.makedirs("backup", exist_ok=True)
-        with open(json_file, "w", encoding="utf-8") as f:
-            json.dump(jobs, f, ensure_ascii=False, indent=2)
-        print(f"Raw data saved to {json_file}")
+        # Raw data was already written to the job store while fetching
+        print(f"Raw data saved to {DEFAULT_DB_PATH}")
         
         # Generate and save markdown summary
         article = generate_summary_article(jobs, selected_model)
@@ -1229,6 +1416,9 @@ if __name__ == "__main__":
         with open(summary_file, "w", encoding="utf-8") as f:
             f.write(article)
         print(f"\nSummary report saved to {summary_file}")
+        if scrape_only:
+            pending = job_store.queue_counts('daad').get('pending', 0)
+            print(f"\n{pending} positions waiting for enrichment, run: python enrich_worker.py --source daad")
         print("\n=== Completed Successfully ===")
         
     except Exception as e:
@@ -0,0 +1,144 @@
+import queue
+import threading
+from selenium.common.exceptions import InvalidSessionIdException, WebDriverException
+
+# Error messages that mean the browser behind a driver is gone for good
+DEAD_SESSION_MARKERS = ['invalid session id', 'chrome not reachable', 'disconnected', 'no such window']
+
+
+def is_dead_session_error(error):
+    """Return True if the exception means the driver has to be replaced"""
+    if isinstance(error, InvalidSessionIdException):
+        return True
+    if isinstance(error, WebDriverException):
+        message = str(error).lower()
+        return any(marker in message for marker in DEAD_SESSION_MARKERS)
+    return False
+
+
+class DriverPool:
+    """A fixed-size pool of WebDriver instances shared by worker threads.
+
+    Drivers are created lazily through ``driver_factory`` up to ``size``
+    instances. Each task borrows one driver; if the browser session dies the
+    driver is quit, replaced by a fresh one and the task is retried. If the
+    replacement cannot be started the slot is dropped and a new driver is
+    created by a later ``acquire``.
+    """
+
+    def __init__(self, driver_factory, size=3, page_load_timeout=30, max_restarts=1):
+        self.driver_factory = driver_factory
+        self.size = max(1, int(size))
+        self.page_load_timeout = page_load_timeout
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self._idle = queue.Queue()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    def _create_driver(self):
+        driver = self.driver_factory()
+        driver.set_page_load_timeout(self.page_load_timeout)
+        return driver
+
+    def add(self, driver):
+        """Adopt an already running driver (e.g. the one used for listing pages)"""
+        with self._lock:
+            if len(self._drivers) >= self.size:
+                raise ValueError("Driver pool is already full")
+            self._drivers.append(driver)
+        self._idle.put(driver)
+
+    def acquire(self):
+        """Borrow a driver, starting a new one if the pool is not full yet"""
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                can_create = len(self._drivers) < self.size
+                if can_create:
+                    # Reserve the slot before the (slow) browser start
+                    self._drivers.append(None)
+            if can_create:
+                break
+            # Wake up now and then: a slot may have been dropped by a failed restart
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+        try:
+            driver = self._create_driver()
+        except Exception:
+            with self._lock:
+                self._drivers.remove(None)
+            raise
+        with self._lock:
+            self._drivers[self._drivers.index(None)] = driver
+        return driver
+
+    def release(self, driver):
+        """Return a borrowed driver to the pool"""
+        self._idle.put(driver)
+
+    def replace(self, driver):
+        """Quit a broken driver and start a fresh one in its place; drop its slot if that fails"""
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        try:
+            new_driver = self._create_driver()
+        except Exception:
+            with self._lock:
+                if driver in self._drivers:
+                    self._drivers.remove(driver)
+            raise
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers[self._drivers.index(driver)] = new_driver
+            else:
+                self._drivers.append(new_driver)
+            self.restarts += 1
+        return new_driver
+
+    def run(self, func, item):
+        """Call ``func(driver, item)`` with a pooled driver, recovering dead sessions"""
+        driver = self.acquire()
+        try:
+            attempt = 0
+            while True:
+                try:
+                    return func(driver, item)
+                except Exception as e:
+                    if not is_dead_session_error(e) or attempt >= self.max_restarts:
+                        raise
+                    attempt += 1
+                    print(f"Browser session lost ({type(e).__name__}), restarting driver...")
+                    # Never hand the dead driver back to the pool, even if the restart fails
+                    broken, driver = driver, None
+                    driver = self.replace(broken)
+        finally:
+            if driver is not None:
+                self.release(driver)
+
+    def quit(self):
+        """Quit all drivers owned by the pool"""
+        with self._lock:
+            drivers = [d for d in self._drivers if d is not None]
+            self._drivers = []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        self._idle = queue.Queue()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.quit()
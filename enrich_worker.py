@@ -0,0 +1,114 @@
+"""Second phase of a two-phase run: enrich the jobs queued by scrape-only runs.
+
+Scrapers started with ``--scrape-only`` (or without a reachable AI server)
+save raw postings to the job store and queue them in ``work_queue``. This
+worker drains that queue with its own concurrency: each item is passed to
+the ``enrich_queued_job(job, model)`` coroutine of the scraper it came from,
+then saved with its enrichment and recorded in the seen index and page cache
+so the next scrape skips it. Failed items are retried later with
+exponential backoff and marked failed after ``--max-attempts``.
+
+    python enrich_worker.py [--source daad] [--model deepseek-r1:70b]
+                            [--concurrency 4] [--watch 600]
+"""
+import argparse
+import asyncio
+import importlib
+import sys
+import time
+
+from job_store import job_store
+from page_cache import page_cache
+from seen_index import seen_index
+
+# Queue source -> scraper module providing ``async enrich_queued_job(job, model)`` and its ``ollama`` client
+ENRICHERS = {
+    "academicpositions": "aj_scraper",
+    "daad": "daad_scraper_new",
+}
+
+
+def load_enrichers(sources=None):
+    """Import the scraper modules lazily; returns ({source: enrich coroutine}, [ollama clients])"""
+    modules = {source: importlib.import_module(ENRICHERS[source]) for source in (sources or ENRICHERS)}
+    return ({source: module.enrich_queued_job for source, module in modules.items()},
+            [module.ollama for module in modules.values()])
+
+
+async def drain(enrichers, model, concurrency=4, max_attempts=3, retry_delay=60, source=None, store=None):
+    """Enrich queued items until none is due; returns counts of done, retried and failed items.
+
+    ``concurrency`` workers each claim one item at a time, so a slow item
+    never holds back the others. The job store, page cache and seen index
+    block on disk, so they are called in worker threads and never stall the
+    event loop the enrichers run on.
+    """
+    store = store or job_store
+    stats = {"done": 0, "retry": 0, "failed": 0}
+
+    async def process(item):
+        job = item["job"]
+        try:
+            enriched = await enrichers[item["source"]](job, model)
+        except Exception as e:
+            status = await asyncio.to_thread(store.fail, item["id"], e, max_attempts=max_attempts,
+                                             retry_delay=retry_delay)
+            stats["retry" if status == "pending" else "failed"] += 1
+            print(f"富化失败（第 {item['attempts'] + 1} 次，{'稍后重试' if status == 'pending' else '放弃'}）: "
+                  f"{job.get('title', '')[:30]} - {e}")
+            return
+        await asyncio.to_thread(store.complete, item["id"], enriched, model=model)
+        await asyncio.to_thread(page_cache.put_record, enriched["link"], enriched)
+        await asyncio.to_thread(seen_index.add, enriched["link"], source=item["source"],
+                                listing_digest=item.get("listing_hash"), content_digest=item.get("content_hash"))
+        stats["done"] += 1
+        print(f"富化完成: {enriched.get('title', '')[:30]}")
+
+    async def worker():
+        while True:
+            items = await asyncio.to_thread(store.claim, limit=1, source=source)
+            if not items:
+                return
+            await process(items[0])
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enrich jobs queued by scrape-only runs")
+    parser.add_argument("--source", choices=sorted(ENRICHERS), help="only this source (default: all)")
+    parser.add_argument("--model", default="deepseek-r1:70b")
+    parser.add_argument("--concurrency", type=int, default=4, help="items enriched at the same time")
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--retry-delay", type=float, default=60, help="seconds before the first retry, doubled each time")
+    parser.add_argument("--stale-after", type=float, default=3600,
+                        help="requeue items left running this many seconds by a worker that died")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="keep running and poll the queue at this interval instead of exiting when it is empty")
+    args = parser.parse_args(argv)
+
+    enrichers, clients = load_enrichers([args.source] if args.source else None)
+    # The AI check only happens here, so scraping never waits on the LLM servers
+    if clients[0].find_server([args.model]) is None:
+        print(f"没有可用的AI服务器提供模型 {args.model}，队列保持不变")
+        return 1
+    for client in clients:
+        client.warm_up([args.model], wait=False)
+
+    while True:
+        requeued = job_store.requeue_stale(args.stale_after)
+        if requeued:
+            print(f"{requeued} 个中断的任务已重新排队")
+        print(f"待富化队列: {job_store.queue_counts(args.source)}")
+        stats = asyncio.run(drain(enrichers, args.model, concurrency=args.concurrency,
+                                  max_attempts=args.max_attempts, retry_delay=args.retry_delay, source=args.source))
+        print(f"本轮完成 {stats['done']} 个，稍后重试 {stats['retry']} 个，放弃 {stats['failed']} 个")
+        if args.watch is None:
+            break
+        time.sleep(args.watch)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
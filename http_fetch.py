@@ -0,0 +1,184 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+from page_cache import page_cache
+
+# Same user agent the Selenium scrapers send
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9,de;q=0.8",
+}
+
+_local = threading.local()
+
+
+def get_session():
+    """Return this thread's pooled requests.Session (keep-alive connections are reused)"""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=1)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update(DEFAULT_HEADERS)
+        _local.session = session
+    return session
+
+
+def conditional_headers(entry):
+    """If-None-Match / If-Modified-Since headers for a cached page entry"""
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def request_page(url, timeout=10, source=None, entry=None, store=True):
+    """GET ``url``, as a conditional request when ``entry`` has validators.
+
+    Returns ``(status, html)``; ``html`` is only set for a 200 HTML response,
+    which is stored in the page cache together with its validators. A 304
+    restarts the cached page's TTL.
+    """
+    headers = conditional_headers(entry) if entry else {}
+    try:
+        resp = get_session().get(url, timeout=timeout, headers=headers)
+    except requests.exceptions.RequestException as e:
+        print(f"Static fetch failed for {url}: {e}")
+        return None, None
+    if resp.status_code == 304 and headers:
+        page_cache.mark_not_modified(url)
+        return 304, None
+    if resp.status_code != 200:
+        print(f"Static fetch returned HTTP {resp.status_code} for {url}")
+        return resp.status_code, None
+    if "html" not in resp.headers.get("Content-Type", "text/html"):
+        return resp.status_code, None
+    if store:
+        page_cache.put(url, resp.text, source,
+                       etag=resp.headers.get("ETag"), last_modified=resp.headers.get("Last-Modified"))
+    return resp.status_code, resp.text
+
+
+def fetch_html(url, timeout=10, source=None, use_cache=True):
+    """Fetch a page over plain HTTP. Returns the HTML text, or None if it is not usable.
+
+    Fresh pages in the on-disk page cache are returned without a request and
+    stale ones are revalidated with a conditional GET; fetched pages are
+    stored there under ``source``'s TTL.
+    """
+    if not use_cache:
+        return request_page(url, timeout=timeout, source=source, store=False)[1]
+    html = page_cache.get(url, source)
+    if html is not None:
+        return html
+    status, html = request_page(url, timeout=timeout, source=source, entry=page_cache.entry(url))
+    if status == 304:
+        return page_cache.get(url, source, allow_stale=True)
+    return html
+
+
+def unchanged_record(url, source=None, timeout=10):
+    """Return the record stored for ``url`` if the page has not changed since it was built.
+
+    Pages still within their TTL count as unchanged; older ones are
+    revalidated with If-None-Match / If-Modified-Since. Returns None when the
+    page has to be parsed and enriched again (a 200 response is already in
+    the cache, so the following fetch does not download it twice).
+    """
+    entry = page_cache.entry(url)
+    if entry is None:
+        return None
+    record = page_cache.get_record(url)
+    if record is None:
+        return None
+    if page_cache.is_fresh(entry, source):
+        return record
+    if not conditional_headers(entry):
+        return None
+    status, _ = request_page(url, timeout=timeout, source=source, entry=entry)
+    return record if status == 304 else None
+
+
+def element_text(element):
+    """Approximate Selenium's element.text for a BeautifulSoup element"""
+    return element.get_text("\n", strip=True)
+
+
+def select_text(soup, selectors):
+    """Return the text of the first element matching ``selectors``.
+
+    ``selectors`` is either one CSS selector string (first match in document
+    order, like driver.find_element) or a list of selectors tried in turn
+    until one yields non-empty text.
+    """
+    if isinstance(selectors, str):
+        selectors = [selectors]
+    for selector in selectors:
+        try:
+            element = soup.select_one(selector)
+        except Exception:
+            # Selector not supported by soupsieve
+            continue
+        if element is not None:
+            text = element_text(element)
+            if text:
+                return text
+    return ""
+
+
+def cache_rendered_page(driver, url, source=None):
+    """Store the browser-rendered HTML so the next static parse of ``url`` hits the cache.
+
+    Validators from the static response are kept so later runs can still
+    revalidate the page with a conditional GET.
+    """
+    entry = page_cache.entry(url) or {}
+    try:
+        page_cache.put(url, driver.page_source, source,
+                       etag=entry.get("etag"), last_modified=entry.get("last_modified"))
+    except Exception as e:
+        print(f"Could not cache rendered page {url}: {e}")
+
+
+def fetch_static_soup(url, required_selectors=(), timeout=10, source=None):
+    """Fetch and parse a page without a browser.
+
+    Returns None if the page could not be fetched or if any of
+    ``required_selectors`` is missing from the static HTML, in which case the
+    caller should fall back to Selenium.
+    """
+    html = fetch_html(url, timeout=timeout, source=source)
+    if html is None:
+        return None
+    soup = BeautifulSoup(html, "html.parser")
+    for selector in required_selectors:
+        try:
+            if soup.select_one(selector) is None:
+                print(f"Static HTML lacks '{selector}', falling back to browser")
+                return None
+        except Exception:
+            return None
+    return soup
+
+
+def fetch_static_fields(url, field_selectors, required=(), timeout=10, source=None):
+    """Extract ``{field: text}`` from the static HTML of ``url``.
+
+    ``field_selectors`` maps field names to a selector string or list (see
+    select_text). Returns None if the page is unavailable or any field in
+    ``required`` came out empty.
+    """
+    soup = fetch_static_soup(url, timeout=timeout, source=source)
+    if soup is None:
+        return None
+    fields = {name: select_text(soup, selectors) for name, selectors in field_selectors.items()}
+    missing = [name for name in required if not fields.get(name)]
+    if missing:
+        print(f"Static HTML lacks {', '.join(missing)}, falling back to browser")
+        return None
+    return fields
@@ -0,0 +1,351 @@
+import calendar
+import datetime
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from page_cache import normalize_url
+
+DEFAULT_DB_PATH = os.path.join("data", "jobs.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL REFERENCES sources(id),
+    model TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    status TEXT NOT NULL DEFAULT 'running',
+    jobs_saved INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    link TEXT NOT NULL UNIQUE,
+    source_id INTEGER NOT NULL REFERENCES sources(id),
+    title TEXT,
+    institution TEXT,
+    location TEXT,
+    posted TEXT,
+    deadline TEXT,
+    contract TEXT,
+    start_date TEXT,
+    type TEXT,
+    content TEXT,
+    data TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    last_run_id INTEGER REFERENCES runs(id)
+);
+CREATE TABLE IF NOT EXISTS enrichment (
+    job_id INTEGER NOT NULL REFERENCES jobs(id),
+    task TEXT NOT NULL,
+    model TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (job_id, task)
+);
+CREATE TABLE IF NOT EXISTS work_queue (
+    id INTEGER PRIMARY KEY,
+    job_id INTEGER NOT NULL UNIQUE REFERENCES jobs(id),
+    source TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    next_attempt_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_link ON jobs(link);
+CREATE INDEX IF NOT EXISTS idx_jobs_source ON jobs(source_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_deadline ON jobs(deadline);
+CREATE INDEX IF NOT EXISTS idx_jobs_posted ON jobs(posted);
+CREATE INDEX IF NOT EXISTS idx_work_queue_status ON work_queue(status, next_attempt_at);
+"""
+
+# Record fields stored in their own columns; everything else only lives in ``data``
+JOB_COLUMNS = ("title", "institution", "location", "posted", "deadline", "contract", "start_date", "type", "content")
+
+# Record fields produced by the LLM, kept per task in the enrichment table
+ENRICHMENT_TASKS = ("highlight",)
+
+# Month names in the deadlines of the English and German postings
+MONTHS = {name.lower(): number for names in (calendar.month_name, calendar.month_abbr)
+          for number, name in enumerate(names) if name}
+MONTHS.update({"sept": 9, "januar": 1, "februar": 2, "märz": 3, "maerz": 3, "mai": 5, "juni": 6, "juli": 7,
+               "oktober": 10, "dezember": 12})
+
+# Text following a deadline label, e.g. "Deadline: 15 Mar 2025" or "Application Deadline\n31.03.2025"
+DEADLINE_LABEL = re.compile(r"(?:deadline|bewerbungsschluss|bewerbungsfrist)\s*[:：]?[ \t]*\n?[ \t]*([^\n]*)", re.IGNORECASE)
+
+
+def _iso_date(text):
+    """First date in ``text`` as YYYY-MM-DD, or None"""
+    for pattern, order in ((r"(\d{4})-(\d{1,2})-(\d{1,2})", "ymd"),
+                           (r"(\d{1,2})[./](\d{1,2})[./](\d{4})", "dmy"),
+                           (r"(\d{1,2})(?:st|nd|rd|th)?\.?\s+([^\W\d_]+)\.?,?\s+(\d{4})", "dmy"),
+                           (r"([^\W\d_]+)\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})", "mdy")):
+        for match in re.finditer(pattern, text):
+            parts = dict(zip(order, match.groups()))
+            month = parts["m"] if parts["m"].isdigit() else MONTHS.get(parts["m"].lower())
+            try:
+                return datetime.date(int(parts["y"]), int(month or 0), int(parts["d"])).isoformat()
+            except ValueError:
+                continue
+    return None
+
+
+def parse_deadline(job):
+    """Application deadline of a job record as YYYY-MM-DD, or "" when none is found.
+
+    Uses the record's ``deadline`` field if a scraper set one, else a date
+    after a deadline label in ``posted`` (EURAXESS cards) or ``content``
+    (DAAD's "Application Deadline" section). ISO dates keep the indexed
+    column comparable across sources.
+    """
+    if job.get("deadline"):
+        return _iso_date(job["deadline"]) or job["deadline"]
+    for name in ("posted", "content"):
+        for match in DEADLINE_LABEL.finditer(job.get(name) or ""):
+            deadline = _iso_date(match.group(1))
+            if deadline:
+                return deadline
+    return ""
+
+
+class JobStore:
+    """SQLite store for scraped jobs, their sources, LLM enrichment and run metadata.
+
+    Jobs are upserted by normalised link as soon as each one is finished, so
+    an interrupted run keeps everything processed so far. The connection is
+    opened on first use and shared by all threads behind a lock.
+
+    Scrape-only runs ``enqueue`` raw jobs in ``work_queue``; an enrichment
+    worker later ``claim``s them, and marks each one ``complete`` or
+    ``fail``ed (retried with exponential backoff up to ``max_attempts``).
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def _source_id(self, conn, source):
+        conn.execute("INSERT OR IGNORE INTO sources (name) VALUES (?)", (source,))
+        return conn.execute("SELECT id FROM sources WHERE name = ?", (source,)).fetchone()["id"]
+
+    def start_run(self, source, model=None):
+        """Record the start of a scraper run and return its id"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO runs (source_id, model, started_at) VALUES (?, ?, ?)",
+                    (self._source_id(conn, source), model, time.time()),
+                )
+            return cursor.lastrowid
+
+    def finish_run(self, run_id, status="completed"):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("UPDATE runs SET finished_at = ?, status = ? WHERE id = ?",
+                             (time.time(), status, run_id))
+
+    def save_job(self, source, job, run_id=None, model=None):
+        """Insert or update one job record (a scraper's job dict) and its enrichment results"""
+        link = normalize_url(job["link"])
+        now = time.time()
+        values = [parse_deadline(job) if name == "deadline" else job.get(name) or "" for name in JOB_COLUMNS]
+        data = json.dumps(job, ensure_ascii=False)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                source_id = self._source_id(conn, source)
+                conn.execute(
+                    f"""INSERT INTO jobs (link, source_id, {", ".join(JOB_COLUMNS)}, data, first_seen, last_seen, last_run_id)
+                        VALUES (?, ?, {", ".join("?" for _ in JOB_COLUMNS)}, ?, ?, ?, ?)
+                        ON CONFLICT(link) DO UPDATE SET
+                            {", ".join(f"{name} = excluded.{name}" for name in JOB_COLUMNS)},
+                            source_id = excluded.source_id, data = excluded.data, last_seen = excluded.last_seen,
+                            last_run_id = COALESCE(excluded.last_run_id, jobs.last_run_id)""",
+                    [link, source_id, *values, data, now, now, run_id],
+                )
+                job_id = conn.execute("SELECT id FROM jobs WHERE link = ?", (link,)).fetchone()["id"]
+                for task in ENRICHMENT_TASKS:
+                    if job.get(task):
+                        conn.execute(
+                            "INSERT OR REPLACE INTO enrichment (job_id, task, model, result, created_at) VALUES (?, ?, ?, ?, ?)",
+                            (job_id, task, model, job[task], now),
+                        )
+                if run_id is not None:
+                    conn.execute("UPDATE runs SET jobs_saved = jobs_saved + 1 WHERE id = ?", (run_id,))
+            return job_id
+
+    def enqueue(self, source, job, run_id=None, listing_digest=None, content_digest=None):
+        """Save a raw (not yet enriched) job and queue it for the enrichment worker.
+
+        An item a worker is currently enriching is left alone. For a known item
+        whose content hash did not change, the attempt count and backoff are
+        kept, and an item that already failed for good stays failed. New or
+        changed content starts over with a fresh retry budget.
+        """
+        payload = json.dumps({"listing_hash": listing_digest, "content_hash": content_digest})
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                """SELECT work_queue.id, work_queue.status, work_queue.payload FROM work_queue
+                   JOIN jobs ON jobs.id = work_queue.job_id WHERE jobs.link = ?""",
+                (normalize_url(job["link"]),),
+            ).fetchone()
+            if row is not None and row["status"] == "running":
+                return row["id"]
+            job_id = self.save_job(source, job, run_id=run_id)
+            with conn:
+                if row is None:
+                    cursor = conn.execute(
+                        """INSERT INTO work_queue (job_id, source, payload, status, attempts, next_attempt_at, updated_at)
+                           VALUES (?, ?, ?, 'pending', 0, ?, ?)""",
+                        (job_id, source, payload, now, now),
+                    )
+                    return cursor.lastrowid
+                unchanged = json.loads(row["payload"]).get("content_hash") == content_digest
+                if unchanged and row["status"] == "failed":
+                    conn.execute("UPDATE work_queue SET payload = ?, updated_at = ? WHERE id = ?",
+                                 (payload, now, row["id"]))
+                elif unchanged:
+                    conn.execute("UPDATE work_queue SET source = ?, payload = ?, status = 'pending', updated_at = ? "
+                                 "WHERE id = ?", (source, payload, now, row["id"]))
+                else:
+                    conn.execute(
+                        """UPDATE work_queue SET source = ?, payload = ?, status = 'pending', attempts = 0,
+                               last_error = NULL, next_attempt_at = ?, updated_at = ? WHERE id = ?""",
+                        (source, payload, now, now, row["id"]),
+                    )
+            return row["id"]
+
+    def claim(self, limit=1, source=None):
+        """Mark up to ``limit`` due pending items as running and return them, oldest first.
+
+        Each item is a dict with ``id``, ``source``, ``job``, ``attempts``,
+        ``listing_hash`` and ``content_hash``.
+        """
+        now = time.time()
+        query = """SELECT work_queue.id, work_queue.source, work_queue.payload, work_queue.attempts, jobs.data
+                   FROM work_queue JOIN jobs ON jobs.id = work_queue.job_id
+                   WHERE work_queue.status = 'pending' AND work_queue.next_attempt_at <= ?"""
+        params = [now]
+        if source:
+            query += " AND work_queue.source = ?"
+            params.append(source)
+        query += " ORDER BY work_queue.id LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                rows = conn.execute(query, params).fetchall()
+                conn.executemany("UPDATE work_queue SET status = 'running', updated_at = ? WHERE id = ?",
+                                 [(now, row["id"]) for row in rows])
+        items = []
+        for row in rows:
+            item = dict(json.loads(row["payload"]), id=row["id"], source=row["source"], attempts=row["attempts"])
+            item["job"] = json.loads(row["data"])
+            items.append(item)
+        return items
+
+    def complete(self, item_id, job, model=None):
+        """Store the enriched job of a claimed item and mark the item done"""
+        with self._lock:
+            conn = self._connect()
+            source = conn.execute("SELECT source FROM work_queue WHERE id = ?", (item_id,)).fetchone()["source"]
+            self.save_job(source, job, model=model)
+            with conn:
+                conn.execute("UPDATE work_queue SET status = 'done', last_error = NULL, updated_at = ? WHERE id = ?",
+                             (time.time(), item_id))
+
+    def fail(self, item_id, error, max_attempts=3, retry_delay=60):
+        """Record a failed attempt; retry after ``retry_delay * 2**(attempts - 1)`` seconds or give up"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                attempts = conn.execute("SELECT attempts FROM work_queue WHERE id = ?", (item_id,)).fetchone()[0] + 1
+                status = "failed" if attempts >= max_attempts else "pending"
+                conn.execute(
+                    """UPDATE work_queue SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ?, updated_at = ?
+                       WHERE id = ?""",
+                    (status, attempts, str(error), now + retry_delay * 2 ** (attempts - 1), now, item_id),
+                )
+            return status
+
+    def requeue_stale(self, older_than=3600):
+        """Put items left running by a worker that died back into the queue"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE work_queue SET status = 'pending', next_attempt_at = ?, updated_at = ? "
+                    "WHERE status = 'running' AND updated_at < ?",
+                    (now, now, now - older_than),
+                )
+            return cursor.rowcount
+
+    def queue_counts(self, source=None):
+        """Number of queue items per status"""
+        query = "SELECT status, COUNT(*) AS n FROM work_queue"
+        params = []
+        if source:
+            query += " WHERE source = ?"
+            params.append(source)
+        with self._lock:
+            rows = self._connect().execute(query + " GROUP BY status", params).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def get_job(self, link):
+        """Return the stored job dict for ``link``, or None"""
+        with self._lock:
+            row = self._connect().execute("SELECT data FROM jobs WHERE link = ?", (normalize_url(link),)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def jobs_for_run(self, run_id):
+        """Return the job dicts saved by a run, in the order they were saved"""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT data FROM jobs WHERE last_run_id = ? ORDER BY last_seen", (run_id,)
+            ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def jobs_for_source(self, source):
+        with self._lock:
+            rows = self._connect().execute(
+                """SELECT jobs.data FROM jobs JOIN sources ON sources.id = jobs.source_id
+                   WHERE sources.name = ? ORDER BY jobs.last_seen DESC""", (source,)
+            ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Shared by all scrapers in the process
+job_store = JobStore()
@@ -0,0 +1,230 @@
+import time
+
+# Collects every card matched by the card selectors (in selector order, de-duplicated
+# by element and by visible text) and reads all requested fields in a single pass.
+LISTING_CARDS_SCRIPT = """
+var cardSelectors = arguments[0], fields = arguments[1];
+var seenElements = new Set(), seenTexts = new Set(), rows = [];
+function readField(card, spec) {
+    for (var i = 0; i < spec.selectors.length; i++) {
+        var el = null;
+        try { el = card.querySelector(spec.selectors[i]); } catch (e) { continue; }
+        if (!el) { continue; }
+        var value = spec.attr ? (el[spec.attr] || el.getAttribute(spec.attr) || '')
+                              : (el.innerText || el.textContent || '');
+        value = String(value).trim();
+        if (value) { return value; }
+    }
+    return '';
+}
+cardSelectors.forEach(function(selector) {
+    var cards;
+    try { cards = document.querySelectorAll(selector); } catch (e) { return; }
+    cards.forEach(function(card) {
+        if (seenElements.has(card)) { return; }
+        seenElements.add(card);
+        var text = (card.innerText || '').trim();
+        if (!text || seenTexts.has(text)) { return; }
+        seenTexts.add(text);
+        var row = {};
+        Object.keys(fields).forEach(function(name) { row[name] = readField(card, fields[name]); });
+        rows.push(row);
+    });
+});
+return rows;
+"""
+
+
+# Reads every candidate selector for every field of a detail page in one pass and
+# keeps the first non-empty match per field. Optional extras:
+#   groups: {name: {container, label, value}} -> list of [label, value] pairs
+#   label_parents: {name: text} -> text of the parent of the element whose own
+#                  text contains ``text`` (like //*[contains(text(), ...)]/..)
+DETAIL_FIELDS_SCRIPT = """
+var fields = arguments[0], groups = arguments[1] || {}, labelParents = arguments[2] || {};
+var t0 = performance.now();
+function textOf(el) { return String(el.innerText || el.textContent || '').trim(); }
+function readField(root, spec) {
+    if (spec.all) {
+        var parts = [];
+        spec.selectors.forEach(function(selector) {
+            try { root.querySelectorAll(selector).forEach(function(el) { parts.push(textOf(el)); }); } catch (e) {}
+        });
+        return parts.join('\\n\\n').trim();
+    }
+    for (var i = 0; i < spec.selectors.length; i++) {
+        var el = null;
+        try { el = root.querySelector(spec.selectors[i]); } catch (e) { continue; }
+        if (!el) { continue; }
+        var value = spec.attr ? String(el[spec.attr] || el.getAttribute(spec.attr) || '').trim() : textOf(el);
+        if (value) { return value; }
+    }
+    return '';
+}
+var result = {};
+Object.keys(fields).forEach(function(name) { result[name] = readField(document, fields[name]); });
+Object.keys(groups).forEach(function(name) {
+    var g = groups[name], pairs = [];
+    document.querySelectorAll(g.container).forEach(function(section) {
+        var label = section.querySelector(g.label), value = section.querySelector(g.value);
+        if (label && value) { pairs.push([textOf(label), textOf(value)]); }
+    });
+    result[name] = pairs;
+});
+Object.keys(labelParents).forEach(function(name) {
+    result[name] = '';
+    var walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+    while (walker.nextNode()) {
+        var node = walker.currentNode;
+        if (node.data.indexOf(labelParents[name]) !== -1 && node.parentElement && node.parentElement.parentElement) {
+            result[name] = textOf(node.parentElement.parentElement);
+            break;
+        }
+    }
+});
+result._script_ms = performance.now() - t0;
+return result;
+"""
+
+
+# Checks all candidate selectors in one DOM query. Returns the index of the first
+# selector whose element has text, else the first one present, else -1.
+PROBE_SELECTORS_SCRIPT = """
+var selectors = arguments[0], firstPresent = -1;
+for (var i = 0; i < selectors.length; i++) {
+    var el = null;
+    try { el = document.querySelector(selectors[i]); } catch (e) { continue; }
+    if (!el) { continue; }
+    if (firstPresent < 0) { firstPresent = i; }
+    if (String(el.innerText || el.textContent || '').trim()) { return i; }
+}
+return firstPresent;
+"""
+
+
+# Normalises innerText for every element matched by a selector and applies the keyword
+# filter in the browser. With matchHref, links are matched on text + href and must have an href.
+FILTER_BY_TEXT_SCRIPT = """
+var selector = arguments[0], keywords = arguments[1], limit = arguments[2], matchHref = arguments[3];
+var elements;
+try { elements = document.querySelectorAll(selector); } catch (e) { return {total: 0, matches: []}; }
+var matches = [];
+for (var i = 0; i < elements.length; i++) {
+    var el = elements[i], text = '';
+    try { text = (el.innerText || el.textContent || '').replace(/\\s+/g, ' ').trim().toLowerCase(); } catch (e) { continue; }
+    var haystack = text;
+    if (matchHref) {
+        var href = el.href || '';
+        if (!href) { continue; }
+        haystack = text + ' ' + String(href).toLowerCase();
+    }
+    if (!haystack || !keywords.some(function(kw) { return haystack.indexOf(kw) !== -1; })) { continue; }
+    matches.push({index: i, element: el, preview: text.split(' ').slice(0, 6).join(' ')});
+    if (limit && matches.length >= limit) { break; }
+}
+return {total: elements.length, matches: matches};
+"""
+
+
+def normalize_field_spec(spec):
+    """Turn a field definition into ``{'selectors': [...], 'attr': name_or_None, 'all': bool}``.
+
+    A field is either a selector string, a list of selectors tried in order
+    (text of the first non-empty match), or a dict with ``selectors`` and an
+    ``attr`` to read instead of the text (e.g. ``'href'``) or ``all`` to join
+    the text of every match.
+    """
+    if isinstance(spec, dict):
+        selectors = spec.get('selectors', [])
+        attr = spec.get('attr')
+        join_all = bool(spec.get('all'))
+    else:
+        selectors = spec
+        attr = None
+        join_all = False
+    if isinstance(selectors, str):
+        selectors = [selectors]
+    return {'selectors': list(selectors), 'attr': attr, 'all': join_all}
+
+
+def extract_listing_cards(driver, card_selectors, card_fields):
+    """Extract all job cards on the current page with one execute_script call.
+
+    Returns a list of dicts with one key per entry in ``card_fields``.
+    """
+    if isinstance(card_selectors, str):
+        card_selectors = [card_selectors]
+    fields = {name: normalize_field_spec(spec) for name, spec in card_fields.items()}
+    start = time.monotonic()
+    try:
+        rows = driver.execute_script(LISTING_CARDS_SCRIPT, list(card_selectors), fields)
+    except Exception as e:
+        print(f"Card extraction script failed: {e}")
+        return []
+    if not isinstance(rows, list):
+        return []
+    print(f"Extracted {len(rows)} cards in one roundtrip ({time.monotonic() - start:.2f}s)")
+    return rows
+
+
+def extract_detail_fields(driver, field_selectors, groups=None, label_parents=None):
+    """Extract all fields of a detail page with one execute_script call.
+
+    Returns ``(values, timings)`` where ``values`` maps each field (and each
+    group / label_parents key) to its value and ``timings`` holds the time
+    spent in the browser script and the full WebDriver roundtrip in ms.
+    """
+    fields = {name: normalize_field_spec(spec) for name, spec in field_selectors.items()}
+    start = time.monotonic()
+    try:
+        result = driver.execute_script(DETAIL_FIELDS_SCRIPT, fields, groups or {}, label_parents or {})
+    except Exception as e:
+        print(f"Detail extraction script failed: {e}")
+        result = None
+    roundtrip_ms = (time.monotonic() - start) * 1000
+    if not isinstance(result, dict):
+        result = {}
+    timings = {'script_ms': float(result.pop('_script_ms', 0) or 0), 'roundtrip_ms': roundtrip_ms}
+    values = {name: result.get(name) or '' for name in fields}
+    for name in (groups or {}):
+        values[name] = result.get(name) or []
+    for name in (label_parents or {}):
+        values[name] = result.get(name) or ''
+    return values, timings
+
+
+def probe_selectors(driver, selectors):
+    """Return the first selector (in list order) present on the page, preferring ones with text.
+
+    All selectors are checked in a single execute_script call; returns None
+    if none of them match.
+    """
+    selectors = list(selectors)
+    try:
+        index = driver.execute_script(PROBE_SELECTORS_SCRIPT, selectors)
+    except Exception as e:
+        print(f"Selector probe failed: {e}")
+        return None
+    if isinstance(index, int) and 0 <= index < len(selectors):
+        return selectors[index]
+    return None
+
+
+def filter_elements_by_text(driver, selector, keywords, limit=None, match_href=False):
+    """Find elements matching ``selector`` whose normalised text contains any keyword.
+
+    Text is evaluated and filtered for all matched elements in one
+    execute_script call. Returns ``(total, matches)`` where ``total`` is the
+    number of elements the selector matched and ``matches`` is a list of
+    ``(index, element, preview)`` tuples.
+    """
+    keywords = [kw.lower() for kw in keywords]
+    try:
+        result = driver.execute_script(FILTER_BY_TEXT_SCRIPT, selector, keywords, limit or 0, bool(match_href))
+    except Exception as e:
+        print(f"Text filter script failed for {selector}: {e}")
+        return 0, []
+    if not isinstance(result, dict):
+        return 0, []
+    matches = [(m.get('index'), m.get('element'), m.get('preview', '')) for m in result.get('matches') or []]
+    return int(result.get('total') or 0), matches
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join("cache", "llm_outputs.db")
+DEFAULT_MAX_ENTRIES = 20000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    key TEXT PRIMARY KEY,
+    task TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    output TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outputs_last_access ON outputs(last_access);
+"""
+
+
+def input_hash(text):
+    """Hash of the input text with whitespace normalised"""
+    return hashlib.sha256(re.sub(r"\s+", " ", text or "").strip().encode("utf-8")).hexdigest()
+
+
+def cache_key(task, model, prompt_version, text):
+    return hashlib.sha256(f"{task}\0{model}\0{prompt_version}\0{input_hash(text)}".encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Persistent cache of LLM outputs keyed by (task, model, prompt version, input hash).
+
+    Bump a task's prompt version whenever its prompt changes so old outputs
+    are no longer served. The least recently used outputs are evicted once
+    ``max_entries`` is exceeded.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = {}
+        self.misses = {}
+        self.evictions = 0
+        self._lock = threading.RLock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def get(self, task, model, prompt_version, text):
+        """Return the cached output, or None"""
+        key = cache_key(task, model, prompt_version, text)
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT output FROM outputs WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses[task] = self.misses.get(task, 0) + 1
+                return None
+            with conn:
+                conn.execute("UPDATE outputs SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.hits[task] = self.hits.get(task, 0) + 1
+            return row[0]
+
+    def put(self, task, model, prompt_version, text, output):
+        """Store a successful output"""
+        if not output:
+            return
+        key = cache_key(task, model, prompt_version, text)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO outputs (key, task, model, prompt_version, output, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, task, model, prompt_version, output, now, now),
+                )
+                excess = conn.execute("SELECT COUNT(*) FROM outputs").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    conn.execute(
+                        "DELETE FROM outputs WHERE key IN (SELECT key FROM outputs ORDER BY last_access LIMIT ?)",
+                        (excess,),
+                    )
+                    self.evictions += excess
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM outputs").fetchone()[0]
+
+    def hit_rate(self):
+        hits = sum(self.hits.values())
+        lookups = hits + sum(self.misses.values())
+        return hits / lookups if lookups else 0.0
+
+    def report(self):
+        """Print per-task hit/miss counts for this run"""
+        tasks = sorted(set(self.hits) | set(self.misses))
+        if not tasks:
+            return
+        print("\nLLM output cache report:")
+        for task in tasks:
+            print(f"  {task}: {self.hits.get(task, 0)} hits, {self.misses.get(task, 0)} misses")
+        print(f"  Hit rate: {self.hit_rate():.0%}, entries: {len(self)}, evictions: {self.evictions}")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Shared by all scrapers in the process
+llm_cache = LLMCache()
@@ -3,14 +3,18 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time
-import requests
 import re
 import os
 import sys
 from collections import defaultdict
 from selenium.common.exceptions import InvalidSessionIdException, TimeoutException
-import json
+from http_fetch import fetch_static_soup, select_text, element_text, cache_rendered_page, unchanged_record
+from page_cache import page_cache
+from seen_index import seen_index, listing_hash, content_hash
+from job_store import job_store
+from page_wait import wait_for_document_ready, wait_for_network_idle, wait_for_scroll_stable, wait_stats
+from resource_blocking import apply_resource_blocking, resource_report
+from js_extract import extract_detail_fields
 
 # Ensure UTF-8 encoding for standard output
 sys.stdout.reconfigure(encoding='utf-8')
@@ -26,13 +30,139 @@ def set_windows_proxy_from_pac(pac_url):
     except Exception as e:
         print(f"Failed to set system proxy: {e}")
 
-def fetch_job_detail(driver, url):
-    """Fetch detailed job information from a specific URL"""
+# Detail page selectors, shared by the static HTML and the browser code paths
+EURAXESS_DETAIL_SELECTORS = {
+    'title': ['.job-title', 'h1'],
+    'institution': ['.organisation-name'],
+    'location': ['.country-name'],
+    'posted': ['.submitted-date'],
+}
+
+MSCA_DETAIL_SELECTORS = {
+    'title': [
+        "h1.job-title",
+        "h1.title",
+        ".position-title",
+        "#page-title",
+        "h1"
+    ],
+    'content': [
+        ".job-description",
+        ".field--name-body",
+        ".description",
+        "article",
+        "main",
+        ".content"
+    ],
+    'institution': [
+        ".field--name-field-institution",
+        ".institution-name",
+        ".organization",
+        "[class*='institution']",
+        "[class*='organization']"
+    ],
+    'location': [
+        ".field--name-field-location",
+        ".location-info",
+        ".country",
+        "[class*='location']",
+        "[class*='country']"
+    ],
+    'posted': [
+        ".field--name-field-posting-date",
+        ".date-posted",
+        ".post-date",
+        "[class*='date']"
+    ],
+    'contract': [
+        ".field--name-field-duration",
+        ".contract-duration",
+        ".period",
+        "[class*='duration']"
+    ],
+}
+
+MSCA_SECTION_SELECTOR = ".field--type-text-with-summary, .field--type-text-long"
+
+def format_field_groups(pairs):
+    """Join EURAXESS field-group (label, value) pairs into the content text"""
+    return "\\n\\n".join(f"{label}:\\n{value}" for label, value in pairs)
+
+def extract_contract_from_content(content):
+    """Find the contract duration in free text when no dedicated field exists"""
+    duration_patterns = [
+        r'duration[:：]\s*([\w\s\-]+)',
+        r'contract period[:：]\s*([\w\s\-]+)',
+        r'period[:：]\s*([\w\s\-]+)',
+        r'contract[:：]\s*([\w\s\-]+\s+(?:month|year|months|years))',
+        r'(\d+\s+(?:month|year|months|years))',
+        r'((?:fixed[- ]term|temporary)[^.]*(?:\d+\s+(?:month|year|months|years)))'
+    ]
+
+    for pattern in duration_patterns:
+        match = re.search(pattern, content, re.IGNORECASE)
+        if match:
+            return match.group(1).strip()
+    return ''
+
+def fetch_job_detail_static(url):
+    """Parse a detail page from its server-rendered HTML.
+
+    Returns None when the static HTML lacks the nodes the browser path relies
+    on, so the caller can fall back to Selenium.
+    """
+    if "euraxess.ec.europa.eu" in url:
+        soup = fetch_static_soup(url, required_selectors=[".group-job-basic-info"], source='euraxess')
+        if soup is None:
+            return None
+        fields = {name: select_text(soup, selectors) for name, selectors in EURAXESS_DETAIL_SELECTORS.items()}
+        pairs = []
+        for section in soup.select(".field-group"):
+            label = select_text(section, ".field-label")
+            value = select_text(section, ".field-items")
+            if label and value:
+                pairs.append((label, value))
+        # Same fallback as the browser path: the basic-info block when there are no field groups
+        fields['content'] = format_field_groups(pairs) if pairs else select_text(soup, ".group-job-basic-info")
+        if not (fields['title'] and fields['content']):
+            print("Static HTML lacks title or content, falling back to browser")
+            return None
+        fields['contract'] = ''
+        contract_node = soup.find(string=re.compile('Type of Contract:'))
+        if contract_node is not None and contract_node.parent is not None and contract_node.parent.parent is not None:
+            fields['contract'] = element_text(contract_node.parent.parent)
+        return fields
+
+    soup = fetch_static_soup(url, source='euraxess')
+    if soup is None:
+        return None
+    fields = {name: select_text(soup, selectors) for name, selectors in MSCA_DETAIL_SELECTORS.items()}
+    if not fields['content']:
+        fields['content'] = "\n\n".join(element_text(section) for section in soup.select(MSCA_SECTION_SELECTOR))
+    if not (fields['title'] and fields['content']):
+        print("Static HTML lacks title or content, falling back to browser")
+        return None
+    if not fields['contract']:
+        fields['contract'] = extract_contract_from_content(fields['content'])
+    return fields
+
+# EURAXESS field-group label/value pairs that make up the content
+EURAXESS_FIELD_GROUPS = {
+    'groups': {'container': '.field-group', 'label': '.field-label', 'value': '.field-items'},
+}
+
+def fetch_job_detail_browser(driver, url):
+    """Render a detail page in the browser and extract its fields.
+
+    All candidate selectors for all fields are evaluated by one injected
+    script, which keeps the first non-empty match per field.
+    """
     driver.get(url)
-    time.sleep(2)
+    wait_for_document_ready(driver, timeout=10)
+    resource_report.record_page(driver)
 
     # Initialize variables
-    title = content = institution = location = posted = contract = ''
+    fields = dict.fromkeys(['title', 'content', 'institution', 'location', 'posted', 'contract'], '')
 
     try:
         # Check if it's a EURAXESS page
@@ -41,196 +171,69 @@ def fetch_job_detail(driver, url):
             WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((By.CLASS_NAME, "group-job-basic-info"))
             )
-            
-            # Get title
-            try:
-                title = driver.find_element(By.CLASS_NAME, "job-title").text.strip()
-            except:
-                try:
-                    title = driver.find_element(By.TAG_NAME, "h1").text.strip()
-                except:
-                    pass
-            
-            # Get content
-            try:
-                content_sections = driver.find_elements(By.CLASS_NAME, "field-group")
-                contents = []
-                for section in content_sections:
-                    try:
-                        label = section.find_element(By.CLASS_NAME, "field-label").text.strip()
-                        value = section.find_element(By.CLASS_NAME, "field-items").text.strip()
-                        contents.append(f"{label}:\\n{value}")
-                    except:
-                        continue
-                content = "\\n\\n".join(contents)
-            except:
-                try:
-                    content = driver.find_element(By.CLASS_NAME, "group-job-basic-info").text.strip()
-                except:
-                    pass
-            
-            # Get institution
-            try:
-                institution = driver.find_element(By.CLASS_NAME, "organisation-name").text.strip()
-            except:
-                pass
-            
-            # Get location
-            try:
-                location = driver.find_element(By.CLASS_NAME, "country-name").text.strip()
-            except:
-                pass
-            
-            # Get posted date
-            try:
-                posted = driver.find_element(By.CLASS_NAME, "submitted-date").text.strip()
-            except:
-                pass
-            
-            # Get contract information
-            try:
-                contract_elem = driver.find_element(By.XPATH, "//*[contains(text(), 'Type of Contract:')]")
-                contract = contract_elem.find_element(By.XPATH, "..").text.strip()
-            except:
-                pass
-            
-        else:
-            # Original MSCA selectors
-            # Try multiple title selectors
-            title_selectors = [
-                "h1.job-title",
-                "h1.title",
-                ".position-title",
-                "#page-title",
-                "h1"
-            ]
-            for selector in title_selectors:
-                try:
-                    title = driver.find_element(By.CSS_SELECTOR, selector).text.strip()
-                    if title:
-                        break
-                except:
-                    continue
-
-            # Try multiple content selectors
-            content_selectors = [
-                ".job-description",
-                ".field--name-body",
-                ".description",
-                "article",
-                "main",
-                ".content"
-            ]
-            for selector in content_selectors:
-                try:
-                    content = driver.find_element(By.CSS_SELECTOR, selector).text.strip()
-                    if content:
-                        break
-                except:
-                    continue
-
-            if not content:
-                # Fallback: get all text from specific sections
-                try:
-                    sections = driver.find_elements(By.CSS_SELECTOR, ".field--type-text-with-summary, .field--type-text-long")
-                    content = "\n\n".join([section.text.strip() for section in sections])
-                except:
-                    # Last resort: get body text
-                    content = driver.find_element(By.TAG_NAME, "body").text.strip()
-
-            # Institution name
-            institution_selectors = [
-                ".field--name-field-institution",
-                ".institution-name",
-                ".organization",
-                "[class*='institution']",
-                "[class*='organization']"
-            ]
-            for selector in institution_selectors:
-                try:
-                    institution = driver.find_element(By.CSS_SELECTOR, selector).text.strip()
-                    if institution:
-                        break
-                except:
-                    continue
 
-            # Location information
-            location_selectors = [
-                ".field--name-field-location",
-                ".location-info",
-                ".country",
-                "[class*='location']",
-                "[class*='country']"
-            ]
-            for selector in location_selectors:
-                try:
-                    location = driver.find_element(By.CSS_SELECTOR, selector).text.strip()
-                    if location:
-                        break
-                except:
-                    continue
+            selectors = dict(EURAXESS_DETAIL_SELECTORS, basic_info='.group-job-basic-info')
+            values, timings = extract_detail_fields(
+                driver, selectors,
+                groups=EURAXESS_FIELD_GROUPS,
+                label_parents={'contract': 'Type of Contract:'}
+            )
+            fields.update({name: values[name] for name in EURAXESS_DETAIL_SELECTORS})
+            fields['contract'] = values['contract']
+            fields['content'] = format_field_groups(values['groups']) if values['groups'] else values['basic_info']
 
-            # Posted date
-            posting_date_selectors = [
-                ".field--name-field-posting-date",
-                ".date-posted",
-                ".post-date",
-                "[class*='date']"
-            ]
-            for selector in posting_date_selectors:
-                try:
-                    posted = driver.find_element(By.CSS_SELECTOR, selector).text.strip()
-                    if posted:
-                        break
-                except:
-                    continue
+        else:
+            # Original MSCA selectors, plus the section and body fallbacks for content
+            selectors = dict(MSCA_DETAIL_SELECTORS,
+                             sections={'selectors': MSCA_SECTION_SELECTOR, 'all': True},
+                             body='body')
+            values, timings = extract_detail_fields(driver, selectors)
+            fields.update({name: values[name] for name in MSCA_DETAIL_SELECTORS})
 
-            # Contract duration
-            contract_selectors = [
-                ".field--name-field-duration",
-                ".contract-duration",
-                ".period",
-                "[class*='duration']"
-            ]
-            for selector in contract_selectors:
-                try:
-                    contract = driver.find_element(By.CSS_SELECTOR, selector).text.strip()
-                    if contract:
-                        break
-                except:
-                    continue
+            if not fields['content']:
+                # Fallback: get all text from specific sections, last resort body text
+                fields['content'] = values['sections'] or values['body']
 
             # If contract duration not found in specific fields, try to find it in the content
-            if not contract:
-                duration_patterns = [
-                    r'duration[:：]\s*([\w\s\-]+)',
-                    r'contract period[:：]\s*([\w\s\-]+)',
-                    r'period[:：]\s*([\w\s\-]+)',
-                    r'contract[:：]\s*([\w\s\-]+\s+(?:month|year|months|years))',
-                    r'(\d+\s+(?:month|year|months|years))',
-                    r'((?:fixed[- ]term|temporary)[^.]*(?:\d+\s+(?:month|year|months|years)))'
-                ]
-                
-                for pattern in duration_patterns:
-                    match = re.search(pattern, content, re.IGNORECASE)
-                    if match:
-                        contract = match.group(1).strip()
-                        break
+            if not fields['contract']:
+                fields['contract'] = extract_contract_from_content(fields['content'])
+
+        print(f"Detail fields extracted in {timings['roundtrip_ms']:.0f} ms "
+              f"(script {timings['script_ms']:.0f} ms)")
 
     except Exception as e:
         print(f"Error fetching job details: {e}")
 
+    return fields
+
+def fetch_job_detail(driver, url):
+    """Fetch detailed job information from a specific URL
+
+    Server-rendered pages are parsed from plain HTTP responses; the browser
+    is only used when the static HTML lacks the expected nodes.
+    """
+    fields = fetch_job_detail_static(url)
+    if fields is None:
+        fields = fetch_job_detail_browser(driver, url)
+        if fields['title'] and fields['content']:
+            cache_rendered_page(driver, url, source='euraxess')
+
     # Clean up the data
-    title = title.replace('\n', ' ').strip()
-    institution = institution.replace('\n', ' ').strip()
-    location = location.replace('\n', ' ').strip()
-    posted = posted.replace('\n', ' ').strip()
-    contract = contract.replace('\n', ' ').strip()
+    title = fields['title'].replace('\n', ' ').strip()
+    content = fields['content']
+    institution = fields['institution'].replace('\n', ' ').strip()
+    location = fields['location'].replace('\n', ' ').strip()
+    posted = fields['posted'].replace('\n', ' ').strip()
+    contract = fields['contract'].replace('\n', ' ').strip()
 
     return title, content, institution, location, posted, contract
 
-def fetch_msca_jobs(use_headless=True, selected_model=None):
-    """Fetch job postings from MSCA and EURAXESS websites"""
+def fetch_msca_jobs(use_headless=True, selected_model=None, block_resources=True):
+    """Fetch job postings from MSCA and EURAXESS websites
+
+    With ``block_resources`` images, fonts, media, analytics and ad requests
+    are blocked through CDP.
+    """
     set_windows_proxy_from_pac("http://127.0.0.1:55624/proxy.pac")
     
     # Update base URLs with correct format
@@ -319,6 +322,8 @@ def fetch_msca_jobs(use_headless=True, selected_model=None):
 
     # Set page load timeout
     driver.set_page_load_timeout(30)
+    if block_resources:
+        apply_resource_blocking(driver)
     all_jobs = []
 
     # Process each section
@@ -326,7 +331,8 @@ def fetch_msca_jobs(use_headless=True, selected_model=None):
         print(f"\nProcessing {section_type} section: {section_url}")
         try:
             driver.get(section_url)
-            time.sleep(5)  # Wait for page to load
+            wait_for_document_ready(driver, timeout=15)
+            resource_report.record_page(driver)
 
             # Try to find job listings
             found_jobs = fetch_euraxess_jobs(driver, section_type)
@@ -337,11 +343,30 @@ def fetch_msca_jobs(use_headless=True, selected_model=None):
         except Exception as e:
             print(f"Error processing {section_type} section: {e}")
 
-    # Fetch detailed information for each job
+    # Fetch detailed information for each job, saving each one as soon as it is done
+    run_id = job_store.start_run('euraxess', model=selected_model)
     job_details = []
+
+    def keep(job_detail):
+        job_details.append(job_detail)
+        job_store.save_job('euraxess', job_detail, run_id=run_id, model=selected_model)
+
     print("\nFetching job details...")
     for i, job in enumerate(all_jobs):
         print(f"Processing job {i+1}/{len(all_jobs)} ({int((i+1)/len(all_jobs)*100)}%): {job['title'][:30]}...")
+        # Skip postings already processed whose listing card has not changed
+        record = seen_index.lookup_listing(job['link'], listing_hash(job), source='euraxess')
+        if record is not None:
+            keep(dict(record, type=job['type']))
+            print(f"Job {i+1}/{len(all_jobs)} already processed and unchanged, skipped")
+            continue
+        # Reuse the previous result when the page is unchanged (still fresh or 304 Not Modified)
+        record = unchanged_record(job['link'], source='euraxess')
+        if record is not None:
+            keep(dict(record, type=job['type']))
+            seen_index.add(job['link'], source='euraxess', listing_digest=listing_hash(job))
+            print(f"Job {i+1}/{len(all_jobs)} unchanged, reused previous result")
+            continue
         try:
             detail_title, detail_content, inst2, loc2, posted, contract = fetch_job_detail(driver, job['link'])
         except InvalidSessionIdException:
@@ -355,6 +380,8 @@ def fetch_msca_jobs(use_headless=True, selected_model=None):
             try:
                 driver = webdriver.Chrome(options=options)
                 driver.set_page_load_timeout(30)
+                if block_resources:
+                    apply_resource_blocking(driver)
                 detail_title, detail_content, inst2, loc2, posted, contract = fetch_job_detail(driver, job['link'])
             except Exception as e:
                 print(f"Error reinitializing driver or fetching job details: {e}")
@@ -365,7 +392,7 @@ def fetch_msca_jobs(use_headless=True, selected_model=None):
         institution = inst2 or job.get('institution', '')
         location = loc2 or job.get('location', '')
 
-        job_details.append({
+        job_detail = {
             "title": detail_title or job['title'],
             "content": detail_content,
             "link": job['link'],
@@ -374,10 +401,19 @@ def fetch_msca_jobs(use_headless=True, selected_model=None):
             "posted": posted,
             "contract": contract,
             "type": job['type']  # Keep track of whether it's PhD or Postdoc
-        })
+        }
+        keep(job_detail)
+        page_cache.put_record(job['link'], job_detail)
+        seen_index.add(job['link'], source='euraxess', listing_digest=listing_hash(job),
+                       content_digest=content_hash(job_detail['title'], job_detail['content']))
         print(f"Job {i+1}/{len(all_jobs)} processed")
 
     driver.quit()
+    job_store.finish_run(run_id)
+    wait_stats.report()
+    resource_report.report()
+    page_cache.report()
+    seen_index.report()
     return job_details
 
 def classify_position(title, content):
@@ -479,18 +515,11 @@ def fetch_jobs_with_js_and_network(driver, section_url):
         
         print(f"Navigating to {section_url}")
         driver.get(section_url)
-        time.sleep(5)  # Wait for initial load
+        wait_for_network_idle(driver, timeout=10)
         
-        # Scroll to load more content
+        # Scroll to load more content, moving on as soon as the height stops growing
         print("Scrolling page to trigger dynamic loading...")
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        while True:
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                break
-            last_height = new_height
+        wait_for_scroll_stable(driver)
         
         # Try to find job listings
         print("Searching for job listings...")
@@ -570,7 +599,7 @@ def fetch_jobs_with_js_and_network(driver, section_url):
         return []
     finally:
         try:
-            driver.execute_cdp_cmd('Network.disable', {})
+            # Network stays enabled: resource blocking depends on it
             driver.execute_cdp_cmd('Page.disable', {})
         except:
             pass
@@ -605,7 +634,8 @@ def fetch_euraxess_jobs(driver, section_type):
         
         if not found_element:
             print("Primary selectors not found, trying secondary approach...")
-            # Wait for any job-related links as fallback            def find_job_links(driver):
+            # Wait for any job-related links as fallback
+            def find_job_links(driver):
                 links = driver.find_elements(By.TAG_NAME, "a")
                 job_links = []
                 for link in links:
@@ -623,7 +653,7 @@ def fetch_euraxess_jobs(driver, section_type):
             print("Found job-related links")
         
         # Let the page fully render
-        time.sleep(5)
+        wait_for_network_idle(driver, timeout=10)
           # Try EURAXESS specific selectors first, then fall back to general ones
         job_selectors = [
             ".ecl-content-block",           # Primary EURAXESS selector
@@ -857,7 +887,7 @@ def fetch_euraxess_jobs(driver, section_type):
                             print("Failed to load next page")
                             break
                 
-                time.sleep(5)  # Wait for new content to load
+                wait_for_network_idle(driver, timeout=10)  # Wait for new content to load
                 
                 # Process the new page's job cards
                 # ... (same job card processing code as above)
@@ -0,0 +1,980 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_SERVERS = ["http://rf-calcul:11434"]
+# Comma-separated list of Ollama base URLs overriding DEFAULT_SERVERS
+SERVERS_ENV_VAR = "OLLAMA_HOSTS"
+HEDGE_ENV_VAR = "OLLAMA_HEDGE"
+DEFAULT_MODEL = "deepseek-r1:70b"
+BACKUP_MODEL = "qwen3:30b-a3b"
+
+JSON_HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json",
+}
+
+
+class OllamaResponseError(Exception):
+    """The server answered, but not with a usable /api/generate response"""
+
+
+class CircuitOpenError(Exception):
+    """A call was not sent because the (server, model) circuit is open"""
+
+
+class SlotTimeoutError(requests.exceptions.Timeout):
+    """No concurrency slot on the server freed up in time; the request was never sent"""
+
+
+class TruncatedGenerationError(OllamaResponseError):
+    """The model ran into its length limit and the output could not be salvaged"""
+
+    def __init__(self, message, generation=None):
+        super().__init__(message)
+        self.generation = generation
+
+
+# Characters after which a truncated answer can be cut cleanly
+SENTENCE_ENDINGS = "。！？；.!?;"
+
+
+class GenerationProfile:
+    """Bounded generation settings for one LLM task.
+
+    ``num_predict`` caps the tokens the server generates (for
+    ``tokens_per_input_char`` tasks it grows with the input, up to
+    ``max_num_predict``), ``think=False`` asks reasoning models to skip their
+    think phase, and ``stop`` strings and ``max_chars`` cancel the stream
+    client-side. Stop strings are matched on the visible answer rather than
+    sent to the server, where they could match inside a think block. ``on_truncation`` decides what happens when the
+    limit is hit: ``'trim'`` cuts back to the last full sentence, ``'fail'``
+    raises TruncatedGenerationError so the caller falls back.
+    """
+
+    def __init__(self, name, num_predict, stop=None, think=False, max_chars=None, options=None,
+                 tokens_per_input_char=None, max_num_predict=None, on_truncation="trim", min_chars=1):
+        self.name = name
+        self.num_predict = num_predict
+        self.stop = list(stop or [])
+        self.think = think
+        self.max_chars = max_chars
+        self.options = dict(options or {})
+        self.tokens_per_input_char = tokens_per_input_char
+        self.max_num_predict = max_num_predict
+        self.on_truncation = on_truncation
+        self.min_chars = min_chars
+
+    def num_predict_for(self, input_text=None):
+        if self.tokens_per_input_char and input_text:
+            limit = self.num_predict + int(len(input_text) * self.tokens_per_input_char)
+            return min(limit, self.max_num_predict or limit)
+        return self.num_predict
+
+    def max_chars_for(self, input_text=None):
+        if self.max_chars is None and self.tokens_per_input_char and input_text:
+            # Same budget as num_predict, counted in characters
+            return self.num_predict_for(input_text)
+        return self.max_chars
+
+    def request_options(self, input_text=None, **overrides):
+        options = dict(self.options, num_predict=self.num_predict_for(input_text))
+        options.update(overrides)
+        return options
+
+    def validate(self, generation):
+        """Return the usable text of ``generation`` or raise TruncatedGenerationError"""
+        text = generation.text.strip()
+        if generation.truncated:
+            if self.on_truncation != "trim":
+                raise TruncatedGenerationError(
+                    f"{self.name} output truncated ({generation.done_reason}) after {len(text)} chars", generation)
+            cut = max(text.rfind(ch) for ch in SENTENCE_ENDINGS)
+            text = text[:cut + 1] if cut >= 0 else ""
+        if len(text) < self.min_chars:
+            raise TruncatedGenerationError(
+                f"{self.name} output too short ({len(text)} chars, done: {generation.done_reason})", generation)
+        return text
+
+
+# Per-task generation profiles shared by all scrapers
+GENERATION_PROFILES = {
+    "translation": GenerationProfile(
+        "translation", num_predict=64, stop=["\n\nNote", "\n\n注", "\n\n（注"], think=False,
+        options={"temperature": 0.2},
+        tokens_per_input_char=1.0, max_num_predict=2048, on_truncation="fail"),
+    "highlight": GenerationProfile(
+        # No stop strings: models often open with a short heading and a blank line
+        "highlight", num_predict=400, think=False, max_chars=500,
+        options={"temperature": 0.7, "top_p": 0.9}, min_chars=10),
+    "summary": GenerationProfile(
+        "summary", num_predict=1200, think=False, max_chars=2000,
+        options={"temperature": 0.5, "top_p": 0.9}, min_chars=20),
+}
+
+
+def get_profile(task):
+    return GENERATION_PROFILES[task]
+
+
+def hedging_enabled():
+    """True when $OLLAMA_HEDGE is set to 1/true/yes/on"""
+    return os.environ.get(HEDGE_ENV_VAR, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def configured_servers():
+    """Ollama servers from $OLLAMA_HOSTS, else DEFAULT_SERVERS"""
+    value = os.environ.get(SERVERS_ENV_VAR, "")
+    servers = [host.strip().rstrip("/") for host in value.split(",") if host.strip()]
+    return servers or list(DEFAULT_SERVERS)
+
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+
+def _partial_tag_length(text, tag):
+    """Length of the longest suffix of ``text`` that is a proper prefix of ``tag``"""
+    for length in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
+
+
+class ThinkFilter:
+    """Incrementally drops ``<think>...</think>`` blocks from streamed model output.
+
+    Chunks may split tags anywhere. A ``</think>`` without an opening tag
+    (some templates open the block in the prompt) discards everything
+    received before it. The visible answer so far is in ``text``.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.in_think = False
+        self.discarded = 0
+        self._pending = ""
+
+    def feed(self, chunk):
+        """Add a chunk; returns the newly visible text"""
+        buffer = self._pending + chunk
+        visible = []
+        while buffer:
+            if self.in_think:
+                idx = buffer.find(THINK_CLOSE)
+                if idx == -1:
+                    keep = _partial_tag_length(buffer, THINK_CLOSE)
+                    self.discarded += len(buffer) - keep
+                    buffer = buffer[len(buffer) - keep:]
+                    break
+                self.discarded += idx
+                buffer = buffer[idx + len(THINK_CLOSE):]
+                self.in_think = False
+                continue
+            open_idx = buffer.find(THINK_OPEN)
+            close_idx = buffer.find(THINK_CLOSE)
+            if close_idx != -1 and (open_idx == -1 or close_idx < open_idx):
+                # Unopened think block: everything so far was reasoning
+                self.discarded += len(self.text) + sum(map(len, visible)) + close_idx
+                self.text = ""
+                visible = []
+                buffer = buffer[close_idx + len(THINK_CLOSE):]
+                continue
+            if open_idx == -1:
+                keep = max(_partial_tag_length(buffer, THINK_OPEN), _partial_tag_length(buffer, THINK_CLOSE))
+                visible.append(buffer[:len(buffer) - keep])
+                buffer = buffer[len(buffer) - keep:]
+                break
+            visible.append(buffer[:open_idx])
+            buffer = buffer[open_idx + len(THINK_OPEN):]
+            self.in_think = True
+        self._pending = buffer
+        new_text = "".join(visible)
+        self.text += new_text
+        return new_text
+
+    def flush(self):
+        """End of stream: release any held-back partial tag text"""
+        if not self.in_think:
+            self.text += self._pending
+        self._pending = ""
+        return self.text
+
+
+class Generation:
+    """Result of a streamed generation.
+
+    ``done_reason`` is ``'stop'`` when the model finished on its own,
+    ``'length'`` when num_predict or ``max_chars`` cut it off,
+    ``'stop_sequence'`` when a stop string ended it early, ``'timeout'``
+    when the overall deadline passed and ``'cancelled'`` when the caller
+    gave up on it (the losing side of a hedged request).
+    """
+
+    def __init__(self, text, done_reason, thinking_chars=0, elapsed=0.0):
+        self.text = text
+        self.done_reason = done_reason
+        self.thinking_chars = thinking_chars
+        self.elapsed = elapsed
+
+    @property
+    def truncated(self):
+        return self.done_reason in ("length", "timeout")
+
+
+class ServerHealth:
+    """Result of probing one server: its version and the status of the requested models"""
+
+    def __init__(self, server, version=None, models=None, error=None, elapsed=0.0):
+        self.server = server
+        self.version = version
+        self.models = dict(models or {})  # model -> 'loaded' / 'unloaded' / 'missing'
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def healthy(self):
+        return self.error is None
+
+    def has(self, model):
+        return self.models.get(model) in ("loaded", "unloaded")
+
+
+def is_server_failure(error):
+    """Connection problems, timeouts and 5xx count against a server; 4xx (e.g. unknown model) do not"""
+    response = getattr(error, "response", None)
+    return response is None or response.status_code >= 500
+
+
+class ServerState:
+    """Load and health bookkeeping for one server"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.latency = None  # EWMA of successful generate calls, seconds
+        self.failures = 0  # consecutive
+        self.ejected_until = 0.0
+        self.requests = 0
+
+
+class CircuitBreaker:
+    """Failure tracking for one (server, model) pair.
+
+    ``closed``: calls go through. After ``failure_threshold`` consecutive
+    failures the circuit becomes ``open`` and calls are refused for
+    ``reset_timeout`` seconds. Then it is ``half_open``: a single trial call
+    is let through, closing the circuit on success and reopening it on
+    failure. Not thread-safe on its own; CircuitBreakers holds the lock.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=120):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_running = False
+        self.trips = 0
+        self.rejected = 0
+
+    def allow(self, now):
+        if self.state == "open" and now - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self.trial_running = False
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self.trial_running:
+            self.trial_running = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.trial_running = False
+
+    def release(self):
+        self.trial_running = False
+
+    def record_failure(self, now):
+        self.failures += 1
+        self.trial_running = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+            self.state = "open"
+            self.opened_at = now
+
+
+class CircuitBreakers:
+    """Circuit breakers keyed by (server, model), shared by every OllamaClient in the process"""
+
+    def __init__(self, failure_threshold=3, reset_timeout=120):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _get(self, server, model):
+        # Caller holds self._lock
+        breaker = self._breakers.get((server, model))
+        if breaker is None:
+            breaker = self._breakers[(server, model)] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return breaker
+
+    def allow(self, server, model):
+        with self._lock:
+            return self._get(server, model).allow(time.monotonic())
+
+    def record_success(self, server, model):
+        with self._lock:
+            self._get(server, model).record_success()
+
+    def release(self, server, model):
+        with self._lock:
+            self._get(server, model).release()
+
+    def record_failure(self, server, model):
+        with self._lock:
+            breaker = self._get(server, model)
+            was_open = breaker.state == "open"
+            breaker.record_failure(time.monotonic())
+            if breaker.state == "open" and not was_open:
+                print(f"Circuit for {model} on {server} opened after {breaker.failures} failures; "
+                      f"calls short-circuit for {breaker.reset_timeout}s")
+
+    def state(self, server, model):
+        with self._lock:
+            breaker = self._breakers.get((server, model))
+            return breaker.state if breaker else "closed"
+
+    def reset(self):
+        with self._lock:
+            self._breakers = {}
+
+    def report(self):
+        """Print the breakers that tripped or refused calls during this run"""
+        with self._lock:
+            tripped = {key: breaker for key, breaker in self._breakers.items() if breaker.trips or breaker.rejected}
+            if not tripped:
+                return
+            print("\nLLM circuit breaker report:")
+            for (server, model), breaker in sorted(tripped.items()):
+                print(f"  {model} @ {server}: {breaker.state}, tripped {breaker.trips}x, "
+                      f"{breaker.rejected} calls short-circuited")
+
+
+# Shared by all clients (and so all LLM helpers) in the process
+circuit_breakers = CircuitBreakers()
+
+
+class OllamaClient:
+    """Thread-safe client that balances requests over one or more Ollama servers.
+
+    Keeps one keep-alive ``requests.Session`` per server so repeated calls
+    reuse TCP connections. Generate calls are routed to the server with the
+    fewest outstanding requests weighted by its observed latency; each server
+    runs at most ``max_in_flight`` generations at once, and a server that
+    fails ``max_failures`` times in a row is left out for ``eject_seconds``.
+    Timeouts are ``(connect, read)`` pairs in seconds.
+
+    With ``stream`` (the default) generations are streamed: think blocks
+    are dropped as they arrive and the request is cancelled as soon as the
+    answer hits ``max_chars`` or a stop string.
+
+    Model lists from ``/api/tags`` are cached for ``tags_ttl`` seconds;
+    availability checks only read ``/api/tags`` and ``/api/ps`` and never
+    start a generation, so they cannot force a model load. Servers are
+    probed concurrently with ``probe_timeout`` for both connect and read,
+    and the results are kept in ``health_table()`` for the rest of the run.
+
+    Every generate request carries ``keep_alive`` so the server keeps the
+    model in memory between jobs; ``warm_up`` loads models ahead of the
+    first real request.
+
+    Generate calls go through the (server, model) circuit breakers in
+    ``breakers`` (the process-wide ``circuit_breakers`` by default): once a
+    circuit is open, calls raise CircuitOpenError immediately so callers
+    move on to their fallback instead of waiting for another timeout.
+
+    With ``hedge`` (or $OLLAMA_HEDGE), ``generate_task_hedged`` sends a
+    second request to another server, or to a backup model, once the first
+    has run longer than the observed ``hedge_quantile`` latency of its task;
+    the first good answer wins and the other request is cancelled.
+    """
+
+    def __init__(self, servers=None, connect_timeout=5, info_timeout=30, generate_timeout=600, pool_size=10,
+                 max_in_flight=2, max_failures=2, eject_seconds=60, latency_alpha=0.3, stream=True, tags_ttl=300,
+                 probe_timeout=3, keep_alive="30m", breakers=None, hedge=None, hedge_quantile=0.9,
+                 hedge_min_samples=5, latency_window=50):
+        self.servers = list(servers or configured_servers())
+        self.stream = stream
+        self.connect_timeout = connect_timeout
+        self.info_timeout = info_timeout
+        self.generate_timeout = generate_timeout
+        self.pool_size = pool_size
+        self.max_in_flight = max_in_flight
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.latency_alpha = latency_alpha
+        self.tags_ttl = tags_ttl
+        self.probe_timeout = probe_timeout
+        self.keep_alive = keep_alive
+        self.breakers = breakers or circuit_breakers
+        self.hedge = hedging_enabled() if hedge is None else hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.latency_window = latency_window
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._task_latencies = {}  # task -> recent generation times, seconds
+        self._tags = {}  # server -> (expires_at, model names)
+        self._health = {}  # server -> ServerHealth of the latest probe
+        self._sessions = {}
+        self._states = {server: ServerState() for server in self.servers}
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+
+    def session(self, server):
+        """Return the pooled session for ``server``"""
+        with self._lock:
+            session = self._sessions.get(server)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(JSON_HEADERS)
+                self._sessions[server] = session
+            return session
+
+    def _state(self, server):
+        # Caller holds self._lock
+        state = self._states.get(server)
+        if state is None:
+            state = self._states[server] = ServerState()
+        return state
+
+    def _score(self, server, now):
+        state = self._state(server)
+        return (
+            state.ejected_until > now,
+            state.in_flight >= self.max_in_flight,
+            (state.in_flight + 1) * (state.latency or 0.0),
+            state.in_flight,
+            state.requests,
+        )
+
+    def server_order(self, host=None):
+        """Servers to try in order: ``host`` if given, else the least loaded healthy server first.
+
+        Ejected servers are only included (last) when every server is ejected.
+        """
+        if host:
+            return [host]
+        now = time.monotonic()
+        with self._lock:
+            ordered = sorted(self.servers, key=lambda server: self._score(server, now))
+            healthy = [server for server in ordered if self._state(server).ejected_until <= now]
+        return healthy or ordered
+
+    def mark_success(self, server):
+        """Record that ``server`` answered, clearing its failure count and any ejection"""
+        with self._lock:
+            state = self._state(server)
+            state.failures = 0
+            state.ejected_until = 0.0
+
+    def mark_failure(self, server):
+        """Record a failed call; eject the server after ``max_failures`` failures in a row"""
+        with self._lock:
+            state = self._state(server)
+            state.failures += 1
+            if state.failures >= self.max_failures:
+                state.ejected_until = time.monotonic() + self.eject_seconds
+                print(f"Ollama server {server} failed {state.failures} times, ejected for {self.eject_seconds}s")
+
+    @contextmanager
+    def _slot(self, server, timeout, cancel=None):
+        """Hold one of ``server``'s concurrency slots for the duration of a request.
+
+        The latency EWMA is only fed by requests that ran to completion: one
+        cancelled by the caller (a hedge loser) says nothing about the server's speed.
+        """
+        deadline = time.monotonic() + timeout
+        with self._slot_freed:
+            state = self._state(server)
+            while state.in_flight >= self.max_in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise SlotTimeoutError(f"No free slot on {server}")
+                self._slot_freed.wait(remaining)
+            state.in_flight += 1
+            state.requests += 1
+        start = time.monotonic()
+        try:
+            yield
+        except requests.exceptions.RequestException as e:
+            if is_server_failure(e):
+                self.mark_failure(server)
+            raise
+        else:
+            elapsed = time.monotonic() - start
+            with self._lock:
+                if cancel is None or not cancel.is_set():
+                    state.latency = elapsed if state.latency is None else (
+                        self.latency_alpha * elapsed + (1 - self.latency_alpha) * state.latency)
+                state.failures = 0
+                state.ejected_until = 0.0
+        finally:
+            with self._slot_freed:
+                state.in_flight -= 1
+                self._slot_freed.notify_all()
+
+    @contextmanager
+    def _guard(self, server, model):
+        """Refuse the call if the (server, model) circuit is open, and record its outcome"""
+        if not self.breakers.allow(server, model):
+            raise CircuitOpenError(f"Circuit open for {model} on {server}")
+        try:
+            yield
+        except SlotTimeoutError:
+            # Our own queue was full, the server never saw the call
+            self.breakers.release(server, model)
+            raise
+        except (requests.exceptions.RequestException, OllamaResponseError):
+            self.breakers.record_failure(server, model)
+            raise
+        except BaseException:
+            # Not the server's fault (e.g. KeyboardInterrupt); just free a half-open trial
+            self.breakers.release(server, model)
+            raise
+        else:
+            self.breakers.record_success(server, model)
+
+    def stats(self):
+        """Per-server in-flight count, latency EWMA, request count and ejection state"""
+        now = time.monotonic()
+        with self._lock:
+            return {server: {
+                "in_flight": state.in_flight,
+                "latency": state.latency,
+                "requests": state.requests,
+                "ejected": state.ejected_until > now,
+            } for server, state in self._states.items()}
+
+    def hedge_report(self):
+        if self.hedges:
+            print(f"\nHedged LLM requests: {self.hedges} sent, {self.hedge_wins} answered first")
+
+    def _timeout(self, read_timeout):
+        if isinstance(read_timeout, tuple):
+            return read_timeout
+        return (self.connect_timeout, read_timeout)
+
+    def get_json(self, server, path, timeout=None):
+        """GET ``server + path`` and return the decoded JSON body"""
+        resp = self.session(server).get(f"{server}{path}", timeout=self._timeout(timeout or self.info_timeout))
+        resp.raise_for_status()
+        return resp.json()
+
+    def version(self, server, timeout=5):
+        return self.get_json(server, "/api/version", timeout=timeout).get("version", "unknown")
+
+    def list_models(self, server, timeout=None, refresh=False):
+        """Names of the models installed on ``server``, cached for ``tags_ttl`` seconds"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._tags.get(server)
+        if cached is not None and cached[0] > now and not refresh:
+            return list(cached[1])
+        data = self.get_json(server, "/api/tags", timeout=timeout)
+        names = [info.get("name") for info in data.get("models", []) if info.get("name")]
+        with self._lock:
+            self._tags[server] = (now + self.tags_ttl, names)
+        return list(names)
+
+    def loaded_models(self, server, timeout=None):
+        """Names of the models currently loaded in memory on ``server`` (``/api/ps``)"""
+        data = self.get_json(server, "/api/ps", timeout=timeout)
+        return [info.get("name") or info.get("model") for info in data.get("models", [])
+                if info.get("name") or info.get("model")]
+
+    def model_status(self, server, model, timeout=None):
+        """Return ``'loaded'``, ``'unloaded'`` (installed but not in memory) or ``'missing'``"""
+        if model not in self.list_models(server, timeout=timeout):
+            return "missing"
+        return "loaded" if model in self.loaded_models(server, timeout=timeout) else "unloaded"
+
+    def probe(self, server, models=(), timeout=None):
+        """Check ``server``'s version and the status of ``models`` without generating"""
+        timeout = timeout or self.probe_timeout
+        start = time.monotonic()
+        try:
+            version = self.get_json(server, "/api/version", timeout=(timeout, timeout)).get("version", "unknown")
+            statuses = {}
+            if models:
+                installed = self.list_models(server, timeout=(timeout, timeout))
+                loaded = self.loaded_models(server, timeout=(timeout, timeout))
+                for model in models:
+                    statuses[model] = "missing" if model not in installed else (
+                        "loaded" if model in loaded else "unloaded")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            if is_server_failure(e):
+                self.mark_failure(server)
+            health = ServerHealth(server, error=str(e), elapsed=time.monotonic() - start)
+        else:
+            self.mark_success(server)
+            health = ServerHealth(server, version, statuses, elapsed=time.monotonic() - start)
+        with self._lock:
+            self._health[server] = health
+        return health
+
+    def _cached_health(self, server, models):
+        with self._lock:
+            health = self._health.get(server)
+        if health is not None and (not health.healthy or all(model in health.models for model in models)):
+            return health
+        return None
+
+    def find_server(self, models, require=None, servers=None, timeout=None, refresh=False):
+        """Probe servers concurrently and return the first healthy ServerHealth that has a model.
+
+        ``require`` is the model that must be installed (default: any of
+        ``models``). Returns as soon as one probe qualifies, or None when
+        none does; the remaining probes finish in the background and land
+        in ``health_table()``. Cached probe results are reused unless
+        ``refresh`` is set.
+        """
+        def qualifies(health):
+            if not health.healthy:
+                return False
+            return health.has(require) if require else any(health.has(model) for model in models)
+
+        servers = list(servers or self.servers)
+        pending = []
+        for server in servers:
+            health = None if refresh else self._cached_health(server, models)
+            if health is None:
+                pending.append(server)
+            elif qualifies(health):
+                return health
+        if not pending:
+            return None
+
+        executor = ThreadPoolExecutor(max_workers=len(pending))
+        try:
+            futures = [executor.submit(self.probe, server, models, timeout) for server in pending]
+            for future in as_completed(futures):
+                if qualifies(future.result()):
+                    return future.result()
+            return None
+        finally:
+            executor.shutdown(wait=False)
+
+    def load_model(self, server, model, timeout=None):
+        """Load ``model`` into memory on ``server`` (a generate call without a prompt) and return the seconds taken"""
+        payload = {"model": model, "stream": False}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        start = time.monotonic()
+        resp = self.session(server).post(f"{server}/api/generate", json=payload,
+                                         timeout=self._timeout(timeout or self.generate_timeout))
+        resp.raise_for_status()
+        return time.monotonic() - start
+
+    def warm_up(self, models, servers=None, wait=True, timeout=None):
+        """Preload ``models`` on every server that has them installed.
+
+        Servers come from the health table when they have been probed,
+        otherwise every healthy server is tried. With ``wait=False`` the
+        loads run in the background while the caller carries on (e.g.
+        starting browsers). Returns ``{(server, model): seconds or error}``,
+        empty when not waiting.
+        """
+        pairs = []
+        for server in servers or self.server_order():
+            health = self._cached_health(server, models)
+            if health is not None and not health.healthy:
+                continue
+            for model in models:
+                if health is None or health.has(model):
+                    pairs.append((server, model))
+        if not pairs:
+            return {}
+
+        def load(pair):
+            server, model = pair
+            try:
+                elapsed = self.load_model(server, model, timeout=timeout)
+            except requests.exceptions.RequestException as e:
+                if is_server_failure(e):
+                    self.mark_failure(server)
+                print(f"Warm-up of {model} on {server} failed: {e}")
+                return e
+            print(f"Warmed up {model} on {server} in {elapsed:.1f}s (keep_alive {self.keep_alive})")
+            return elapsed
+
+        executor = ThreadPoolExecutor(max_workers=len(pairs))
+        try:
+            futures = {pair: executor.submit(load, pair) for pair in pairs}
+            if not wait:
+                return {}
+            return {pair: future.result() for pair, future in futures.items()}
+        finally:
+            executor.shutdown(wait=False)
+
+    def health_table(self):
+        """Latest probe result per server"""
+        with self._lock:
+            return dict(self._health)
+
+    def availability(self, model, servers=None, timeout=None, refresh=False):
+        """Map each server to the status of ``model`` there, or ``'unreachable'`` (probed concurrently)"""
+        servers = list(servers or self.servers)
+        results = {}
+        pending = []
+        for server in servers:
+            health = None if refresh else self._cached_health(server, [model])
+            if health is None:
+                pending.append(server)
+            else:
+                results[server] = health
+        if pending:
+            with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                for health in executor.map(lambda server: self.probe(server, [model], timeout), pending):
+                    results[health.server] = health
+        return {server: results[server].models[model] if results[server].healthy else "unreachable"
+                for server in servers}
+
+    def generate(self, server, model, prompt, options=None, timeout=None, max_chars=None, stop=None, **fields):
+        """Run an /api/generate call and return the response text.
+
+        When streaming, think blocks are already removed and the text is cut
+        at ``max_chars`` / the first ``stop`` string. Otherwise the raw
+        response is returned.
+        """
+        if self.stream:
+            return self.generate_stream(server, model, prompt, options=options, timeout=timeout,
+                                        max_chars=max_chars, stop=stop, **fields).text
+        payload = {"model": model, "prompt": prompt, "stream": False}
+        if options:
+            payload["options"] = options
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        payload.update(fields)
+        read_timeout = timeout or self.generate_timeout
+        with self._guard(server, model), self._slot(server, read_timeout):
+            resp = self.session(server).post(f"{server}/api/generate", json=payload,
+                                             timeout=self._timeout(read_timeout))
+            resp.raise_for_status()
+            result = resp.json()
+        if not isinstance(result, dict) or "response" not in result:
+            raise OllamaResponseError(f"API响应格式错误: {result}")
+        return result["response"]
+
+    def generate_stream(self, server, model, prompt, options=None, timeout=None, max_chars=None, stop=None,
+                        cancel=None, **fields):
+        """Stream an /api/generate call and return a Generation.
+
+        NDJSON chunks are consumed as they arrive; think content is dropped
+        on the fly. The connection is closed (which makes Ollama abort the
+        generation) once the visible answer reaches ``max_chars``, contains
+        one of the ``stop`` strings, ``timeout`` seconds have passed or the
+        ``cancel`` event is set. A watcher closes the response as soon as
+        ``cancel`` fires, so a cancelled call does not wait for the next chunk
+        to give up its slot.
+        """
+        payload = {"model": model, "prompt": prompt, "stream": True}
+        if options:
+            payload["options"] = options
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        payload.update(fields)
+        read_timeout = timeout or self.generate_timeout
+        think = ThinkFilter()
+        done_reason = None
+        start = time.monotonic()
+        deadline = start + read_timeout
+
+        with self._guard(server, model), self._slot(server, read_timeout, cancel):
+            resp = self.session(server).post(f"{server}/api/generate", json=payload, stream=True,
+                                             timeout=self._timeout(read_timeout))
+            finished = threading.Event()
+            if cancel is not None:
+                threading.Thread(target=self._close_on_cancel, args=(cancel, finished, resp),
+                                 name="ollama-cancel", daemon=True).start()
+            try:
+                resp.raise_for_status()
+                for line in self._lines_until_cancelled(resp, cancel):
+                    if not line:
+                        continue
+                    try:
+                        chunk = json.loads(line)
+                    except ValueError:
+                        raise OllamaResponseError(f"API响应格式错误: {line[:200]!r}")
+                    if chunk.get("error"):
+                        raise OllamaResponseError(chunk["error"])
+                    think.feed(chunk.get("response", ""))
+                    if chunk.get("done"):
+                        done_reason = chunk.get("done_reason") or "stop"
+                        break
+                    if stop and any(s in think.text.lstrip() for s in stop):
+                        done_reason = "stop_sequence"
+                        break
+                    if max_chars and len(think.text.strip()) >= max_chars:
+                        done_reason = "length"
+                        break
+                    if time.monotonic() > deadline:
+                        done_reason = "timeout"
+                        break
+                    if cancel is not None and cancel.is_set():
+                        done_reason = "cancelled"
+                        break
+            finally:
+                finished.set()
+                resp.close()
+            if done_reason is None and cancel is not None and cancel.is_set():
+                done_reason = "cancelled"
+            if done_reason is None:
+                raise OllamaResponseError("Stream ended without a final chunk")
+
+        text = think.flush().lstrip()
+        if stop:
+            for s in stop:
+                idx = text.find(s)
+                if idx != -1:
+                    text = text[:idx]
+        if max_chars:
+            text = text.strip()[:max_chars]
+        return Generation(text.strip(), done_reason, think.discarded, time.monotonic() - start)
+
+    @staticmethod
+    def _close_on_cancel(cancel, finished, resp):
+        """Close ``resp`` when ``cancel`` is set before the stream has finished"""
+        while not finished.is_set():
+            if cancel.wait(0.05):
+                resp.close()
+                return
+
+    @staticmethod
+    def _lines_until_cancelled(resp, cancel):
+        """``resp.iter_lines()`` that ends quietly when the response was closed by a cancel"""
+        try:
+            yield from resp.iter_lines()
+        except Exception:
+            if cancel is None or not cancel.is_set():
+                raise
+
+    def generate_task(self, server, model, task, prompt, input_text=None, timeout=None, max_chars=None,
+                      cancel=None, **options):
+        """Generate with the task's GenerationProfile and return the validated text.
+
+        ``input_text`` sizes input-dependent limits (translations); ``options``
+        override profile options for this call. Raises
+        TruncatedGenerationError when the output hit the limit and cannot be
+        used, so the caller can fall back.
+        """
+        profile = get_profile(task)
+        fields = {} if profile.think is None else {"think": profile.think}
+        generation = self.generate_stream(
+            server, model, prompt,
+            options=profile.request_options(input_text, **options),
+            timeout=timeout,
+            max_chars=max_chars or profile.max_chars_for(input_text),
+            stop=profile.stop or None,
+            cancel=cancel,
+            **fields)
+        if generation.done_reason != "cancelled":
+            with self._lock:
+                samples = self._task_latencies.setdefault(task, deque(maxlen=self.latency_window))
+                samples.append(generation.elapsed)
+        return profile.validate(generation)
+
+    def hedge_delay(self, task):
+        """Observed ``hedge_quantile`` latency of ``task``, or None until there are enough samples"""
+        with self._lock:
+            samples = sorted(self._task_latencies.get(task, ()))
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return samples[max(0, math.ceil(self.hedge_quantile * len(samples)) - 1)]
+
+    def _has_free_slot(self, server):
+        with self._slot_freed:
+            return self._state(server).in_flight < self.max_in_flight
+
+    def _hedge_target(self, server, model, hedge_model, hedge_prompt, prompt):
+        """Another server for the same request, else the backup model on the same server.
+
+        Only servers with a free slot qualify: a hedge that has to queue
+        behind other requests cannot beat the slow one.
+        """
+        for other in self.server_order():
+            if other != server and self.breakers.state(other, model) != "open" and self._has_free_slot(other):
+                return other, model, prompt
+        if hedge_model and self.breakers.state(server, hedge_model) != "open" and self._has_free_slot(server):
+            return server, hedge_model, hedge_prompt or prompt
+        return None
+
+    def generate_task_hedged(self, server, model, task, prompt, hedge_model=None, hedge_prompt=None, **kwargs):
+        """generate_task with an optional hedge; returns ``(text, model that answered)``.
+
+        Without hedging (or before enough latencies have been observed) this
+        is a plain generate_task call. Otherwise, if the first request is
+        still running after ``hedge_delay(task)`` seconds, a second one goes
+        to another server, or to ``hedge_model`` with ``hedge_prompt``; the
+        first successful answer is returned and the other is cancelled. If
+        both fail, the first request's error is raised.
+        """
+        delay = self.hedge_delay(task) if self.hedge else None
+        if delay is None:
+            return self.generate_task(server, model, task, prompt, **kwargs), model
+
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            cancel = threading.Event()
+            primary = executor.submit(self.generate_task, server, model, task, prompt, cancel=cancel, **kwargs)
+            requests_by_future = {primary: (model, cancel)}
+            if not wait([primary], timeout=delay).done:
+                target = self._hedge_target(server, model, hedge_model, hedge_prompt, prompt)
+                if target is not None:
+                    hedge_server, hedge_model_name, hedge_prompt_text = target
+                    print(f"{task} on {server} slower than p{self.hedge_quantile * 100:.0f} ({delay:.1f}s), "
+                          f"hedging with {hedge_model_name} on {hedge_server}")
+                    with self._lock:
+                        self.hedges += 1
+                    cancel = threading.Event()
+                    hedge = executor.submit(self.generate_task, hedge_server, hedge_model_name, task,
+                                            hedge_prompt_text, cancel=cancel, **kwargs)
+                    requests_by_future[hedge] = (hedge_model_name, cancel)
+
+            pending = set(requests_by_future)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is not None:
+                        continue
+                    for other, (_, other_cancel) in requests_by_future.items():
+                        if other is not future:
+                            other_cancel.set()
+                    if future is not primary:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result(), requests_by_future[future][0]
+            raise primary.exception()
+        finally:
+            executor.shutdown(wait=False)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
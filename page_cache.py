@@ -0,0 +1,259 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+DEFAULT_CACHE_DIR = os.path.join("cache", "pages")
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+# How long a cached page counts as fresh, per source (seconds)
+DEFAULT_TTLS = {
+    "academicpositions": 24 * 3600,
+    "euraxess": 48 * 3600,
+    "daad": 72 * 3600,
+}
+DEFAULT_TTL = 24 * 3600
+
+# Query parameters that never change the page content
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+def normalize_url(url):
+    """Normalise a URL so equivalent links share one cache entry"""
+    parts = urlsplit(url.strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith(TRACKING_PARAMS)]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(query)), ""))
+
+
+def url_key(url):
+    return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+
+class PageCache:
+    """On-disk HTML cache keyed by normalised URL, with per-source TTLs and LRU eviction.
+
+    Pages are stored as ``<sha256>.html`` files next to an ``index.json``
+    holding url, source, size, fetch time, last access time and the HTTP
+    validators (ETag / Last-Modified) per entry. The record a scraper built
+    from a page can be stored in ``<sha256>.record.json`` so unchanged pages
+    skip parsing and enrichment on later runs.
+    Safe to share between the threads of one process.
+
+    Cache hits only update ``last_access`` in memory; the index is written
+    with the next put, after ``save_every`` hits, or by ``save``/``report``.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, ttls=None, default_ttl=DEFAULT_TTL,
+                 save_every=50):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.not_modified = 0
+        self.save_every = save_every
+        self._unsaved_accesses = 0
+        self._lock = threading.RLock()
+        self._index = None
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, "index.json")
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.html")
+
+    def _record_path(self, key):
+        return os.path.join(self.directory, f"{key}.record.json")
+
+    def _load(self):
+        if self._index is None:
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+        self._unsaved_accesses = 0
+
+    def save(self):
+        """Persist last_access updates made by cache hits"""
+        with self._lock:
+            if self._unsaved_accesses:
+                self._save()
+
+    def ttl_for(self, source):
+        return self.ttls.get(source, self.default_ttl)
+
+    def _remove(self, key):
+        self._index.pop(key, None)
+        for path in (self._path(key), self._record_path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def is_fresh(self, entry, source=None):
+        return time.time() - entry["fetched_at"] <= self.ttl_for(source or entry.get("source"))
+
+    def entry(self, url):
+        """Return a copy of the index entry for ``url``, or None"""
+        with self._lock:
+            entry = self._load().get(url_key(url))
+            return dict(entry) if entry is not None else None
+
+    def get(self, url, source=None, allow_stale=False):
+        """Return the cached HTML for ``url`` if it is still fresh, else None"""
+        key = url_key(url)
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if not allow_stale and not self.is_fresh(entry, source):
+                self.expired += 1
+                self.misses += 1
+                return None
+        # Read the page without holding the lock, so other threads are not serialised behind the disk
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                html = f.read()
+        except OSError:
+            with self._lock:
+                if self._load().get(key) is entry:
+                    self._remove(key)
+                    self._save()
+                self.misses += 1
+            return None
+        with self._lock:
+            entry["last_access"] = time.time()
+            self.hits += 1
+            self._unsaved_accesses += 1
+            if self._unsaved_accesses >= self.save_every:
+                self._save()
+        return html
+
+    def put(self, url, html, source=None, etag=None, last_modified=None):
+        """Store ``html`` for ``url`` and evict least recently used pages over the size cap.
+
+        Any record stored for the previous version of the page is dropped.
+        """
+        if not html:
+            return
+        key = url_key(url)
+        data = html.encode("utf-8")
+        with self._lock:
+            index = self._load()
+            os.makedirs(self.directory, exist_ok=True)
+            # Write then rename, so a concurrent get never reads a half-written page
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            try:
+                os.remove(self._record_path(key))
+            except OSError:
+                pass
+            now = time.time()
+            index[key] = {
+                "url": normalize_url(url),
+                "source": source,
+                "size": len(data),
+                "fetched_at": now,
+                "last_access": now,
+                "etag": etag,
+                "last_modified": last_modified,
+            }
+            self._evict()
+            self._save()
+
+    def mark_not_modified(self, url):
+        """Restart the TTL of ``url`` after the server answered 304 Not Modified"""
+        with self._lock:
+            entry = self._load().get(url_key(url))
+            if entry is None:
+                return
+            entry["fetched_at"] = entry["last_access"] = time.time()
+            self.not_modified += 1
+            self._save()
+
+    def get_record(self, url):
+        """Return the record stored for the cached version of ``url``, or None"""
+        key = url_key(url)
+        with self._lock:
+            if key not in self._load():
+                return None
+            try:
+                with open(self._record_path(key), "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return None
+
+    def put_record(self, url, record):
+        """Attach the scraper's parsed/enriched record to the cached page of ``url``"""
+        key = url_key(url)
+        with self._lock:
+            if key not in self._load():
+                return
+            with open(self._record_path(key), "w", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False)
+
+    def _evict(self):
+        total = sum(entry["size"] for entry in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            total -= entry["size"]
+            self._remove(key)
+            self.evictions += 1
+
+    def size_bytes(self):
+        with self._lock:
+            return sum(entry["size"] for entry in self._load().values())
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._load()),
+                "bytes": sum(entry["size"] for entry in self._index.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "not_modified": self.not_modified,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def report(self):
+        """Save pending updates and print hit/miss counters for this run"""
+        self.save()
+        stats = self.stats()
+        if not stats["hits"] and not stats["misses"] and not stats["not_modified"]:
+            return
+        print("\nPage cache report:")
+        print(f"  Hits: {stats['hits']}, misses: {stats['misses']} (expired: {stats['expired']}), "
+              f"hit rate: {stats['hit_rate']:.0%}")
+        print(f"  Revalidated with 304 Not Modified: {stats['not_modified']}")
+        print(f"  Entries: {stats['entries']}, size: {stats['bytes'] / 1_000_000:.1f} MB, "
+              f"evictions: {stats['evictions']}")
+
+
+# Shared by all scrapers in the process
+page_cache = PageCache()
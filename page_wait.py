@@ -0,0 +1,200 @@
+import json
+import threading
+import time
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+POLL_INTERVAL = 0.1
+
+
+class WaitStats:
+    """Records how long each kind of wait actually took"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = {}
+
+    def record(self, name, elapsed, satisfied):
+        with self._lock:
+            entry = self._waits.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "timeouts": 0})
+            entry["count"] += 1
+            entry["total"] += elapsed
+            entry["max"] = max(entry["max"], elapsed)
+            if not satisfied:
+                entry["timeouts"] += 1
+
+    def summary(self):
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._waits.items()}
+
+    def total_seconds(self):
+        with self._lock:
+            return sum(entry["total"] for entry in self._waits.values())
+
+    def reset(self):
+        with self._lock:
+            self._waits = {}
+
+    def report(self):
+        """Print a per-wait summary of the time spent waiting"""
+        summary = self.summary()
+        if not summary:
+            return
+        print("\nWait time report:")
+        for name, entry in sorted(summary.items()):
+            avg = entry["total"] / entry["count"]
+            print(f"  {name}: {entry['count']} waits, total {entry['total']:.1f}s, "
+                  f"avg {avg:.2f}s, max {entry['max']:.2f}s, timeouts {entry['timeouts']}")
+        print(f"  Total time spent waiting: {self.total_seconds():.1f}s")
+
+
+# Shared by all scrapers in the process
+wait_stats = WaitStats()
+
+
+def _finish(name, start, satisfied, stats):
+    elapsed = time.monotonic() - start
+    (stats or wait_stats).record(name, elapsed, satisfied)
+    return satisfied
+
+
+def wait_for_selector(driver, selector, timeout=10, stats=None):
+    """Wait until an element matching the CSS selector is present. Returns True if found"""
+    start = time.monotonic()
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+        )
+        return _finish("selector", start, True, stats)
+    except TimeoutException:
+        return _finish("selector", start, False, stats)
+
+
+def wait_for_document_ready(driver, timeout=10, stats=None):
+    """Wait until document.readyState is 'complete'. Returns True if it got there in time"""
+    start = time.monotonic()
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+        return _finish("document_ready", start, True, stats)
+    except TimeoutException:
+        return _finish("document_ready", start, False, stats)
+
+
+def _read_network_events(driver):
+    """Drain CDP Network events from the performance log, or None if it is not enabled"""
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return None
+    events = []
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except Exception:
+            continue
+        if message.get("method", "").startswith("Network."):
+            events.append(message)
+    return events
+
+
+def _resource_count(driver):
+    try:
+        return driver.execute_script(
+            "return [document.readyState, performance.getEntriesByType('resource').length];"
+        )
+    except Exception:
+        return None
+
+
+def wait_for_network_idle(driver, idle_time=0.5, timeout=10, stats=None):
+    """Wait until no network requests have been in flight for ``idle_time`` seconds.
+
+    Uses CDP Network events from the performance log when the driver was
+    started with ``goog:loggingPrefs`` performance logging; otherwise falls
+    back to watching the Resource Timing entry count settle after the
+    document is complete.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    in_flight = set()
+    pending = _read_network_events(driver)
+    use_cdp = pending is not None
+    last_activity = time.monotonic()
+    last_count = None
+
+    while time.monotonic() < deadline:
+        if use_cdp:
+            events = pending if pending is not None else (_read_network_events(driver) or [])
+            pending = None
+            for event in events:
+                request_id = event.get("params", {}).get("requestId")
+                method = event["method"]
+                if method == "Network.requestWillBeSent":
+                    in_flight.add(request_id)
+                elif method in ("Network.loadingFinished", "Network.loadingFailed"):
+                    in_flight.discard(request_id)
+            if events:
+                last_activity = time.monotonic()
+            busy = bool(in_flight)
+        else:
+            state = _resource_count(driver)
+            if state != last_count:
+                last_count = state
+                last_activity = time.monotonic()
+            busy = not state or state[0] != "complete"
+
+        if not busy and time.monotonic() - last_activity >= idle_time:
+            return _finish("network_idle", start, True, stats)
+        time.sleep(POLL_INTERVAL)
+
+    return _finish("network_idle", start, False, stats)
+
+
+def wait_for_scroll_stable(driver, step_timeout=2, max_scrolls=20, timeout=30, stats=None):
+    """Scroll to the bottom until the page stops growing.
+
+    After each scroll the page height is polled and the next scroll happens
+    as soon as it grows; if it does not grow within ``step_timeout`` the page
+    is considered fully loaded. Returns the number of scrolls that loaded
+    new content.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    loads = 0
+    last_height = driver.execute_script("return document.body.scrollHeight")
+
+    for _ in range(max_scrolls):
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        step_deadline = min(time.monotonic() + step_timeout, deadline)
+        new_height = last_height
+        while time.monotonic() < step_deadline:
+            new_height = driver.execute_script("return document.body.scrollHeight")
+            if new_height != last_height:
+                break
+            time.sleep(POLL_INTERVAL)
+        if new_height == last_height:
+            _finish("scroll_stable", start, True, stats)
+            return loads
+        loads += 1
+        last_height = new_height
+        if time.monotonic() >= deadline:
+            break
+
+    _finish("scroll_stable", start, False, stats)
+    return loads
+
+
+def wait_for_condition(driver, condition, timeout=10, name="condition", stats=None):
+    """Wait until ``condition(driver)`` returns a truthy value. Returns that value or None"""
+    start = time.monotonic()
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(condition)
+        _finish(name, start, True, stats)
+        return result
+    except TimeoutException:
+        _finish(name, start, False, stats)
+        return None
@@ -0,0 +1,127 @@
+import queue
+import threading
+import time
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class Stage:
+    """One pipeline step: ``func(item)`` run by ``workers`` threads"""
+
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.processed = 0
+        self.busy = 0.0  # seconds spent in func, summed over workers
+
+
+class Pipeline:
+    """Stages connected by bounded queues, each run by its own worker threads.
+
+    ``run(source)`` consumes ``source`` lazily in a feeder thread, so a
+    generator (e.g. one that scrapes listing pages) can keep producing while
+    later stages work on earlier items. Every queue holds at most
+    ``queue_size`` items: a stage that gets ahead blocks until the next one
+    catches up. Results of the last stage are returned in source order. The
+    first exception stops the pipeline and is re-raised from ``run``.
+    """
+
+    def __init__(self, stages, queue_size=4):
+        self.stages = list(stages)
+        self.queue_size = max(1, int(queue_size))
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def run(self, source):
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        remaining = [stage.workers for stage in self.stages]
+        results = {}
+        errors = []
+        stop = threading.Event()
+
+        def fail(error):
+            with self._lock:
+                errors.append(error)
+            stop.set()
+
+        def put(q, entry):
+            # Block while the queue is full, but give up once the pipeline stops
+            while not stop.is_set():
+                try:
+                    q.put(entry, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def feed():
+            try:
+                for index, item in enumerate(source):
+                    if not put(queues[0], (index, item)):
+                        return
+            except Exception as e:
+                fail(e)
+            finally:
+                for _ in range(self.stages[0].workers):
+                    put(queues[0], _DONE)
+
+        def work(position):
+            stage = self.stages[position]
+            inbox = queues[position]
+            outbox = queues[position + 1] if position + 1 < len(self.stages) else None
+            while True:
+                try:
+                    entry = inbox.get(timeout=0.1)
+                except queue.Empty:
+                    if stop.is_set():
+                        return
+                    continue
+                if entry is _DONE:
+                    break
+                if stop.is_set():
+                    continue
+                index, item = entry
+                start = time.monotonic()
+                try:
+                    result = stage.func(item)
+                except Exception as e:
+                    fail(e)
+                    continue
+                with self._lock:
+                    stage.processed += 1
+                    stage.busy += time.monotonic() - start
+                if outbox is None:
+                    with self._lock:
+                        results[index] = result
+                elif not put(outbox, (index, result)):
+                    return
+            # The last worker of a stage to finish closes the next stage's input
+            with self._lock:
+                remaining[position] -= 1
+                last = remaining[position] == 0
+            if last and outbox is not None:
+                for _ in range(self.stages[position + 1].workers):
+                    put(outbox, _DONE)
+
+        start = time.monotonic()
+        threads = [threading.Thread(target=feed, name="pipeline-feed", daemon=True)]
+        for position, stage in enumerate(self.stages):
+            threads += [threading.Thread(target=work, args=(position,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+                        for n in range(stage.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.monotonic() - start
+
+        if errors:
+            raise errors[0]
+        return [results[index] for index in sorted(results)]
+
+    def report(self):
+        """Print per-stage work time against the wall-clock time of the run"""
+        print(f"\nPipeline report (wall time {self.elapsed:.1f}s):")
+        for stage in self.stages:
+            print(f"  {stage.name}: {stage.processed} items, {stage.busy:.1f}s busy over {stage.workers} worker(s)")
@@ -0,0 +1,155 @@
+import re
+import threading
+
+
+def _extensions(*extensions):
+    """Patterns for URLs whose path ends in one of ``extensions`` (optionally followed by a query)"""
+    return [pattern for ext in extensions for pattern in (f'*.{ext}', f'*.{ext}?*')]
+
+
+def _hosts(*hosts):
+    """Patterns for requests to ``hosts`` or any of their subdomains"""
+    return [pattern for host in hosts for pattern in (f'*://{host}/*', f'*://*.{host}/*')]
+
+
+def _brands(*names):
+    """Patterns for hosts named after a service under any TLD (e.g. ``cdn.matomo.cloud``)"""
+    return [pattern for name in names for pattern in (f'*://{name}.*', f'*://*.{name}.*')]
+
+
+# URL patterns passed to Network.setBlockedURLs, grouped by category.
+# '*' matches any run of characters; patterns are matched against the full URL.
+# Patterns are anchored to file extensions or host names, so a document or XHR
+# URL that merely contains e.g. ".gif" or "matomo" in its path or query is not blocked.
+DEFAULT_BLOCKED_PATTERNS = {
+    'image': _extensions('png', 'jpg', 'jpeg', 'gif', 'webp', 'svg', 'ico', 'bmp', 'avif'),
+    'font': _extensions('woff', 'woff2', 'ttf', 'otf', 'eot'),
+    'media': _extensions('mp4', 'webm', 'mp3', 'ogg', 'wav', 'm4a'),
+    'analytics': (
+        _hosts('google-analytics.com', 'googletagmanager.com', 'hotjar.com', 'clarity.ms',
+               'connect.facebook.net', 'segment.io', 'nr-data.net', 'newrelic.com')
+        + _brands('matomo', 'piwik', 'siteimprove', 'cookiebot')
+        + ['*/matomo.js', '*/matomo.js?*', '*/piwik.js', '*/piwik.js?*']
+    ),
+    'ads': (
+        _hosts('doubleclick.net', 'googlesyndication.com', 'adnxs.com', 'amazon-adsystem.com')
+        + _brands('adservice.google', 'criteo', 'taboola', 'outbrain')
+    ),
+}
+
+# Blocked requests never report a size, so savings are estimated with
+# typical transfer sizes per category
+ESTIMATED_BYTES_PER_REQUEST = {
+    'image': 60_000,
+    'font': 40_000,
+    'media': 500_000,
+    'analytics': 50_000,
+    'ads': 80_000,
+}
+
+# Collects the resource URLs the page references and how much it actually downloaded
+PAGE_RESOURCES_SCRIPT = """
+var patterns = arguments[0].map(function(p) { return [p[0], new RegExp(p[1], 'i')]; });
+var urls = new Set();
+document.querySelectorAll('img[src], source[src], video[src], audio[src], script[src], iframe[src]').forEach(function(el) { urls.add(el.src); });
+document.querySelectorAll('img[srcset], source[srcset]').forEach(function(el) {
+    el.srcset.split(',').forEach(function(part) { var u = part.trim().split(' ')[0]; if (u) { urls.add(new URL(u, document.baseURI).href); } });
+});
+document.querySelectorAll('link[href]').forEach(function(el) { urls.add(el.href); });
+var blocked = {};
+urls.forEach(function(url) {
+    for (var i = 0; i < patterns.length; i++) {
+        if (patterns[i][1].test(url)) { blocked[patterns[i][0]] = (blocked[patterns[i][0]] || 0) + 1; break; }
+    }
+});
+var transferred = 0;
+performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource')).forEach(function(e) {
+    transferred += e.transferSize || 0;
+});
+return {blocked: blocked, transferred: transferred};
+"""
+
+
+def build_blocklist(categories=None, extra_patterns=None):
+    """Return ``[(category, pattern), ...]`` for the selected categories plus any extra patterns"""
+    if categories is None:
+        categories = list(DEFAULT_BLOCKED_PATTERNS)
+    blocklist = []
+    for category in categories:
+        for pattern in DEFAULT_BLOCKED_PATTERNS.get(category, []):
+            blocklist.append((category, pattern))
+    for pattern in extra_patterns or []:
+        blocklist.append(('custom', pattern))
+    return blocklist
+
+
+def pattern_to_regex(pattern):
+    """Convert a setBlockedURLs wildcard pattern to an anchored regex source"""
+    return '^' + '.*'.join(re.escape(part) for part in pattern.split('*')) + '$'
+
+
+class ResourceBlockReport:
+    """Per-run tally of blocked resources and estimated bytes saved"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.blocked = {}
+        self.bytes_transferred = 0
+        self.blocklist = []
+
+    def record_page(self, driver):
+        """Inspect the current page and add its blocked resources to the tally"""
+        if not self.blocklist:
+            return
+        patterns = [[category, pattern_to_regex(pattern)] for category, pattern in self.blocklist]
+        try:
+            result = driver.execute_script(PAGE_RESOURCES_SCRIPT, patterns)
+        except Exception as e:
+            print(f"Could not inspect page resources: {e}")
+            return
+        if not isinstance(result, dict):
+            return
+        with self._lock:
+            self.pages += 1
+            self.bytes_transferred += int(result.get('transferred') or 0)
+            for category, count in (result.get('blocked') or {}).items():
+                self.blocked[category] = self.blocked.get(category, 0) + int(count)
+
+    def estimated_bytes_saved(self):
+        with self._lock:
+            return sum(count * ESTIMATED_BYTES_PER_REQUEST.get(category, 30_000)
+                       for category, count in self.blocked.items())
+
+    def report(self):
+        """Print blocked request counts and the estimated bytes saved for this run"""
+        if not self.pages:
+            return
+        saved = self.estimated_bytes_saved()
+        print("\nResource blocking report:")
+        print(f"  Pages inspected: {self.pages}")
+        for category, count in sorted(self.blocked.items()):
+            print(f"  Blocked {category}: {count} requests")
+        print(f"  Downloaded: {self.bytes_transferred / 1_000_000:.1f} MB")
+        print(f"  Estimated saved: {saved / 1_000_000:.1f} MB")
+
+
+# Shared by all scrapers in the process
+resource_report = ResourceBlockReport()
+
+
+def apply_resource_blocking(driver, categories=None, extra_patterns=None, report=None):
+    """Block images, fonts, media, analytics and ad requests through CDP.
+
+    Must be called once per driver after it starts. Returns True if the
+    blocklist was installed.
+    """
+    blocklist = build_blocklist(categories, extra_patterns)
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': [pattern for _, pattern in blocklist]})
+    except Exception as e:
+        print(f"Could not enable resource blocking: {e}")
+        return False
+    (report or resource_report).blocklist = blocklist
+    return True
@@ -9,24 +9,35 @@ import time
 
 import hashlib
 import json
-import requests
 import re
 from collections import defaultdict
+from page_wait import wait_for_document_ready, wait_for_scroll_stable, wait_stats
+from js_extract import extract_listing_cards
+from http_fetch import fetch_static_fields, cache_rendered_page
+from page_cache import page_cache
+from seen_index import seen_index, listing_hash, content_hash
+from job_store import job_store
+from llm_cache import llm_cache
+from ollama_client import OllamaClient, circuit_breakers
 
-def ollama_highlight(text, model="deepseek-r1:70b", host="http://rf-calcul:11434"):
+# 提示词版本号，修改提示词时递增，使LLM输出缓存失效
+HIGHLIGHT_PROMPT_VERSION = "summary-highlight-1"
+
+# 所有LLM调用共用的客户端（长连接Session，按负载在 $OLLAMA_HOSTS 的服务器间分配，亮点生成超时120秒）
+ollama = OllamaClient(generate_timeout=120)
+# 一句话亮点，比 'highlight' 生成配置的默认长度上限更短
+HIGHLIGHT_MAX_CHARS = 200
+
+def ollama_highlight(text, model="deepseek-r1:70b", host=None):
+    """生成一句话亮点；失败时抛出异常，由调用方决定如何处理"""
+    cached = llm_cache.get('highlight', model, HIGHLIGHT_PROMPT_VERSION, text)
+    if cached is not None:
+        return cached
     prompt = f"请用一句话总结以下学术招聘信息的最大亮点或吸引力，突出岗位优势或独特之处：\n{text}"
-    payload = {
-        "model": model,
-        "prompt": prompt,
-        "stream": False
-    }
-    try:
-        resp = requests.post(f"{host}/api/generate", json=payload, timeout=120)
-        resp.raise_for_status()
-        result = resp.json()
-        return result.get("response", "")
-    except Exception as e:
-        return f"AI亮点生成失败: {e}"
+    highlight = ollama.generate_task(ollama.server_order(host)[0], model, 'highlight', prompt,
+                                     max_chars=HIGHLIGHT_MAX_CHARS)
+    llm_cache.put('highlight', model, HIGHLIGHT_PROMPT_VERSION, text, highlight)
+    return highlight
 
 def classify_position(title, content):
     title_content = (title + ' ' + content).lower()
@@ -69,9 +80,22 @@ def extract_direction(text):
                 return direction
     return '其他'
 
+# 详情页字段选择器（静态HTML与浏览器两种方式共用）
+DETAIL_SELECTORS = {
+    'title': 'h1, h2, .job-title',
+    'content': '.job-description, .description, main, article',
+    'institution': "a.job-link,span[class*='employer']",
+    'location': ".job-locations,span[class*='location']",
+    'posted': ".job-posting-date,.date",
+}
+
 def fetch_job_detail(driver, url):
+    # 先查页面缓存/静态HTML，缺少关键节点时再用浏览器渲染
+    fields = fetch_static_fields(url, DETAIL_SELECTORS, required=('title', 'content'), source='academicpositions')
+    if fields is not None:
+        return tuple(fields[name] for name in DETAIL_SELECTORS)
     driver.get(url)
-    time.sleep(2)
+    wait_for_document_ready(driver, timeout=10)
     try:
         title = driver.find_element(By.CSS_SELECTOR, 'h1, h2, .job-title').text.strip()
     except:
@@ -93,10 +117,22 @@ def fetch_job_detail(driver, url):
         posted = driver.find_element(By.CSS_SELECTOR, ".job-posting-date,.date").text.strip()
     except:
         posted = ''
+    if title and content:
+        cache_rendered_page(driver, url, source='academicpositions')
     return title, content, institution, location, posted
 
+# Field selectors inside a .job-posting-card
+CARD_FIELDS = {
+    'title': "a.job-link",
+    'link': {'selectors': "a.job-link", 'attr': 'href'},
+    'institution': "a.text-reset.job-link",
+    'location': ".job-locations a.text-muted",
+    'posted': ".job-posting-date",
+}
+
 def fetch_jobs_with_selenium(page=1, max_retries=3):
     jobs = []
+    run_id = job_store.start_run('academicpositions')
     url = f"https://academicpositions.com/find-jobs?page={page}"
 
     chrome_options = Options()
@@ -130,8 +166,8 @@ def fetch_jobs_with_selenium(page=1, max_retries=3):
             print(f"Scraping page {page} (attempt {retry_count + 1})...")
             driver.get(url)
             
-            # Add initial wait for page load
-            time.sleep(5)
+            # Wait for page load
+            wait_for_document_ready(driver, timeout=15)
             
             wait = WebDriverWait(driver, 30)  # Increased wait time
             
@@ -164,8 +200,8 @@ def fetch_jobs_with_selenium(page=1, max_retries=3):
                             break
                     except Exception:
                         pass
-                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(2)
+                    # Scroll once and move on as soon as the page grows
+                    wait_for_scroll_stable(driver, max_scrolls=1)
                     scroll_attempts += 1
 
                 if not job_cards:
@@ -183,31 +219,32 @@ def fetch_jobs_with_selenium(page=1, max_retries=3):
             print(f"Page source length: {len(driver.page_source)}")
             
             # Wait specifically for job cards
-            job_cards = wait.until(
+            wait.until(
                 EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".job-posting-card"))
             )
-            print(f"Found {len(job_cards)} job cards")
 
-            for card in job_cards:
+            # Read every card in one execute_script call, before navigating to detail pages
+            cards = extract_listing_cards(driver, ".job-posting-card", CARD_FIELDS)
+            print(f"Found {len(cards)} job cards")
+
+            for card in cards:
                 try:
-                    # Ensure card is visible
-                    driver.execute_script("arguments[0].scrollIntoView(true);", card)
-                    time.sleep(0.5)  # Brief pause after scrolling
-                    
-                    # Updated selectors to match the actual HTML structure
-                    title_el = card.find_element(By.CSS_SELECTOR, "a.job-link")
-                    title = title_el.text.strip()
-                    link = title_el.get_attribute("href")
-                    
-                    # Updated institution selector
-                    institution = card.find_element(By.CSS_SELECTOR, "a.text-reset.job-link").text.strip()
-                    
-                    # Updated location selector
-                    location_el = card.find_element(By.CSS_SELECTOR, ".job-locations a.text-muted")
-                    location = location_el.text.strip()
-                    
-                    # Keep existing posted date selector if it's still valid
-                    posted = card.find_element(By.CSS_SELECTOR, ".job-posting-date").text.strip()
+                    title = card['title']
+                    link = card['link']
+                    if not (title and link):
+                        print(f"Skipping card without title or link: {card}")
+                        continue
+                    institution = card['institution']
+                    location = card['location']
+                    posted = card['posted']
+
+                    # 已处理过且列表信息未变化的职位，直接复用上次结果
+                    record = seen_index.lookup_listing(link, listing_hash(card), source='academicpositions')
+                    if record is not None:
+                        print(f"Already processed, skipped: {title}")
+                        jobs.append(record)
+                        job_store.save_job('academicpositions', record, run_id=run_id)
+                        continue
 
                     # 访问详情页获取内容
                     detail_title, content, inst2, loc2, posted2 = fetch_job_detail(driver, link)
@@ -215,12 +252,22 @@ def fetch_jobs_with_selenium(page=1, max_retries=3):
                     institution = inst2 or institution
                     location = loc2 or location
                     posted = posted2 or posted
-                    # AI亮点
-                    highlight = ollama_highlight(detail_title + '\n' + content)
+                    # AI亮点（详情内容未变化时复用上次的结果）
+                    content_digest = content_hash(detail_title, content)
+                    record = seen_index.lookup_content(link, content_digest)
+                    highlight_failed = False
+                    if record is not None:
+                        highlight = record.get('highlight', '')
+                    else:
+                        try:
+                            highlight = ollama_highlight(detail_title + '\n' + content)
+                        except Exception as e:
+                            highlight = f"AI亮点生成失败: {e}"
+                            highlight_failed = True
 
                     print(f"Successfully parsed job: {title}")
 
-                    jobs.append({
+                    job = {
                         "title": detail_title or title,
                         "institution": institution,
                         "location": location,
@@ -228,10 +275,19 @@ def fetch_jobs_with_selenium(page=1, max_retries=3):
                         "link": link,
                         "content": content,
                         "highlight": highlight
-                    })
+                    }
+                    jobs.append(job)
+                    if highlight_failed:
+                        # 失败信息只出现在本次报告里，不写入索引，交给 enrich_worker.py 重新生成
+                        job_store.enqueue('academicpositions', dict(job, highlight=''), run_id=run_id,
+                                          listing_digest=listing_hash(card), content_digest=content_digest)
+                        continue
+                    job_store.save_job('academicpositions', job, run_id=run_id)
+                    seen_index.add(link, source='academicpositions',
+                                   listing_digest=listing_hash(card), content_digest=content_digest)
                 except Exception as e:
                     print(f"Error parsing card: {str(e)}")
-                    print(f"Card HTML: {card.get_attribute('outerHTML')}")
+                    print(f"Card data: {card}")
                     continue
 
             break  # If successful, exit retry loop
@@ -248,16 +304,19 @@ def fetch_jobs_with_selenium(page=1, max_retries=3):
             if driver:
                 driver.quit()
     
+    job_store.finish_run(run_id, status='completed' if jobs else 'failed')
+    wait_stats.report()
+    page_cache.report()
+    seen_index.report()
+    llm_cache.report()
+    circuit_breakers.report()
     return jobs
 
 def get_job_digest(jobs):
-    # 生成当前10条招聘的唯一摘要
+    # 生成当前10条招聘的唯一摘要（与已处理职位索引使用同一列表哈希）
     m = hashlib.md5()
     for job in jobs:
-        m.update(job['title'].encode('utf-8'))
-        m.update(job['posted'].encode('utf-8'))
-        m.update(job['institution'].encode('utf-8'))
-        m.update(job['location'].encode('utf-8'))
+        m.update(listing_hash(job).encode('utf-8'))
     return m.hexdigest()
 
 def fetch_top10_jobs():
@@ -0,0 +1,172 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from job_store import job_store
+from page_cache import normalize_url, page_cache
+
+DEFAULT_INDEX_PATH = os.path.join("cache", "seen_postings.json")
+# Postings not seen on any run for this long are dropped from the index
+DEFAULT_TTL = 180 * 24 * 3600
+
+# Listing fields that identify a version of a posting on the search pages.
+# "posted" is left out: AcademicPositions shows it as relative text ("3 days ago")
+# that changes every day even though the posting does not.
+LISTING_HASH_FIELDS = ("title", "institution", "location")
+
+
+def content_hash(*parts):
+    """Hash text with whitespace and case normalised, so layout-only changes do not count"""
+    m = hashlib.sha256()
+    for part in parts:
+        m.update(re.sub(r"\s+", " ", part or "").strip().lower().encode("utf-8"))
+        m.update(b"\0")
+    return m.hexdigest()
+
+
+def listing_hash(job):
+    """Hash of the listing card fields of a posting"""
+    return content_hash(*(job.get(name, "") for name in LISTING_HASH_FIELDS))
+
+
+class SeenIndex:
+    """Persistent index of processed postings: normalised URL -> listing and content hashes.
+
+    ``listing_hash`` covers what the search page shows, so an unchanged card
+    can skip the detail fetch while its cached page is still fresh (after
+    that the page has to be revalidated); ``content_hash`` covers the extracted detail
+    text, so a page that was fetched again but whose text did not change can
+    skip the LLM calls. The index only holds the hashes: the record of a hit
+    is read from the job store, where every processed posting is saved under
+    the same normalised URL.
+
+    New entries are written in batches of ``save_every`` (and by ``save`` or
+    ``report``); entries not seen for ``ttl`` seconds are dropped.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, store=None, cache=None, ttl=DEFAULT_TTL, save_every=50):
+        self.path = path
+        self.ttl = ttl
+        self.save_every = save_every
+        self.skipped_fetches = 0
+        self.skipped_enrichments = 0
+        self.processed = 0
+        self._store = store
+        self._cache = cache
+        self._unsaved = 0
+        self._lock = threading.RLock()
+        self._postings = None
+
+    @property
+    def store(self):
+        return self._store or job_store
+
+    @property
+    def cache(self):
+        return self._cache or page_cache
+
+    def _load(self):
+        if self._postings is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._postings = json.load(f)
+            except (OSError, ValueError):
+                self._postings = {}
+            for entry in self._postings.values():
+                # Older indexes stored the full record; it now lives in the job store only
+                entry.pop("record", None)
+        return self._postings
+
+    def _save(self):
+        cutoff = time.time() - self.ttl
+        self._postings = {key: entry for key, entry in self._load().items() if entry.get("last_seen", 0) >= cutoff}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._postings, f)
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load())
+
+    def get(self, url):
+        with self._lock:
+            entry = self._load().get(normalize_url(url))
+            return dict(entry) if entry is not None else None
+
+    def _lookup(self, url, field, digest):
+        with self._lock:
+            entry = self._load().get(normalize_url(url))
+            if entry is None or entry.get(field) != digest:
+                return None
+        return self.store.get_job(url)
+
+    def lookup_listing(self, url, listing_digest, source=None):
+        """Return the stored record if ``url`` was processed with the same listing hash.
+
+        The card alone does not show edits to the detail page, so a hit only
+        counts while the cached page is fresh under ``source``'s page-cache TTL.
+        """
+        page = self.cache.entry(url)
+        if page is None or not self.cache.is_fresh(page, source):
+            return None
+        record = self._lookup(url, "listing_hash", listing_digest)
+        if record is not None:
+            with self._lock:
+                self.skipped_fetches += 1
+        return record
+
+    def lookup_content(self, url, content_digest):
+        """Return the stored record if ``url`` was processed with the same detail content hash"""
+        record = self._lookup(url, "content_hash", content_digest)
+        if record is not None:
+            with self._lock:
+                self.skipped_enrichments += 1
+        return record
+
+    def add(self, url, source=None, listing_digest=None, content_digest=None):
+        """Remember that ``url`` has been processed (its record must be saved in the job store)"""
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            postings = self._load()
+            entry = postings.get(key)
+            if entry is None or (content_digest is not None and entry.get("content_hash") != content_digest):
+                self.processed += 1
+            entry = entry or {"first_seen": now}
+            entry.update({"source": source, "last_seen": now})
+            if listing_digest is not None:
+                entry["listing_hash"] = listing_digest
+            if content_digest is not None:
+                entry["content_hash"] = content_digest
+            postings[key] = entry
+            self._unsaved += 1
+            if self._unsaved >= self.save_every:
+                self._save()
+
+    def save(self):
+        """Persist entries not written yet"""
+        with self._lock:
+            if self._unsaved:
+                self._save()
+
+    def report(self):
+        """Save pending updates and print how much work the index saved in this run"""
+        self.save()
+        if not (self.processed or self.skipped_fetches or self.skipped_enrichments):
+            return
+        print("\nSeen-posting index report:")
+        print(f"  Unchanged listings (detail fetch skipped): {self.skipped_fetches}")
+        print(f"  Unchanged content (LLM calls skipped): {self.skipped_enrichments}")
+        print(f"  New or changed postings processed: {self.processed}, known postings: {len(self)}")
+
+
+# Shared by all scrapers in the process; saved at exit in case a run stops before its report
+seen_index = SeenIndex()
+atexit.register(seen_index.save)
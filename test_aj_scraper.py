@@ -2,18 +2,26 @@ import unittest
 from unittest.mock import patch, MagicMock, call
 import sys
 import os
+import tempfile
+import time
+import asyncio
 
 # Add the parent directory to sys.path to allow importing aj_scraper
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import aj_scraper
+import js_extract
+from seen_index import SeenIndex
+from job_store import JobStore
+from page_cache import PageCache
+from ollama_client import ServerHealth
 
 class TestAJScraper(unittest.TestCase):
 
     @patch('aj_scraper.check_ai_server', return_value=True)
     @patch('aj_scraper.select_model', return_value="mock_model")
     @patch('aj_scraper.set_windows_proxy_from_pac')
-    @patch('aj_scraper.ollama_highlight')
+    @patch('aj_scraper.generate_highlight')
     @patch('aj_scraper.fetch_job_detail')
     @patch('aj_scraper.webdriver.Chrome')
     def test_fetch_academic_positions_jobs_limiting(
@@ -29,151 +37,173 @@ class TestAJScraper(unittest.TestCase):
         mock_driver_instance = MagicMock()
         mock_chrome.return_value = mock_driver_instance
 
-        # Mock job card elements
+        # Job cards as returned by the single-roundtrip listing script
         mock_job_cards = []
         for i in range(20):
-            card = MagicMock()
-            
-            # Mocking find_element for title
-            title_elem = MagicMock()
-            title_elem.text.strip.return_value = f"Job Title {i+1}"
-            
-            # Mocking find_element for institution
-            institution_elem = MagicMock()
-            institution_elem.text.strip.return_value = f"Institution {i+1}"
-            
-            # Mocking find_element for location
-            location_elem = MagicMock()
-            location_elem.text.strip.return_value = f"Location {i+1}"
-            
-            # Mocking find_element for link
-            link_elem = MagicMock()
-            link_elem.get_attribute.return_value = f"http://example.com/job{i+1}"
-
-            # Configure card.find_element to return different mocks based on selector
-            def side_effect_find_element(css_selector, *args, **kwargs):
-                if "title" in css_selector: # Simplified check
-                    return title_elem
-                elif "employer" in css_selector or "job-link" in css_selector : # Simplified check for institution
-                     # This part is tricky because institution can be found by two selectors,
-                     # and link also uses job-link. We need to ensure the card returns institution first.
-                     # For this test, we'll assume the first relevant selector hit is for institution text.
-                    if css_selector == "a.job-link,span[class*='employer']":
-                        return institution_elem
-                    elif css_selector == "a.job-link": # For the link href
-                        return link_elem 
-                elif "location" in css_selector: # Simplified check
-                    return location_elem
-                return MagicMock() # Default mock for other calls
-
-            # This is a more robust way for multiple elements on a card
-            # Title, Institution, Location, Link
-            elements_on_card = {
-                "h2[class*='title']": title_elem, # Example selector
-                "h3[class*='title']": title_elem,
-                "a[class*='title']": title_elem,
-                "span[class*='title']": title_elem,
-                "a.job-link,span[class*='employer']": institution_elem,
-                ".job-locations,span[class*='location']": location_elem,
-                "a.job-link": link_elem, # This is for the href
-            }
-            
-            # More precise side effect for find_element on card
-            def card_find_element_side_effect(by, value):
-                # print(f"Card find_element called with: {by}, {value}")
-                if value in elements_on_card:
-                    if value == "a.job-link" and elements_on_card[value] == link_elem:
-                         # Ensure we distinguish between fetching text for institution and href for link
-                         # This logic might need refinement based on actual call order in the code
-                        pass
-                    return elements_on_card[value]
-                # Fallback for general selectors if specific ones not matched
-                if "title" in value: return title_elem
-                if "employer" in value : return institution_elem # covers span[class*='employer']
-                if "location" in value: return location_elem
-                if "job-link" == value: return link_elem # for href
-                
-                # Default, if no match
-                # print(f"Warning: Unhandled selector in card.find_element: {value}")
-                # return MagicMock(text=MagicMock(strip=MagicMock(return_value="")), get_attribute=MagicMock(return_value=""))
-                # More specific for the test to pass if only certain elements are expected:
-                mock_to_return = MagicMock()
-                mock_to_return.text.strip.return_value = ""
-                mock_to_return.get_attribute.return_value = ""
-
-                if "title" in value: mock_to_return.text.strip.return_value = f"Job Title {i+1}"
-                elif "employer" in value or (value == "a.job-link"): 
-                    # This is tricky logic because a.job-link is used for both text and href
-                    # We'll assume the text is grabbed first by the more complex selector
-                    mock_to_return.text.strip.return_value = f"Institution {i+1}"
-                    mock_to_return.get_attribute.return_value = f"http://example.com/job{i+1}" # if it's for link
-                elif "location" in value: mock_to_return.text.strip.return_value = f"Location {i+1}"
-                
-                return mock_to_return
-
-
-            # card.find_element.side_effect = card_find_element_side_effect
-            # A simpler approach for the test, assuming order or specific calls:
-            # The code tries multiple selectors for title. We need one to work.
-            # Let's make the first one work.
-            
-            # For title, institution, location:
-            mock_title_el = MagicMock()
-            mock_title_el.text.strip.return_value = f'Job Title {i+1}'
-            mock_inst_el = MagicMock()
-            mock_inst_el.text.strip.return_value = f'Institution {i+1}'
-            mock_loc_el = MagicMock()
-            mock_loc_el.text.strip.return_value = f'Location {i+1}'
-            mock_link_el = MagicMock()
-            mock_link_el.get_attribute.return_value = f'http://example.com/job{i+1}'
-            mock_link_el.text.strip.return_value = f"Institution {i+1}" # if a.job-link is used for text
-
-            def find_element_dispatcher(by_type, selector_str):
-                if "title" in selector_str:
-                    if selector_str == "h2[class*='title']": # First one tried for title
-                         return mock_title_el
-                    raise Exception("Element not found by this title selector") # Simulate not found for others
-                elif selector_str == "a.job-link,span[class*='employer']":
-                    return mock_inst_el
-                elif selector_str == ".job-locations,span[class*='location']":
-                    return mock_loc_el
-                elif selector_str == "a.job-link": # For the link
-                    return mock_link_el
-                else:
-                    # print(f"Card find_element unhandled: {selector_str}")
-                    # Fallback to prevent error, but make it return empty if not expected to be found
-                    # This is important because the code tries multiple selectors
-                    el = MagicMock()
-                    el.text.strip.return_value = ""
-                    el.get_attribute.return_value = ""
-                    # raise FileNotFoundError(f"Unhandled selector: {selector_str}") # Make test fail if unexpected selector
-                    return el # Should return something that doesn't break .text or .get_attribute
-
-            card.find_element.side_effect = find_element_dispatcher
-            card.text.strip.return_value = f"Card text {i+1}" # For unique_cards logic
-            mock_job_cards.append(card)
-
-        mock_driver_instance.find_elements.return_value = mock_job_cards
+            mock_job_cards.append({
+                "title": f"Job Title {i+1}",
+                "institution": f"Institution {i+1}",
+                "location": f"Location {i+1}",
+                "link": f"http://example.com/job{i+1}",
+                "posted": f"{i+1} days ago",
+            })
+
+        def execute_script_side_effect(script, *args):
+            if script == js_extract.LISTING_CARDS_SCRIPT:
+                return mock_job_cards
+            return None
+
+        mock_driver_instance.execute_script.side_effect = execute_script_side_effect
         
-        # Configure fetch_job_detail to return dummy data
-        mock_fetch_job_detail.return_value = (
-            "Detail Title", "Detail Content", "Detail Institution",
-            "Detail Location", "Detail Posted", "Detail Contract"
-        )
-        # Configure ollama_highlight
-        mock_ollama_highlight.return_value = "Mocked Highlight"
+        # Configure generate_highlight (the selected model answered)
+        mock_ollama_highlight.return_value = ("Mocked Highlight", "mock_model")
 
         num_to_fetch = 5
-        aj_scraper.fetch_academic_positions_jobs(
-            use_headless=True, 
-            selected_model="mock_model", 
-            num_jobs_to_fetch=num_to_fetch
-        )
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch('aj_scraper.job_store', JobStore(os.path.join(tmp, 'jobs.db'))) as store:
+            cache = PageCache(os.path.join(tmp, 'pages'))
+
+            # Configure fetch_job_detail to cache the page and return dummy data
+            def fetch_job_detail(driver, url):
+                cache.put(url, "<html></html>", source='academicpositions')
+                return ("Detail Title", "Detail Content", "Detail Institution",
+                        "Detail Location", "Detail Posted", "Detail Contract", "Detail Start")
+            mock_fetch_job_detail.side_effect = fetch_job_detail
+
+            patcher = patch('aj_scraper.seen_index', SeenIndex(os.path.join(tmp, 'seen.json'), store=store, cache=cache))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+            aj_scraper.fetch_academic_positions_jobs(
+                use_headless=True, 
+                selected_model="mock_model", 
+                num_jobs_to_fetch=num_to_fetch
+            )
+
+            self.assertEqual(mock_fetch_job_detail.call_count, num_to_fetch)
+            # Also check that generate_highlight was called num_to_fetch times
+            self.assertEqual(mock_ollama_highlight.call_count, num_to_fetch)
+
+            # A day later the relative dates have moved, but the postings are the same
+            for i, card in enumerate(mock_job_cards):
+                card["posted"] = f"{i+2} days ago"
+            # A second run over the same listing skips detail fetches and LLM calls
+            job_details = aj_scraper.fetch_academic_positions_jobs(
+                use_headless=True,
+                selected_model="mock_model",
+                num_jobs_to_fetch=num_to_fetch
+            )
+            self.assertEqual(mock_fetch_job_detail.call_count, num_to_fetch)
+            self.assertEqual(mock_ollama_highlight.call_count, num_to_fetch)
+            self.assertEqual(len(job_details), num_to_fetch)
+            self.assertEqual(len(store.jobs_for_source('academicpositions')), num_to_fetch)
+
+            # Once the cached pages are past their TTL the postings are fetched again
+            with patch('page_cache.time.time', return_value=time.time() + 2 * 24 * 3600):
+                aj_scraper.fetch_academic_positions_jobs(
+                    use_headless=True,
+                    selected_model="mock_model",
+                    num_jobs_to_fetch=num_to_fetch
+                )
+            self.assertEqual(mock_fetch_job_detail.call_count, 2 * num_to_fetch)
+            store.close()
+
+    @patch('aj_scraper.set_windows_proxy_from_pac')
+    @patch('aj_scraper.generate_highlight')
+    @patch('aj_scraper.fetch_job_detail')
+    @patch('aj_scraper.webdriver.Chrome')
+    def test_scrape_only_queues_jobs_without_llm(self, mock_chrome, mock_fetch_job_detail, mock_ollama_highlight, mock_set_proxy):
+        mock_driver_instance = MagicMock()
+        mock_chrome.return_value = mock_driver_instance
+        cards = [{"title": f"Job {i}", "institution": "Inst", "location": "Loc",
+                  "link": f"http://example.com/job{i}", "posted": "today"} for i in range(3)]
+        mock_driver_instance.execute_script.side_effect = \
+            lambda script, *args: cards if script == js_extract.LISTING_CARDS_SCRIPT else None
+        mock_fetch_job_detail.return_value = ("Title", "Content", "", "", "", "", "")
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch('aj_scraper.job_store', JobStore(os.path.join(tmp, 'jobs.db'))) as store, \
+                patch('aj_scraper.seen_index', SeenIndex(os.path.join(tmp, 'seen.json'), store=store)) as index:
+            jobs = aj_scraper.fetch_academic_positions_jobs(num_jobs_to_fetch=3, enrich=False)
+            self.assertEqual(len(jobs), 3)
+            mock_ollama_highlight.assert_not_called()
+            self.assertEqual(store.queue_counts('academicpositions'), {'pending': 3})
+            # Not marked as seen until the worker has enriched them
+            self.assertIsNone(index.lookup_content("http://example.com/job0", aj_scraper.content_hash("Title", "Content")))
+            store.close()
 
-        self.assertEqual(mock_fetch_job_detail.call_count, num_to_fetch)
-        # Also check that ollama_highlight was called num_to_fetch times
-        self.assertEqual(mock_ollama_highlight.call_count, num_to_fetch)
+    @patch('aj_scraper.set_windows_proxy_from_pac')
+    @patch('aj_scraper.generate_highlight', return_value=("Regex highlight", None))
+    @patch('aj_scraper.fetch_job_detail')
+    @patch('aj_scraper.webdriver.Chrome')
+    def test_fallback_highlights_are_queued_not_indexed(self, mock_chrome, mock_fetch_job_detail, mock_generate_highlight, mock_set_proxy):
+        mock_driver_instance = MagicMock()
+        mock_chrome.return_value = mock_driver_instance
+        cards = [{"title": f"Job {i}", "institution": "Inst", "location": "Loc",
+                  "link": f"http://example.com/job{i}", "posted": "today"} for i in range(2)]
+        mock_driver_instance.execute_script.side_effect = \
+            lambda script, *args: cards if script == js_extract.LISTING_CARDS_SCRIPT else None
+        mock_fetch_job_detail.return_value = ("Title", "Content", "", "", "", "", "")
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch('aj_scraper.job_store', JobStore(os.path.join(tmp, 'jobs.db'))) as store, \
+                patch('aj_scraper.seen_index', SeenIndex(os.path.join(tmp, 'seen.json'), store=store)):
+            jobs = aj_scraper.fetch_academic_positions_jobs(selected_model="mock_model", num_jobs_to_fetch=2)
+            self.assertEqual([job['highlight'] for job in jobs], ["Regex highlight"] * 2)
+            self.assertEqual(store.queue_counts('academicpositions'), {'pending': 2})
+            # The degraded result is not reused: the next run fetches and enriches again
+            aj_scraper.fetch_academic_positions_jobs(selected_model="mock_model", num_jobs_to_fetch=2)
+            self.assertEqual(mock_generate_highlight.call_count, 4)
+            store.close()
 
+    @patch('aj_scraper.set_windows_proxy_from_pac')
+    @patch('aj_scraper.generate_highlight', return_value=("Mocked Highlight", "mock_model"))
+    @patch('aj_scraper.fetch_job_detail')
+    @patch('aj_scraper.webdriver.Chrome')
+    def test_failed_detail_fetch_skips_only_that_posting(self, mock_chrome, mock_fetch_job_detail, mock_generate_highlight, mock_set_proxy):
+        mock_driver_instance = MagicMock()
+        mock_chrome.return_value = mock_driver_instance
+        cards = [{"title": f"Job {i}", "institution": "Inst", "location": "Loc",
+                  "link": f"http://example.com/job{i}", "posted": "today"} for i in range(3)]
+        mock_driver_instance.execute_script.side_effect = \
+            lambda script, *args: cards if script == js_extract.LISTING_CARDS_SCRIPT else None
+
+        def fetch_job_detail(driver, url):
+            if url.endswith("job1"):
+                raise ValueError("unexpected page layout")
+            return (url, "Content", "", "", "", "", "")
+        mock_fetch_job_detail.side_effect = fetch_job_detail
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch('aj_scraper.job_store', JobStore(os.path.join(tmp, 'jobs.db'))) as store, \
+                patch('aj_scraper.seen_index', SeenIndex(os.path.join(tmp, 'seen.json'), store=store)):
+            jobs = aj_scraper.fetch_academic_positions_jobs(selected_model="mock_model", num_jobs_to_fetch=3)
+            self.assertEqual([job['link'] for job in jobs], ["http://example.com/job0", "http://example.com/job2"])
+            self.assertEqual(len(store.jobs_for_source('academicpositions')), 2)
+            store.close()
+
+    def test_check_ai_server_probes_only_the_given_host(self):
+        health = ServerHealth("http://gpu-1:11434", version="0.9.0",
+                              models={"deepseek-r1:70b": "loaded", "qwen3:30b-a3b": "missing"})
+        with patch.object(aj_scraper.ollama, 'servers', ["http://rf-calcul:11434", "http://gpu-1:11434"]), \
+                patch.object(aj_scraper.ollama, 'find_server', return_value=health) as find_server:
+            self.assertTrue(aj_scraper.check_ai_server("http://gpu-1:11434/"))
+            self.assertEqual(find_server.call_args.kwargs['servers'], ["http://gpu-1:11434"])
+            self.assertTrue(aj_scraper.check_ai_server())
+            self.assertEqual(find_server.call_args.kwargs['servers'], ["http://rf-calcul:11434", "http://gpu-1:11434"])
+
+    def test_async_backup_highlight_is_cleaned(self):
+        async def generate_task(model, task, prompt, host=None):
+            if model != "qwen3:30b-a3b":
+                raise TimeoutError("primary timed out")
+            return "职位亮点：研究团队国际领先。\n\n设备先进。"
+
+        llm_cache = MagicMock()
+        llm_cache.get.return_value = None
+        with patch.object(aj_scraper.async_ollama, 'generate_task', side_effect=generate_task), \
+                patch('aj_scraper.llm_cache', llm_cache):
+            highlight = asyncio.run(aj_scraper.ollama_highlight_async("PhD in physics"))
+        self.assertEqual(highlight, "研究团队国际领先。\n设备先进。")
+        llm_cache.put.assert_not_called()
 
     def test_generate_summary_article_output(self):
         sample_job_details = []
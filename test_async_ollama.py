@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import json
+import asyncio
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from async_ollama import AsyncOllamaClient
+from ollama_client import OllamaClient, CircuitBreakers
+
+
+class FakeTransport:
+    """Records how many calls are in flight per server"""
+
+    def __init__(self, fail_servers=()):
+        self.fail_servers = set(fail_servers)
+        self.in_flight = {}
+        self.peak = {}
+        self.calls = []
+
+    async def generate_task(self, server, model, task, prompt, **kwargs):
+        self.calls.append((server, model, task))
+        if server in self.fail_servers:
+            raise requests.exceptions.ConnectionError("refused")
+        self.in_flight[server] = self.in_flight.get(server, 0) + 1
+        self.peak[server] = max(self.peak.get(server, 0), self.in_flight[server])
+        await asyncio.sleep(0.01)
+        self.in_flight[server] -= 1
+        return f"{task}:{prompt}"
+
+    def close(self):
+        pass
+
+
+class TestAsyncOllamaClient(unittest.TestCase):
+
+    def test_per_server_semaphore_caps_concurrency(self):
+        transport = FakeTransport()
+        client = AsyncOllamaClient(OllamaClient(["http://a:11434"]), transport=transport, per_server=3)
+
+        async def run():
+            return await asyncio.gather(*(client.generate_task("m", "highlight", str(i)) for i in range(20)))
+
+        results = asyncio.run(run())
+        self.assertEqual(results, [f"highlight:{i}" for i in range(20)])
+        self.assertEqual(transport.peak, {"http://a:11434": 3})
+
+    def test_a_burst_is_spread_over_the_servers(self):
+        transport = FakeTransport()
+        servers = ["http://a:11434", "http://b:11434", "http://c:11434"]
+        sync_client = OllamaClient(servers)
+        client = AsyncOllamaClient(sync_client, transport=transport, per_server=2)
+
+        async def run():
+            return await asyncio.gather(*(client.generate_task("m", "highlight", str(i)) for i in range(30)))
+
+        # Every coroutine sees the same load order, as none has reached the sync client yet
+        with patch.object(sync_client, "server_order", return_value=list(servers)):
+            asyncio.run(run())
+        counts = {server: [call[0] for call in transport.calls].count(server) for server in servers}
+        self.assertEqual(counts, dict.fromkeys(servers, 10))
+        self.assertEqual(transport.peak, dict.fromkeys(servers, 2))
+
+    def test_next_server_is_tried_after_a_failure(self):
+        transport = FakeTransport(fail_servers={"http://a:11434"})
+        sync_client = OllamaClient(["http://a:11434", "http://b:11434"])
+        client = AsyncOllamaClient(sync_client, transport=transport)
+        with patch.object(sync_client, "server_order", return_value=["http://a:11434", "http://b:11434"]):
+            self.assertEqual(asyncio.run(client.generate_task("m", "summary", "p")), "summary:p")
+        self.assertEqual([call[0] for call in transport.calls], ["http://a:11434", "http://b:11434"])
+
+    def test_default_transport_runs_the_sync_client(self):
+        sync_client = OllamaClient(["http://a:11434"], breakers=CircuitBreakers())
+        session = MagicMock()
+        session.post.return_value.iter_lines.return_value = iter(
+            [json.dumps({"response": "<think>x</think>研究团队国际领先，设备先进。", "done": True}).encode()])
+        client = AsyncOllamaClient(sync_client)
+        self.addCleanup(client.close)
+        with patch.object(sync_client, "session", return_value=session):
+            text = asyncio.run(client.generate_task("m", "highlight", "p"))
+        self.assertEqual(text, "研究团队国际领先，设备先进。")
+        self.assertIs(session.post.call_args.kwargs["json"]["think"], False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from selenium.common.exceptions import InvalidSessionIdException
+from driver_pool import DriverPool
+
+
+class TestDriverPool(unittest.TestCase):
+
+    def test_dead_session_is_replaced_and_retried(self):
+        factory = MagicMock(side_effect=lambda: MagicMock())
+        pool = DriverPool(factory, size=1)
+        calls = []
+
+        def fetch(driver, item):
+            calls.append(driver)
+            if len(calls) == 1:
+                raise InvalidSessionIdException("invalid session id")
+            return item
+
+        self.assertEqual(pool.run(fetch, "a"), "a")
+        self.assertEqual(pool.restarts, 1)
+        self.assertEqual(factory.call_count, 2)
+        self.assertIsNot(calls[0], calls[1])
+        calls[0].quit.assert_called_once()
+        pool.quit()
+
+    def test_other_errors_are_not_retried(self):
+        pool = DriverPool(MagicMock, size=2)
+
+        def fetch(driver, item):
+            if item == 2:
+                raise ValueError("parse error")
+            return item
+
+        self.assertEqual(pool.run(fetch, 1), 1)
+        with self.assertRaises(ValueError):
+            pool.run(fetch, 2)
+        self.assertEqual(pool.run(fetch, 3), 3)
+        self.assertEqual(pool.restarts, 0)
+        pool.quit()
+
+    def test_failed_restart_drops_the_dead_driver(self):
+        first = MagicMock()
+        second = MagicMock()
+        factory = MagicMock(side_effect=[first, RuntimeError("chrome failed to start"), second])
+        pool = DriverPool(factory, size=1)
+
+        def fetch(driver, item):
+            if driver is first:
+                raise InvalidSessionIdException("invalid session id")
+            return item
+
+        with self.assertRaises(RuntimeError):
+            pool.run(fetch, "a")
+        # The next task gets a freshly started driver, not the dead one
+        self.assertEqual(pool.run(fetch, "b"), "b")
+        self.assertEqual(factory.call_count, 3)
+        pool.quit()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from enrich_worker import drain
+from job_store import JobStore
+from page_cache import PageCache
+from seen_index import SeenIndex
+
+
+class TestEnrichWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = JobStore(os.path.join(self.tmp.name, "jobs.db"))
+        self.addCleanup(self.store.close)
+        self.cache = PageCache(os.path.join(self.tmp.name, "pages"))
+        self.index = SeenIndex(os.path.join(self.tmp.name, "seen.json"), store=self.store, cache=self.cache)
+        for name, value in [("seen_index", self.index), ("page_cache", self.cache)]:
+            patcher = patch(f"enrich_worker.{name}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_queue_is_drained_concurrently_and_failures_retried(self):
+        for i in range(6):
+            self.cache.put(f"https://example.org/{i}", "<html></html>", source="daad")
+            self.store.enqueue("daad", {"title": f"Job {i}", "link": f"https://example.org/{i}", "content": "x"},
+                               listing_digest=f"l{i}", content_digest=f"c{i}")
+        in_flight = []
+        peak = []
+
+        async def enrich(job, model):
+            in_flight.append(job)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(job)
+            if job["title"] == "Job 3":
+                raise TimeoutError("server busy")
+            return dict(job, highlight=f"{model}:{job['title']}")
+
+        stats = asyncio.run(drain({"daad": enrich}, "m", concurrency=3, retry_delay=60, store=self.store))
+        self.assertEqual(stats, {"done": 5, "retry": 1, "failed": 0})
+        self.assertEqual(max(peak), 3)
+        self.assertEqual(self.store.get_job("https://example.org/0")["highlight"], "m:Job 0")
+        self.assertEqual(self.store.queue_counts(), {"done": 5, "pending": 1})
+        # Enriched jobs are skipped by the next scrape; the failed one is not
+        self.assertIsNotNone(self.index.lookup_listing("https://example.org/0", "l0"))
+        self.assertIsNone(self.index.lookup_listing("https://example.org/3", "l3"))
+
+    def test_failed_daad_translation_is_retried_not_completed(self):
+        import daad_scraper_new
+
+        async def generate_task(model, task, prompt, **kwargs):
+            if task == "translation":
+                raise TimeoutError("translation timed out")
+            return "研究团队国际领先，设备先进。"
+
+        llm_cache = MagicMock()
+        llm_cache.get.return_value = None
+        self.store.enqueue("daad", {"title": "Promotion in Physik", "link": "https://example.org/d", "content": "x"},
+                           listing_digest="l", content_digest="c")
+        with patch.object(daad_scraper_new.async_ollama, "generate_task", side_effect=generate_task), \
+                patch("daad_scraper_new.llm_cache", llm_cache):
+            stats = asyncio.run(drain({"daad": daad_scraper_new.enrich_queued_job}, "m", store=self.store))
+        self.assertEqual(stats, {"done": 0, "retry": 1, "failed": 0})
+        self.assertIsNone(self.index.get("https://example.org/d"))
+        self.assertEqual(self.store.get_job("https://example.org/d")["title"], "Promotion in Physik")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from job_store import JobStore
+
+
+class TestJobStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = JobStore(os.path.join(self.tmp.name, "jobs.db"))
+        self.addCleanup(self.store.close)
+
+    def test_jobs_are_upserted_by_link(self):
+        run_id = self.store.start_run("daad", model="mock_model")
+        job = {"title": "PhD A", "link": "https://example.org/job/1/", "highlight": "first"}
+        self.store.save_job("daad", job, run_id=run_id, model="mock_model")
+        self.store.save_job("daad", dict(job, highlight="second"), run_id=run_id, model="mock_model")
+        self.store.finish_run(run_id)
+
+        self.assertEqual(self.store.get_job("https://example.org/job/1")["highlight"], "second")
+        self.assertEqual(len(self.store.jobs_for_source("daad")), 1)
+        conn = self.store._connect()
+        self.assertEqual(conn.execute("SELECT result FROM enrichment").fetchall()[0]["result"], "second")
+        run = conn.execute("SELECT status, jobs_saved FROM runs WHERE id = ?", (run_id,)).fetchone()
+        self.assertEqual((run["status"], run["jobs_saved"]), ("completed", 2))
+
+    def test_jobs_for_run_only_returns_that_run(self):
+        first = self.store.start_run("euraxess")
+        self.store.save_job("euraxess", {"title": "A", "link": "https://example.org/a"}, run_id=first)
+        second = self.store.start_run("euraxess")
+        self.store.save_job("euraxess", {"title": "B", "link": "https://example.org/b"}, run_id=second)
+        self.assertEqual([job["title"] for job in self.store.jobs_for_run(second)], ["B"])
+
+    def test_deadline_column_is_parsed_from_the_record(self):
+        jobs = [
+            {"title": "A", "link": "https://example.org/a", "posted": "Deadline: 15 Mar 2025 - 23:59 (Europe/Brussels)"},
+            {"title": "B", "link": "https://example.org/b", "content": "Application Deadline\n31.03.2025\nContact"},
+            {"title": "C", "link": "https://example.org/c", "content": "Deadline: open until filled"},
+        ]
+        for job in jobs:
+            self.store.save_job("daad", job)
+        rows = self.store._connect().execute("SELECT title, deadline FROM jobs ORDER BY title").fetchall()
+        self.assertEqual([tuple(row) for row in rows], [("A", "2025-03-15"), ("B", "2025-03-31"), ("C", "")])
+
+    def test_queue_claim_complete(self):
+        run_id = self.store.start_run("daad")
+        job = {"title": "PhD A", "link": "https://example.org/a", "highlight": ""}
+        self.store.enqueue("daad", job, run_id=run_id, listing_digest="l1", content_digest="c1")
+        self.store.enqueue("academicpositions", {"title": "B", "link": "https://example.org/b"}, run_id=run_id)
+
+        items = self.store.claim(limit=5, source="daad")
+        self.assertEqual([(item["job"]["title"], item["listing_hash"], item["content_hash"]) for item in items],
+                         [("PhD A", "l1", "c1")])
+        self.assertEqual(self.store.claim(source="daad"), [])
+
+        self.store.complete(items[0]["id"], dict(job, highlight="done"), model="m")
+        self.assertEqual(self.store.get_job("https://example.org/a")["highlight"], "done")
+        self.assertEqual(self.store.queue_counts(), {"done": 1, "pending": 1})
+        # Saving the enriched job keeps it in the run that scraped it
+        self.assertEqual(len(self.store.jobs_for_run(run_id)), 2)
+
+    def test_failed_items_back_off_then_give_up(self):
+        self.store.enqueue("daad", {"title": "A", "link": "https://example.org/a"})
+        item = self.store.claim()[0]
+        self.assertEqual(self.store.fail(item["id"], "timeout", max_attempts=2, retry_delay=60), "pending")
+        self.assertEqual(self.store.claim(), [])  # not due yet
+
+        self.store._connect().execute("UPDATE work_queue SET next_attempt_at = 0")
+        item = self.store.claim()[0]
+        self.assertEqual(item["attempts"], 1)
+        self.assertEqual(self.store.fail(item["id"], "timeout", max_attempts=2), "failed")
+        self.assertEqual(self.store.queue_counts(), {"failed": 1})
+
+    def test_enqueue_respects_running_and_failed_items(self):
+        job = {"title": "A", "link": "https://example.org/a"}
+        self.store.enqueue("daad", job, content_digest="c1")
+        item = self.store.claim()[0]
+        # A scrape while the worker holds the item does not requeue it
+        self.store.enqueue("daad", job, content_digest="c1")
+        self.assertEqual(self.store.queue_counts(), {"running": 1})
+
+        self.assertEqual(self.store.fail(item["id"], "timeout", max_attempts=1), "failed")
+        self.store.enqueue("daad", job, content_digest="c1")
+        self.assertEqual(self.store.queue_counts(), {"failed": 1})
+        # Changed content gets a fresh retry budget
+        self.store.enqueue("daad", job, content_digest="c2")
+        self.assertEqual(self.store.queue_counts(), {"pending": 1})
+        self.assertEqual(self.store.claim()[0]["attempts"], 0)
+
+    def test_enqueue_keeps_attempts_for_unchanged_content(self):
+        job = {"title": "A", "link": "https://example.org/a"}
+        self.store.enqueue("daad", job, content_digest="c1")
+        self.store.fail(self.store.claim()[0]["id"], "timeout", max_attempts=3, retry_delay=60)
+        self.store.enqueue("daad", job, content_digest="c1")
+        self.assertEqual(self.store.claim(), [])  # still backing off
+        self.store._connect().execute("UPDATE work_queue SET next_attempt_at = 0")
+        self.assertEqual(self.store.claim()[0]["attempts"], 1)
+
+    def test_stale_running_items_are_requeued(self):
+        self.store.enqueue("daad", {"title": "A", "link": "https://example.org/a"})
+        self.store.claim()
+        self.assertEqual(self.store.requeue_stale(older_than=3600), 0)
+        self.assertEqual(self.store.requeue_stale(older_than=-1), 1)
+        self.assertEqual(len(self.store.claim()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from llm_cache import LLMCache
+
+
+class TestLLMCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_key_covers_task_model_version_and_normalized_input(self):
+        cache = LLMCache(os.path.join(self.tmp.name, "llm.db"))
+        self.addCleanup(cache.close)
+        cache.put("highlight", "deepseek-r1:70b", "v1", "PhD  in\nPhysics", "亮点")
+        self.assertEqual(cache.get("highlight", "deepseek-r1:70b", "v1", "PhD in Physics "), "亮点")
+        self.assertIsNone(cache.get("highlight", "deepseek-r1:70b", "v2", "PhD in Physics"))
+        self.assertIsNone(cache.get("highlight", "qwen3:30b-a3b", "v1", "PhD in Physics"))
+        self.assertIsNone(cache.get("translation", "deepseek-r1:70b", "v1", "PhD in Physics"))
+        self.assertEqual((cache.hits["highlight"], cache.misses["highlight"]), (1, 2))
+
+    def test_least_recently_used_outputs_are_evicted(self):
+        cache = LLMCache(os.path.join(self.tmp.name, "llm.db"), max_entries=2)
+        self.addCleanup(cache.close)
+        cache.put("highlight", "m", "v1", "a", "A")
+        cache.put("highlight", "m", "v1", "b", "B")
+        cache.get("highlight", "m", "v1", "a")
+        cache.put("highlight", "m", "v1", "c", "C")
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("highlight", "m", "v1", "b"))
+        self.assertEqual(cache.get("highlight", "m", "v1", "a"), "A")
+
+
+if __name__ == '__main__':
+    unittest.main()
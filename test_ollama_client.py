@@ -0,0 +1,345 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import json
+import threading
+import time
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from ollama_client import (OllamaClient, OllamaResponseError, ThinkFilter, TruncatedGenerationError, ServerHealth,
+                           CircuitOpenError, CircuitBreakers, circuit_breakers, SlotTimeoutError)
+
+
+class TestOllamaClient(unittest.TestCase):
+
+    def setUp(self):
+        # Breakers are shared process-wide; start every test with closed circuits
+        circuit_breakers.reset()
+
+    def test_requests_go_to_least_loaded_server(self):
+        client = OllamaClient(["http://a:11434", "http://b:11434"])
+        with client._lock:
+            client._state("http://a:11434").latency = 1.0
+            client._state("http://b:11434").latency = 1.0
+            client._state("http://a:11434").in_flight = 1
+        self.assertEqual(client.server_order(), ["http://b:11434", "http://a:11434"])
+        with client._lock:
+            client._state("http://b:11434").latency = 5.0
+        # One request in flight on a fast server beats an idle slow one
+        self.assertEqual(client.server_order()[0], "http://a:11434")
+        self.assertEqual(client.server_order(host="http://c:11434"), ["http://c:11434"])
+
+    def test_failing_server_is_ejected_then_readmitted(self):
+        client = OllamaClient(["http://a:11434", "http://b:11434"], max_failures=2)
+        session = MagicMock()
+        session.post.side_effect = requests.exceptions.ConnectionError("refused")
+        with patch.object(client, "session", return_value=session):
+            for _ in range(2):
+                with self.assertRaises(requests.exceptions.ConnectionError):
+                    client.generate("http://a:11434", "m", "p")
+        self.assertEqual(client.server_order(), ["http://b:11434"])
+        self.assertTrue(client.stats()["http://a:11434"]["ejected"])
+        client.mark_success("http://a:11434")
+        self.assertEqual(set(client.server_order()), {"http://a:11434", "http://b:11434"})
+
+    def test_client_errors_do_not_eject(self):
+        client = OllamaClient(["http://a:11434"], max_failures=1)
+        session = MagicMock()
+        session.post.return_value.raise_for_status.side_effect = requests.exceptions.HTTPError(
+            response=MagicMock(status_code=404))
+        with patch.object(client, "session", return_value=session):
+            with self.assertRaises(requests.exceptions.HTTPError):
+                client.generate("http://a:11434", "missing-model", "p")
+        self.assertFalse(client.stats()["http://a:11434"]["ejected"])
+
+    def test_concurrency_cap_per_server(self):
+        client = OllamaClient(["http://a:11434"], max_in_flight=2, stream=False)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def slow_post(*args, **kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            resp = MagicMock()
+            resp.json.return_value = {"response": "ok"}
+            return resp
+
+        session = MagicMock()
+        session.post.side_effect = slow_post
+        with patch.object(client, "session", return_value=session):
+            threads = [threading.Thread(target=client.generate, args=("http://a:11434", "m", "p")) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(client.stats()["http://a:11434"]["requests"], 6)
+
+    def test_servers_from_environment(self):
+        with patch.dict(os.environ, {"OLLAMA_HOSTS": "http://a:11434/, http://b:11434"}):
+            self.assertEqual(OllamaClient().servers, ["http://a:11434", "http://b:11434"])
+
+    def test_one_session_per_server(self):
+        client = OllamaClient(["http://a:11434", "http://b:11434"])
+        self.assertIs(client.session("http://a:11434"), client.session("http://a:11434"))
+        self.assertIsNot(client.session("http://a:11434"), client.session("http://b:11434"))
+
+    def test_generate_posts_payload_with_timeouts(self):
+        client = OllamaClient(["http://a:11434"], connect_timeout=3, generate_timeout=90, stream=False)
+        session = MagicMock()
+        session.post.return_value.json.return_value = {"response": "亮点"}
+        with patch.object(client, "session", return_value=session):
+            self.assertEqual(client.generate("http://a:11434", "m", "p", options={"temperature": 0.2}), "亮点")
+        args, kwargs = session.post.call_args
+        self.assertEqual(args[0], "http://a:11434/api/generate")
+        self.assertEqual(kwargs["json"], {"model": "m", "prompt": "p", "stream": False,
+                                          "options": {"temperature": 0.2}, "keep_alive": "30m"})
+        self.assertEqual(kwargs["timeout"], (3, 90))
+
+    def test_generate_rejects_malformed_response(self):
+        client = OllamaClient(["http://a:11434"], stream=False)
+        session = MagicMock()
+        session.post.return_value.json.return_value = {"error": "model not found"}
+        with patch.object(client, "session", return_value=session):
+            with self.assertRaises(OllamaResponseError):
+                client.generate("http://a:11434", "m", "p")
+
+
+    def test_think_filter_handles_tags_split_across_chunks(self):
+        think = ThinkFilter()
+        for chunk in ["<thi", "nk>reasoning ", "more</th", "ink>\n答案", "：很好<", "/b>"]:
+            think.feed(chunk)
+        self.assertEqual(think.flush().strip(), "答案：很好</b>")
+        self.assertEqual(think.discarded, len("reasoning more"))
+
+        unopened = ThinkFilter()
+        unopened.feed("reasoning without an opening tag</think>answer")
+        self.assertEqual(unopened.flush(), "answer")
+
+    def _stream_session(self, chunks):
+        lines = [json.dumps(chunk).encode() for chunk in chunks]
+        session = MagicMock()
+        session.post.return_value.iter_lines.return_value = iter(lines)
+        return session
+
+    def test_stream_cancels_once_answer_is_long_enough(self):
+        client = OllamaClient(["http://a:11434"])
+        chunks = [{"response": "<think>" + "x" * 50}, {"response": "</think>"}] + \
+                 [{"response": "字"} for _ in range(100)] + [{"response": "", "done": True, "done_reason": "stop"}]
+        session = self._stream_session(chunks)
+        with patch.object(client, "session", return_value=session):
+            result = client.generate_stream("http://a:11434", "m", "p", max_chars=10)
+        self.assertEqual(result.text, "字" * 10)
+        self.assertEqual(result.done_reason, "length")
+        self.assertTrue(result.truncated)
+        self.assertEqual(result.thinking_chars, 50)
+        session.post.return_value.close.assert_called_once()
+        self.assertTrue(session.post.call_args.kwargs["json"]["stream"])
+
+    def test_stream_stops_at_stop_string(self):
+        client = OllamaClient(["http://a:11434"])
+        session = self._stream_session([{"response": "\n\n第一段"}, {"response": "\n\n第二段"},
+                                        {"response": "", "done": True}])
+        with patch.object(client, "session", return_value=session):
+            self.assertEqual(client.generate("http://a:11434", "m", "p", stop=["\n\n"]), "第一段")
+
+    def test_task_profile_bounds_request_and_validates_output(self):
+        client = OllamaClient(["http://a:11434"])
+        session = self._stream_session([{"response": "研究团队国际领先，设备先进。第二句还没写"},
+                                        {"response": "", "done": True, "done_reason": "length"}])
+        with patch.object(client, "session", return_value=session):
+            self.assertEqual(client.generate_task("http://a:11434", "m", "highlight", "p"), "研究团队国际领先，设备先进。")
+        payload = session.post.call_args.kwargs["json"]
+        self.assertIs(payload["think"], False)
+        self.assertEqual(payload["options"]["num_predict"], 400)
+
+        session = self._stream_session([{"response": "Doktorand"},
+                                        {"response": "", "done": True, "done_reason": "length"}])
+        with patch.object(client, "session", return_value=session):
+            with self.assertRaises(TruncatedGenerationError):
+                client.generate_task("http://a:11434", "m", "translation", "p", input_text="x" * 100)
+        self.assertEqual(session.post.call_args.kwargs["json"]["options"]["num_predict"], 164)
+
+    def test_highlight_is_not_cut_at_a_heading(self):
+        client = OllamaClient(["http://a:11434"])
+        session = self._stream_session([{"response": "**职位亮点**\n\n"}, {"response": "研究团队国际领先，设备先进。"},
+                                        {"response": "", "done": True, "done_reason": "stop"}])
+        with patch.object(client, "session", return_value=session):
+            text = client.generate_task("http://a:11434", "m", "highlight", "p")
+        self.assertIn("研究团队国际领先", text)
+
+    def test_availability_reads_tags_and_ps_without_generating(self):
+        client = OllamaClient(["http://a:11434", "http://b:11434"])
+        replies = {
+            "/api/version": {"version": "0.9.0"},
+            "/api/tags": {"models": [{"name": "deepseek-r1:70b"}, {"name": "qwen3:30b-a3b"}]},
+            "/api/ps": {"models": [{"name": "qwen3:30b-a3b"}]},
+        }
+        session = MagicMock()
+        session.get.side_effect = lambda url, timeout: MagicMock(json=MagicMock(return_value=replies[url[len("http://a:11434"):]]))
+        down = MagicMock()
+        down.get.side_effect = requests.exceptions.ConnectionError("refused")
+        with patch.object(client, "session", side_effect=lambda server: session if server == "http://a:11434" else down):
+            self.assertEqual(client.availability("deepseek-r1:70b"),
+                             {"http://a:11434": "unloaded", "http://b:11434": "unreachable"})
+            self.assertEqual(client.model_status("http://a:11434", "qwen3:30b-a3b"), "loaded")
+            self.assertEqual(client.model_status("http://a:11434", "llama3:8b"), "missing")
+        tag_calls = [c for c in session.get.call_args_list if c.args[0].endswith("/api/tags")]
+        self.assertEqual(len(tag_calls), 1)
+        session.post.assert_not_called()
+
+    def test_find_server_returns_first_healthy_probe(self):
+        client = OllamaClient(["http://dead:11434", "http://a:11434"])
+        replies = {
+            "/api/version": {"version": "0.9.0"},
+            "/api/tags": {"models": [{"name": "deepseek-r1:70b"}]},
+            "/api/ps": {"models": []},
+        }
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def hanging_get(url, timeout):
+            release.wait(5)
+            raise requests.exceptions.ConnectTimeout("timed out")
+
+        healthy, dead = MagicMock(), MagicMock()
+        healthy.get.side_effect = lambda url, timeout: MagicMock(json=MagicMock(return_value=replies[url[len("http://a:11434"):]]))
+        dead.get.side_effect = hanging_get
+        with patch.object(client, "session", side_effect=lambda server: healthy if server == "http://a:11434" else dead):
+            health = client.find_server(["deepseek-r1:70b", "qwen3:30b-a3b"])
+            self.assertEqual(health.server, "http://a:11434")
+            self.assertEqual(health.models, {"deepseek-r1:70b": "unloaded", "qwen3:30b-a3b": "missing"})
+            self.assertNotIn("http://dead:11434", client.health_table())
+            self.assertEqual(healthy.get.call_args_list[0].kwargs["timeout"], (3, 3))
+
+            release.set()
+            for _ in range(100):
+                if "http://dead:11434" in client.health_table():
+                    break
+                time.sleep(0.01)
+            self.assertFalse(client.health_table()["http://dead:11434"].healthy)
+            # Cached for the run: no new probes
+            calls = healthy.get.call_count
+            self.assertIs(client.find_server(["deepseek-r1:70b"]), health)
+            self.assertEqual(healthy.get.call_count, calls)
+
+    def test_warm_up_loads_installed_models_with_keep_alive(self):
+        client = OllamaClient(["http://a:11434", "http://b:11434"], keep_alive="1h")
+        with client._lock:
+            client._health["http://a:11434"] = ServerHealth("http://a:11434", "0.9.0", {"m": "unloaded"})
+            client._health["http://b:11434"] = ServerHealth("http://b:11434", "0.9.0", {"m": "missing"})
+        session = MagicMock()
+        with patch.object(client, "session", return_value=session):
+            results = client.warm_up(["m"])
+        self.assertEqual(list(results), [("http://a:11434", "m")])
+        self.assertEqual(session.post.call_args.kwargs["json"], {"model": "m", "stream": False, "keep_alive": "1h"})
+
+    def test_circuit_opens_then_half_opens_for_one_trial(self):
+        breakers = CircuitBreakers(failure_threshold=2, reset_timeout=30)
+        client = OllamaClient(["http://a:11434"], max_failures=100, breakers=breakers)
+        session = MagicMock()
+        session.post.side_effect = requests.exceptions.ReadTimeout("slow")
+        with patch.object(client, "session", return_value=session), \
+                patch("ollama_client.time.monotonic", return_value=1000.0):
+            for _ in range(2):
+                with self.assertRaises(requests.exceptions.ReadTimeout):
+                    client.generate("http://a:11434", "big", "p")
+            with self.assertRaises(CircuitOpenError):
+                client.generate("http://a:11434", "big", "p")
+            self.assertEqual(session.post.call_count, 2)
+            # Other models on the same server are unaffected
+            self.assertEqual(breakers.state("http://a:11434", "small"), "closed")
+
+        session.post.side_effect = None
+        session.post.return_value.iter_lines.return_value = iter([json.dumps({"response": "ok", "done": True}).encode()])
+        with patch.object(client, "session", return_value=session), \
+                patch("ollama_client.time.monotonic", return_value=1031.0):
+            self.assertTrue(breakers.allow("http://a:11434", "big"))  # the half-open trial
+            self.assertFalse(breakers.allow("http://a:11434", "big"))  # only one at a time
+            breakers.release("http://a:11434", "big")
+            self.assertEqual(client.generate("http://a:11434", "big", "p"), "ok")
+        self.assertEqual(breakers.state("http://a:11434", "big"), "closed")
+
+    def test_waiting_for_a_free_slot_does_not_trip_the_circuit(self):
+        breakers = CircuitBreakers(failure_threshold=2, reset_timeout=30)
+        client = OllamaClient(["http://a:11434"], max_in_flight=1, breakers=breakers)
+        client._state("http://a:11434").in_flight = 1
+        session = MagicMock()
+        with patch.object(client, "session", return_value=session):
+            for _ in range(3):
+                with self.assertRaises(SlotTimeoutError):
+                    client.generate("http://a:11434", "m", "p", timeout=0.01)
+        session.post.assert_not_called()
+        self.assertEqual(breakers.state("http://a:11434", "m"), "closed")
+
+    def test_slow_request_is_hedged_and_loser_cancelled(self):
+        client = OllamaClient(["http://a:11434", "http://b:11434"], hedge=True, hedge_min_samples=1)
+        with client._lock:
+            client._task_latencies["highlight"] = [0.05]
+        slow_chunks = []
+
+        def slow_lines():
+            for _ in range(200):
+                time.sleep(0.01)
+                slow_chunks.append(1)
+                yield json.dumps({"response": "慢"}).encode()
+            yield json.dumps({"response": "", "done": True}).encode()
+
+        slow, fast = MagicMock(), MagicMock()
+        slow.post.return_value.iter_lines.side_effect = slow_lines
+        fast.post.return_value.iter_lines.return_value = iter(
+            [json.dumps({"response": "研究团队国际领先，设备先进。", "done": True}).encode()])
+        with patch.object(client, "session", side_effect=lambda server: slow if server == "http://a:11434" else fast):
+            text, model = client.generate_task_hedged("http://a:11434", "m", "highlight", "p", hedge_model="backup")
+            self.assertEqual((text, model), ("研究团队国际领先，设备先进。", "m"))
+            self.assertEqual(fast.post.call_args.args[0], "http://b:11434/api/generate")
+            for _ in range(100):
+                if client.stats()["http://a:11434"]["in_flight"] == 0:
+                    break
+                time.sleep(0.01)
+        self.assertLess(len(slow_chunks), 200)
+        self.assertEqual((client.hedges, client.hedge_wins), (1, 1))
+
+    def test_cancel_closes_a_stream_waiting_for_its_next_chunk(self):
+        client = OllamaClient(["http://a:11434"], breakers=CircuitBreakers())
+        closed = threading.Event()
+        session = MagicMock()
+        session.post.return_value.close.side_effect = closed.set
+
+        def blocked_lines():
+            yield json.dumps({"response": "第一"}).encode()
+            # Nothing more arrives until the connection is closed
+            closed.wait(5)
+            raise requests.exceptions.ConnectionError("connection closed")
+
+        session.post.return_value.iter_lines.side_effect = blocked_lines
+        cancel = threading.Event()
+        threading.Timer(0.1, cancel.set).start()
+        start = time.monotonic()
+        with patch.object(client, "session", return_value=session):
+            generation = client.generate_stream("http://a:11434", "m", "p", cancel=cancel)
+        self.assertEqual(generation.done_reason, "cancelled")
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(client.stats()["http://a:11434"]["in_flight"], 0)
+        # The cut-short request does not count as a fast answer
+        self.assertIsNone(client.stats()["http://a:11434"]["latency"])
+
+    def test_no_hedge_to_a_server_without_a_free_slot(self):
+        client = OllamaClient(["http://a:11434", "http://b:11434"], max_in_flight=1)
+        with client._lock:
+            client._state("http://b:11434").in_flight = 1
+        self.assertIsNone(client._hedge_target("http://a:11434", "m", None, None, "p"))
+        with client._lock:
+            client._state("http://b:11434").in_flight = 0
+        self.assertEqual(client._hedge_target("http://a:11434", "m", None, None, "p"), ("http://b:11434", "m", "p"))
+
+
+if __name__ == '__main__':
+    unittest.main()
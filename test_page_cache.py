@@ -0,0 +1,91 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import tempfile
+import itertools
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from page_cache import PageCache, normalize_url
+import http_fetch
+
+
+class TestPageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_normalized_urls_share_an_entry(self):
+        self.assertEqual(
+            normalize_url("HTTPS://Euraxess.EC.europa.eu/jobs/1/?utm_source=x&b=2&a=1#top"),
+            "https://euraxess.ec.europa.eu/jobs/1?a=1&b=2",
+        )
+        cache = PageCache(self.tmp.name)
+        cache.put("https://example.org/job/1/", "<html>1</html>", source="daad")
+        self.assertEqual(cache.get("https://example.org/job/1?utm_medium=mail"), "<html>1</html>")
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+    def test_entries_expire_per_source(self):
+        cache = PageCache(self.tmp.name, ttls={"daad": 100, "euraxess": 10})
+        with patch("page_cache.time.time", return_value=1000):
+            cache.put("https://example.org/a", "a", source="daad")
+            cache.put("https://example.org/b", "b", source="euraxess")
+        with patch("page_cache.time.time", return_value=1050):
+            self.assertEqual(cache.get("https://example.org/a", source="daad"), "a")
+            self.assertIsNone(cache.get("https://example.org/b", source="euraxess"))
+        self.assertEqual(cache.expired, 1)
+
+    def test_least_recently_used_pages_are_evicted(self):
+        cache = PageCache(self.tmp.name, max_bytes=10)
+        with patch("page_cache.time.time", side_effect=itertools.count(1)):
+            cache.put("https://example.org/a", "aaaa")
+            cache.put("https://example.org/b", "bbbb")
+            cache.get("https://example.org/a")
+            cache.put("https://example.org/c", "cccc")
+        self.assertIsNone(cache.get("https://example.org/b", allow_stale=True))
+        self.assertEqual(cache.get("https://example.org/a", allow_stale=True), "aaaa")
+        self.assertEqual(cache.evictions, 1)
+        self.assertLessEqual(cache.size_bytes(), 10)
+
+    def test_hits_save_the_index_in_batches(self):
+        cache = PageCache(self.tmp.name, save_every=3)
+        cache.put("https://example.org/a", "a")
+        with patch.object(cache, "_save", wraps=cache._save) as save:
+            for _ in range(5):
+                cache.get("https://example.org/a")
+            self.assertEqual(save.call_count, 1)
+            cache.save()
+            self.assertEqual(save.call_count, 2)
+        last_access = cache.entry("https://example.org/a")["last_access"]
+        self.assertEqual(PageCache(self.tmp.name).entry("https://example.org/a")["last_access"], last_access)
+
+    def test_index_survives_reload(self):
+        PageCache(self.tmp.name).put("https://example.org/a", "a")
+        self.assertEqual(PageCache(self.tmp.name).get("https://example.org/a"), "a")
+
+
+    def test_not_modified_page_reuses_stored_record(self):
+        cache = PageCache(self.tmp.name, default_ttl=0)
+        session = MagicMock()
+        session.get.return_value = MagicMock(status_code=200, text="<html>v1</html>",
+                                             headers={"Content-Type": "text/html", "ETag": '"v1"'})
+        url = "https://example.org/job/1"
+        with patch.object(http_fetch, "page_cache", cache), patch.object(http_fetch, "get_session", return_value=session):
+            self.assertEqual(http_fetch.fetch_html(url), "<html>v1</html>")
+            cache.put_record(url, {"title": "Job 1", "highlight": "x"})
+
+            session.get.return_value = MagicMock(status_code=304, headers={})
+            self.assertEqual(http_fetch.unchanged_record(url), {"title": "Job 1", "highlight": "x"})
+            self.assertEqual(session.get.call_args.kwargs["headers"], {"If-None-Match": '"v1"'})
+            self.assertEqual(cache.not_modified, 1)
+
+            session.get.return_value = MagicMock(status_code=200, text="<html>v2</html>",
+                                                 headers={"Content-Type": "text/html", "ETag": '"v2"'})
+            self.assertIsNone(http_fetch.unchanged_record(url))
+            self.assertEqual(cache.get(url, allow_stale=True), "<html>v2</html>")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from pipeline import Pipeline, Stage
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_results_keep_source_order(self):
+        def slow_for_even(item):
+            time.sleep(0.01 if item % 2 == 0 else 0)
+            return item * 10
+
+        pipeline = Pipeline([Stage("double", lambda item: item * 2, workers=3),
+                             Stage("scale", slow_for_even, workers=4)])
+        self.assertEqual(pipeline.run(range(20)), [i * 20 for i in range(20)])
+        self.assertEqual([stage.processed for stage in pipeline.stages], [20, 20])
+
+    def test_fetch_and_enrich_overlap(self):
+        def fetch(item):
+            time.sleep(0.05)
+            return item
+
+        def enrich(item):
+            time.sleep(0.05)
+            return item
+
+        pipeline = Pipeline([Stage("fetch", fetch), Stage("enrich", enrich)])
+        start = time.monotonic()
+        pipeline.run(range(6))
+        # Sequential would take 0.6s; pipelined is about 0.35s
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_bounded_queues_apply_backpressure(self):
+        produced = []
+        release = threading.Event()
+
+        def source():
+            for i in range(50):
+                produced.append(i)
+                yield i
+
+        def blocked(item):
+            release.wait(5)
+            return item
+
+        pipeline = Pipeline([Stage("blocked", blocked)], queue_size=2)
+        thread = threading.Thread(target=pipeline.run, args=(source(),))
+        thread.start()
+        time.sleep(0.2)
+        # One item in the worker, two in the queue, one waiting to be put
+        self.assertLessEqual(len(produced), 4)
+        release.set()
+        thread.join(5)
+        self.assertEqual(len(produced), 50)
+
+    def test_first_error_stops_the_pipeline(self):
+        def fail_on_three(item):
+            if item == 3:
+                raise ValueError("bad item")
+            return item
+
+        pipeline = Pipeline([Stage("check", fail_on_three, workers=2), Stage("pass", lambda item: item)])
+        with self.assertRaises(ValueError):
+            pipeline.run(range(1000))
+        self.assertLess(pipeline.stages[1].processed, 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
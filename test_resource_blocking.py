@@ -0,0 +1,39 @@
+import unittest
+import sys
+import os
+import re
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from resource_blocking import build_blocklist, pattern_to_regex
+
+
+def blocked_category(url):
+    for category, pattern in build_blocklist():
+        if re.match(pattern_to_regex(pattern), url, re.IGNORECASE):
+            return category
+    return None
+
+
+class TestResourceBlocking(unittest.TestCase):
+
+    def test_resources_are_blocked(self):
+        self.assertEqual(blocked_category("https://example.org/img/logo.png"), "image")
+        self.assertEqual(blocked_category("https://example.org/favicon.ico?v=2"), "image")
+        self.assertEqual(blocked_category("https://example.org/fonts/a.woff2"), "font")
+        self.assertEqual(blocked_category("https://www.google-analytics.com/analytics.js"), "analytics")
+        self.assertEqual(blocked_category("https://cdn.matomo.cloud/example.matomo.cloud/matomo.js"), "analytics")
+        self.assertEqual(blocked_category("https://stats.example.org/matomo.js"), "analytics")
+        self.assertEqual(blocked_category("https://securepubads.g.doubleclick.net/tag/js/gpt.js"), "ads")
+
+    def test_documents_containing_resource_strings_are_not_blocked(self):
+        for url in ["https://academicpositions.com/jobs/lexicon.icon-design-phd",
+                    "https://example.org/login?next=foo.gif&lang=en",
+                    "https://example.org/api/search?q=ogg+vorbis",
+                    "https://example.org/jobs/matomo-integration-engineer",
+                    "https://www2.daad.de/deutschland/promotion/phd/en/13306-phd-germany-database/"]:
+            self.assertIsNone(blocked_category(url), url)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from job_store import JobStore
+from page_cache import PageCache
+from seen_index import SeenIndex, listing_hash
+
+
+class TestSeenIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = JobStore(os.path.join(self.tmp.name, "jobs.db"))
+        self.addCleanup(self.store.close)
+        self.path = os.path.join(self.tmp.name, "seen.json")
+        self.cache = PageCache(os.path.join(self.tmp.name, "pages"), ttls={"daad": 100})
+
+    def test_index_holds_hashes_and_reads_records_from_the_store(self):
+        job = {"title": "PhD A", "institution": "Uni", "location": "Bonn", "posted": "3 days ago",
+               "link": "https://example.org/a/", "highlight": "x"}
+        self.store.save_job("daad", job)
+        self.cache.put(job["link"], "<html></html>", source="daad")
+        index = SeenIndex(self.path, store=self.store, cache=self.cache)
+        index.add(job["link"], source="daad", listing_digest=listing_hash(job), content_digest="c1")
+        index.save()
+
+        with open(self.path, encoding="utf-8") as f:
+            self.assertNotIn("record", json.load(f)["https://example.org/a"])
+        reloaded = SeenIndex(self.path, store=self.store, cache=self.cache)
+        moved = dict(job, posted="4 days ago")
+        self.assertEqual(reloaded.lookup_listing(job["link"], listing_hash(moved))["highlight"], "x")
+        self.assertEqual(reloaded.lookup_content(job["link"], "c1")["title"], "PhD A")
+        self.assertIsNone(reloaded.lookup_content(job["link"], "c2"))
+        self.assertIsNone(reloaded.lookup_content("https://example.org/missing", "c1"))
+
+    def test_listing_hits_expire_with_the_cached_page(self):
+        job = {"title": "PhD A", "institution": "Uni", "location": "Bonn", "link": "https://example.org/a"}
+        self.store.save_job("daad", job)
+        index = SeenIndex(self.path, store=self.store, cache=self.cache)
+        index.add(job["link"], source="daad", listing_digest=listing_hash(job))
+        # Never fetched into the page cache: nothing says the detail page is unchanged
+        self.assertIsNone(index.lookup_listing(job["link"], listing_hash(job), source="daad"))
+
+        with patch("page_cache.time.time", return_value=1000):
+            self.cache.put(job["link"], "<html></html>", source="daad")
+        with patch("page_cache.time.time", return_value=1050):
+            self.assertIsNotNone(index.lookup_listing(job["link"], listing_hash(job), source="daad"))
+        # Past the page TTL the caller has to revalidate the page
+        with patch("page_cache.time.time", return_value=1200):
+            self.assertIsNone(index.lookup_listing(job["link"], listing_hash(job), source="daad"))
+        self.assertEqual(index.skipped_fetches, 1)
+
+    def test_adds_are_saved_in_batches(self):
+        index = SeenIndex(self.path, store=self.store, save_every=3)
+        with patch.object(index, "_save", wraps=index._save) as save:
+            for i in range(7):
+                index.add(f"https://example.org/{i}", listing_digest=str(i))
+            self.assertEqual(save.call_count, 2)
+            index.report()
+            self.assertEqual(save.call_count, 3)
+        self.assertEqual(len(SeenIndex(self.path, store=self.store)), 7)
+
+    def test_entries_not_seen_within_the_ttl_are_pruned(self):
+        index = SeenIndex(self.path, store=self.store, ttl=100)
+        with patch("seen_index.time.time", return_value=1000):
+            index.add("https://example.org/old", listing_digest="o")
+        with patch("seen_index.time.time", return_value=1200):
+            index.add("https://example.org/new", listing_digest="n")
+            index.save()
+        self.assertIsNone(SeenIndex(self.path, store=self.store).get("https://example.org/old"))
+        self.assertIsNotNone(SeenIndex(self.path, store=self.store).get("https://example.org/new"))
+
+
+if __name__ == '__main__':
+    unittest.main()